@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, bots, analytics, users, telegram
+from app.api.v1.endpoints import auth, bots, analytics, users, telegram, profiling, chat
 
 api_router = APIRouter()
 
@@ -9,3 +9,5 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(bots.router, prefix="/bots", tags=["bots"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
+api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(profiling.router, prefix="/admin/profiling", tags=["profiling"])
@@ -2,6 +2,12 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
+from app.core.config import settings
+from app.services.ai_service import ai_service
+from app.services.inference_scheduler import inference_scheduler
+from app.services.reranker import reranker
+from app.services.model_registry import model_registry
+from app.services.message_gateway import message_gateway
 
 router = APIRouter()
 
@@ -108,6 +114,23 @@ async def get_performance_metrics():
         }
     }
 
+@router.get("/inference")
+async def get_inference_stats():
+    """Get inference scheduler load, queue wait time per tenant, loaded models and re-ranking stats"""
+    if settings.INFERENCE_SOCKET:
+        return await ai_service.get_stats()
+    return {
+        **inference_scheduler.get_stats(),
+        "models": model_registry.get_stats(),
+        "answer_cache": ai_service.get_answer_cache_stats(),
+        "rerank": reranker.get_stats()
+    }
+
+@router.get("/gateway")
+async def get_gateway_stats():
+    """Get message gateway queue depth, worker load and receipt-to-reply latency"""
+    return message_gateway.get_stats()
+
 @router.get("/revenue")
 async def get_revenue_analytics():
     """Get revenue and subscription analytics"""
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, APIKeyHeader
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime, timedelta
+import hashlib
+import math
+import secrets
+import time
 import jwt
 
 from app.core.config import settings
+from app.core.cache import TTLCache, ExpiringSet
+from app.core.security import hash_password, verify_password, PasswordHasherBusy
 
 router = APIRouter()
 
 # Simple password verification (for demo purposes)
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# auto_error is off so requests authenticated with an API key get through
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 # Pydantic models
 class UserCreate(BaseModel):
@@ -35,12 +43,32 @@ class User(BaseModel):
     is_active: bool = True
     created_at: datetime
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+class APIKeyCreate(BaseModel):
+    name: str
+
+class APIKey(BaseModel):
+    id: str
+    name: str
+    prefix: str
+    created_at: datetime
+
+class APIKeyCreated(APIKey):
+    key: str  # only returned once, at creation
+
+# Everything below is per process: revocations and deleted API keys don't reach
+# other pre-forked workers, which is why run.py refuses several workers by default
+# (WEB_WORKERS_ALLOW_LOCAL_AUTH)
+
 # Mock user database (replace with real database)
 fake_users_db = {
     "admin@example.com": {
         "id": 1,
         "email": "admin@example.com",
-        "password": "admin123",  # Simple password for demo
+        "password": "admin123",  # Legacy plaintext, replaced by a bcrypt hash on first login
         "full_name": "Admin User",
         "organization": "FAQ Bot SaaS",
         "is_active": True,
@@ -48,11 +76,34 @@ fake_users_db = {
     }
 }
 
-def verify_password(plain_password, stored_password):
-    return plain_password == stored_password  # Simple comparison for demo
+# Mock API key database: sha256(key) -> key record (replace with real database)
+fake_api_keys_db = {}
+
+# Verified token hash -> (User, issued_at); entries expire with the token
+_principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+# Revoked token hashes, kept until the token would have expired anyway; never
+# evicted for space, a dropped entry would make the token valid again
+_revoked_tokens = ExpiringSet()
+# email -> whole epoch seconds; tokens issued before this are rejected
+_revoked_before = {}
 
-def get_password_hash(password):
-    return password  # No hashing for demo
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def _secret_hash(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many authentication requests, please retry shortly",
+    headers={"Retry-After": "1"},
+)
 
 def get_user(email: str):
     if email in fake_users_db:
@@ -60,11 +111,15 @@ def get_user(email: str):
         user_dict.pop('password', None)  # Remove password from user object
         return User(**user_dict)
 
-def authenticate_user(email: str, password: str):
+async def authenticate_user(email: str, password: str):
     if email not in fake_users_db:
         return False
-    if not verify_password(password, fake_users_db[email]["password"]):
+    valid, new_hash = await verify_password(password, fake_users_db[email]["password"])
+    if not valid:
         return False
+    if new_hash:
+        # Hashing parameters changed since this hash was stored
+        fake_users_db[email]["password"] = new_hash
     return get_user(email)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -73,7 +128,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -86,7 +141,17 @@ async def register(user: UserCreate):
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
+    
+    # Another registration may have won while the password was hashing
+    if user.email in fake_users_db:
+        raise HTTPException(
+            status_code=400,
+            detail="Email already registered"
+        )
     user_id = len(fake_users_db) + 1
     
     fake_users_db[user.email] = {
@@ -104,7 +169,10 @@ async def register(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login user and return access token"""
-    user = authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -117,33 +185,164 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from JWT token"""
+def _is_revoked(email: str, issued_at: int) -> bool:
+    revoked_before = _revoked_before.get(email)
+    return revoked_before is not None and issued_at < revoked_before
+
+def _user_from_token(token: str) -> User:
+    """Verify a JWT, serving repeat tokens from the verified-principal cache"""
+    key = _secret_hash(token)
+    cached = _principal_cache.get(key)
+    if cached is not None:
+        user, issued_at = cached
+        if not _is_revoked(user.email, issued_at):
+            return user
+        _principal_cache.delete(key)
+        raise credentials_exception
+    
+    if key in _revoked_tokens:
+        raise credentials_exception
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        user = get_user(email)
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user
     except jwt.PyJWTError:
+        raise credentials_exception
+    
+    email: str = payload.get("sub")
+    if email is None:
+        raise credentials_exception
+    issued_at = int(payload.get("iat", 0))
+    if _is_revoked(email, issued_at):
+        raise credentials_exception
+    
+    user = get_user(email)
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    _principal_cache.set(key, (user, issued_at), expires_at=float(payload["exp"]))
+    return user
+
+def _user_from_api_key(api_key: str) -> User:
+    """Resolve an API key; keys are random and high-entropy, so a sha256 lookup is enough"""
+    key = _secret_hash(api_key)
+    cached = _principal_cache.get(key)
+    if cached is not None:
+        return cached[0]
+    
+    record = fake_api_keys_db.get(key)
+    if record is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            detail="Invalid API key",
         )
+    
+    user = get_user(record["email"])
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
+    
+    _principal_cache.set(key, (user, time.time()))
+    return user
+
+def revoke_token(token: str):
+    """Reject a token from now on, even though its signature is still valid"""
+    key = _secret_hash(token)
+    _principal_cache.delete(key)
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        expires_at = float(payload["exp"])
+    except jwt.PyJWTError:
+        return
+    _revoked_tokens.add(key, expires_at)
+
+def revoke_user_tokens(email: str):
+    """Reject every token issued to a user so far (e.g. after a password change)"""
+    # iat has one-second resolution: rounding up also rejects tokens issued
+    # earlier in the current second, at the cost of a login in that same second
+    _revoked_before[email] = math.ceil(time.time())
+
+async def get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Security(api_key_header)
+):
+    """Get current user from JWT token or API key"""
+    if token:
+        return _user_from_token(token)
+    if api_key:
+        return _user_from_api_key(api_key)
+    raise credentials_exception
+
+@router.post("/logout")
+async def logout(
+    token: Optional[str] = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke the current access token"""
+    if token:
+        revoke_token(token)
+    return {"message": "Logged out successfully"}
+
+@router.post("/change-password")
+async def change_password(password_data: PasswordChange, current_user: User = Depends(get_current_user)):
+    """Change the current user's password and sign out every session"""
+    try:
+        if not await authenticate_user(current_user.email, password_data.current_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Current password is incorrect"
+            )
+        hashed_password = await hash_password(password_data.new_password)
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
+    
+    fake_users_db[current_user.email]["password"] = hashed_password
+    revoke_user_tokens(current_user.email)
+    return {"message": "Password changed, please log in again"}
+
+@router.post("/api-keys", response_model=APIKeyCreated)
+async def create_api_key(key_data: APIKeyCreate, current_user: User = Depends(get_current_user)):
+    """Create an API key for machine integrations"""
+    raw_key = "fbk_" + secrets.token_urlsafe(32)
+    record = {
+        "id": secrets.token_hex(8),
+        "name": key_data.name,
+        "prefix": raw_key[:8],
+        "email": current_user.email,
+        "created_at": datetime.now()
+    }
+    fake_api_keys_db[_secret_hash(raw_key)] = record
+    return APIKeyCreated(key=raw_key, **record)
+
+@router.get("/api-keys", response_model=List[APIKey])
+async def list_api_keys(current_user: User = Depends(get_current_user)):
+    """List the current user's API keys"""
+    return [
+        APIKey(**record) for record in fake_api_keys_db.values()
+        if record["email"] == current_user.email
+    ]
+
+@router.delete("/api-keys/{key_id}")
+async def delete_api_key(key_id: str, current_user: User = Depends(get_current_user)):
+    """Revoke an API key"""
+    for key_hash, record in list(fake_api_keys_db.items()):
+        if record["id"] == key_id and record["email"] == current_user.email:
+            del fake_api_keys_db[key_hash]
+            _principal_cache.delete(key_hash)
+            return {"message": "API key revoked", "id": key_id}
+    raise HTTPException(status_code=404, detail="API key not found")
 
 @router.get("/me", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_user)):
+    """Require the current user to be an administrator"""
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required"
+        )
+    return current_user
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
+from app.core.config import settings
 from app.services.ai_service import ai_service
+from app.services.bulk_import import QARowStream
+from app.services.quota_service import quota_service, QuotaExceeded
+from app.api.v1.endpoints.users import current_subscription
 
 router = APIRouter()
 
@@ -50,6 +54,13 @@ class BotResponse(BaseModel):
     confidence: float
     source_url: Optional[str] = None
 
+def is_serving(bot: Bot) -> bool:
+    """Whether the bot answers queries"""
+    # While retraining (or after a failed retrain) the last good index version keeps serving
+    return bot.status == BotStatus.ACTIVE or (
+        bot.status in (BotStatus.TRAINING, BotStatus.ERROR) and bot.last_trained is not None
+    )
+
 # Mock database
 mock_bots = [
     Bot(
@@ -80,6 +91,10 @@ mock_bots = [
     )
 ]
 
+# Rate limits, quotas and inference share of each bot come from the account's plan
+for _bot in mock_bots:
+    quota_service.set_plan(_bot.id, current_subscription["plan"])
+
 @router.get("/", response_model=List[Bot])
 async def get_bots():
     """Get all user's bots"""
@@ -107,6 +122,7 @@ async def create_bot(bot_data: BotCreate):
         created_at=datetime.now()
     )
     mock_bots.append(new_bot)
+    quota_service.set_plan(new_bot.id, current_subscription["plan"])
     return new_bot
 
 @router.put("/{bot_id}", response_model=Bot)
@@ -148,19 +164,19 @@ async def train_bot(bot_id: int, background_tasks: BackgroundTasks):
     bot.status = BotStatus.TRAINING
     
     # Start training in background
-    background_tasks.add_task(train_bot_async, bot_id, bot.website_url)
+    background_tasks.add_task(train_bot_async, bot_id, bot.website_url, bot.language)
     
     return {"message": "Bot training started", "status": "training"}
 
-async def train_bot_async(bot_id: int, website_url: str):
+async def train_bot_async(bot_id: int, website_url: str, language: str = None):
     """Background task to train the bot"""
     try:
         # Initialize AI service if not already done
-        if ai_service.model is None:
+        if not ai_service.initialized:
             await ai_service.initialize_model()
         
         # Train the bot
-        result = await ai_service.train_bot(bot_id, website_url)
+        result = await ai_service.train_bot(bot_id, website_url, language)
         
         # Update bot status
         bot = next((bot for bot in mock_bots if bot.id == bot_id), None)
@@ -177,6 +193,47 @@ async def train_bot_async(bot_id: int, website_url: str):
         if bot:
             bot.status = BotStatus.ERROR
 
+# Content types accepted for a bulk import when no format is given
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl"
+}
+
+@router.post("/{bot_id}/import")
+async def import_bot_qa(bot_id: int, request: Request, format: Optional[str] = None, replace: bool = False):
+    """Import question/answer rows from a CSV or JSONL request body.
+    
+    The body is parsed and embedded batch by batch as it uploads, so files
+    of any size never sit in memory. Rows are appended to the current index
+    unless ``replace`` is set; the result reports rows per second.
+    """
+    bot = next((bot for bot in mock_bots if bot.id == bot_id), None)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or IMPORT_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Pass format=csv or format=jsonl, or a matching Content-Type")
+    try:
+        rows = QARowStream(request.stream(), fmt, settings.IMPORT_MAX_ROW_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not ai_service.initialized:
+        await ai_service.initialize_model()
+    
+    result = await ai_service.import_qa(bot_id, rows, bot.language, replace)
+    if not result['success']:
+        invalid = f" ({rows.invalid} invalid rows)" if rows.invalid else ""
+        raise HTTPException(status_code=400, detail=result['message'] + invalid)
+    
+    bot.status = BotStatus.ACTIVE
+    bot.last_trained = datetime.now()
+    return {**result, **rows.get_stats()}
+
 @router.post("/{bot_id}/query", response_model=BotResponse)
 async def query_bot(bot_id: int, question: str):
     """Query the bot with a question"""
@@ -184,12 +241,21 @@ async def query_bot(bot_id: int, question: str):
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    if bot.status != BotStatus.ACTIVE:
+    if not is_serving(bot):
         raise HTTPException(status_code=400, detail="Bot is not active")
     
+    try:
+        quota_service.check(bot_id)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    
     try:
         # Initialize AI service if not already done
-        if ai_service.model is None:
+        if not ai_service.initialized:
             await ai_service.initialize_model()
         
         # Query the bot using AI service
@@ -217,6 +283,37 @@ async def query_bot(bot_id: int, question: str):
             source_url=bot.website_url
         )
 
+@router.get("/{bot_id}/versions")
+async def get_bot_versions(bot_id: int):
+    """List the bot's retained index versions"""
+    bot = next((bot for bot in mock_bots if bot.id == bot_id), None)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    return {"bot_id": bot_id, "versions": await ai_service.index_versions(bot_id)}
+
+@router.post("/{bot_id}/rollback")
+async def rollback_bot(bot_id: int, version: Optional[int] = None):
+    """Serve an earlier index version, by default the one before the current"""
+    bot = next((bot for bot in mock_bots if bot.id == bot_id), None)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    result = await ai_service.rollback_index(bot_id, version)
+    if not result['success']:
+        raise HTTPException(status_code=400, detail=result['message'])
+    
+    return {"message": result['message'], "version": result['version']}
+
+@router.get("/{bot_id}/usage")
+async def get_bot_usage(bot_id: int):
+    """Get the bot's query usage against its monthly quota"""
+    bot = next((bot for bot in mock_bots if bot.id == bot_id), None)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    
+    return {"bot_id": bot_id, **quota_service.usage(bot_id)}
+
 @router.get("/{bot_id}/analytics")
 async def get_bot_analytics(bot_id: int):
     """Get bot analytics and statistics"""
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from functools import partial
+from typing import Dict, Any, Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.api.v1.endpoints import bots
+from app.services.message_gateway import message_gateway, ChannelAdapter, InboundMessage
+
+router = APIRouter()
+
+# Open connections and answered questions in this worker
+chat_stats = {
+    "websockets": 0,
+    "sse_streams": 0,
+    "questions": 0,
+    "rejected": 0
+}
+
+def _serving_bot(bot_id: int) -> bots.Bot:
+    bot = next((bot for bot in bots.mock_bots if bot.id == bot_id), None)
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    if bots.BotChannel.WEB not in bot.channels or not bots.is_serving(bot):
+        raise HTTPException(status_code=400, detail="Bot is not available for web chat")
+    return bot
+
+class WebChatAdapter(ChannelAdapter):
+    """Hands gateway replies to the WebSocket or SSE request that asked.
+
+    ``reply_to`` is a coroutine function taking the reply.
+    """
+    channel = "web"
+
+    async def deliver(self, message: InboundMessage, reply: Dict[str, Any]):
+        if 'error' not in reply:
+            bot = next((bot for bot in bots.mock_bots if bot.id == message.bot_id), None)
+            if bot:
+                bot.total_queries += 1
+            chat_stats["questions"] += 1
+        elif reply['reason'] in ("rate_limit", "monthly_quota"):
+            chat_stats["rejected"] += 1
+        await message.reply_to(reply)
+
+message_gateway.register_adapter(WebChatAdapter())
+
+def _submit(bot: bots.Bot, question: str, reply_to) -> Optional[Dict[str, Any]]:
+    """Queue a question on the gateway; returns an error reply if it can't be"""
+    question = question.strip()
+    if not question or len(question) > settings.CHAT_MAX_QUESTION_CHARS:
+        return {"error": f"Questions must be 1 to {settings.CHAT_MAX_QUESTION_CHARS} characters"}
+    if not message_gateway.submit(InboundMessage("web", bot.id, None, question, reply_to)):
+        chat_stats["rejected"] += 1
+        return {"error": "Too many questions right now, try again shortly", "retry_after": 1}
+    return None
+
+@router.websocket("/{bot_id}/ws")
+async def chat_websocket(websocket: WebSocket, bot_id: int):
+    """Chat over a WebSocket.
+
+    The client sends {"id": ..., "question": ...} messages and gets
+    {"id": ..., "answer": ...} (or "error") back as soon as each answer is
+    ready, possibly out of order. An idle connection holds no task besides
+    its receive loop, so a worker keeps thousands of them open cheaply.
+    """
+    try:
+        bot = _serving_bot(bot_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    await websocket.accept()
+    chat_stats["websockets"] += 1
+    connection = {"open": True, "in_flight": 0}
+
+    async def reply(message_id, response: Dict[str, Any]):
+        connection["in_flight"] -= 1
+        if connection["open"]:
+            await websocket.send_json({"id": message_id, **response})
+
+    try:
+        while True:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), settings.CHAT_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Idle timeout")
+                break
+
+            try:
+                message = json.loads(raw)
+                message_id, question = message.get("id"), str(message["question"])
+            except (ValueError, KeyError, AttributeError):
+                await websocket.send_json({"error": 'Expected {"id": ..., "question": ...}'})
+                continue
+
+            if connection["in_flight"] >= settings.CHAT_MAX_IN_FLIGHT:
+                chat_stats["rejected"] += 1
+                await websocket.send_json({"id": message_id, "error": "Too many questions in progress"})
+                continue
+
+            error = _submit(bot, question, partial(reply, message_id))
+            if error:
+                await websocket.send_json({"id": message_id, **error})
+            else:
+                connection["in_flight"] += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Answers still queued are dropped on delivery
+        connection["open"] = False
+        chat_stats["websockets"] -= 1
+
+@router.get("/{bot_id}/sse")
+async def chat_sse(bot_id: int, question: str, request: Request):
+    """Server-sent events fallback: one question, answer pushed when ready.
+
+    Stateless per request so it works behind any worker; a comment line is
+    sent every few seconds so proxies keep the stream open meanwhile.
+    """
+    bot = _serving_bot(bot_id)
+    answer = asyncio.get_running_loop().create_future()
+
+    async def resolve(response: Dict[str, Any]):
+        if not answer.done():
+            answer.set_result(response)
+
+    error = _submit(bot, question, resolve)
+    if error:
+        raise HTTPException(status_code=503 if "retry_after" in error else 400, detail=error["error"])
+
+    async def stream():
+        chat_stats["sse_streams"] += 1
+        try:
+            while True:
+                done, _ = await asyncio.wait({answer}, timeout=settings.CHAT_SSE_KEEPALIVE_SECONDS)
+                if done:
+                    break
+                if await request.is_disconnected():
+                    answer.cancel()
+                    return
+                yield ": keepalive\n\n"
+
+            response = answer.result()
+            event = "error" if "error" in response else "answer"
+            yield f"event: {event}\ndata: {json.dumps(response)}\n\n"
+        finally:
+            chat_stats["sse_streams"] -= 1
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def get_chat_stats():
+    """Open chat connections and answered questions in this worker"""
+    return chat_stats
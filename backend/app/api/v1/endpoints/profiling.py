@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from typing import Optional
+from app.services.profiling_service import profiling_service
+from app.api.v1.endpoints.auth import get_current_admin_user, User
+
+router = APIRouter()
+
+class BotProfilingConfig(BaseModel):
+    capture: bool = False
+
+@router.get("/traces")
+async def list_traces(
+    bot_id: Optional[int] = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """List recent profiling traces"""
+    return {"traces": profiling_service.get_traces(bot_id=bot_id, limit=limit)}
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Get a trace with its stage spans and captured profile"""
+    trace = profiling_service.get_trace(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@router.delete("/traces")
+async def clear_traces(current_user: User = Depends(get_current_admin_user)):
+    """Discard all collected traces"""
+    profiling_service.clear()
+    return {"message": "Traces cleared"}
+
+@router.get("/bots")
+async def list_profiled_bots(current_user: User = Depends(get_current_admin_user)):
+    """List bots with profiling enabled"""
+    return {
+        "bots": [
+            {"bot_id": bot_id, "capture": capture}
+            for bot_id, capture in profiling_service.enabled_bots.items()
+        ],
+        "sample_rate": profiling_service.sample_rate
+    }
+
+@router.post("/bots/{bot_id}")
+async def enable_bot_profiling(
+    bot_id: int,
+    config: BotProfilingConfig,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Enable profiling for a bot's training runs and queries"""
+    profiling_service.enable_bot(bot_id, capture=config.capture)
+    return {"message": "Profiling enabled", "bot_id": bot_id, "capture": config.capture}
+
+@router.delete("/bots/{bot_id}")
+async def disable_bot_profiling(bot_id: int, current_user: User = Depends(get_current_admin_user)):
+    """Disable profiling for a bot"""
+    profiling_service.disable_bot(bot_id)
+    return {"message": "Profiling disabled", "bot_id": bot_id}
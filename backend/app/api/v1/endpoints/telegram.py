@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, status
 from pydantic import BaseModel
-from typing import List, Dict, Any
-from app.services.telegram_service import telegram_service
+from typing import List, Dict, Any, Optional
+import hmac
+from app.core.config import settings
+from app.services.telegram_service import telegram_service, TenantTokenInUse, TenantBotLimitReached
 from app.api.v1.endpoints.auth import get_current_user, User
 
 router = APIRouter()
@@ -17,7 +19,9 @@ class TelegramStats(BaseModel):
     active_bots: int
     total_queries: int
     active_users: int
+    active_users_by_window: Dict[str, int] = {}
     bots: List[int]
+    tenant_tokens: int = 0
 
 @router.post("/register")
 async def register_telegram_bot(
@@ -29,12 +33,56 @@ async def register_telegram_bot(
         await telegram_service.register_faq_bot(
             bot_id=config.bot_id,
             bot_name=config.bot_name,
-            bot_token=config.bot_token
+            bot_token=config.bot_token,
+            webhook_url=config.webhook_url
         )
         return {"message": "Telegram bot registered successfully", "bot_id": config.bot_id}
+    except TenantTokenInUse as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except TenantBotLimitReached as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to register bot: {str(e)}")
 
+async def _receive_update(request: Request, secret_header: Optional[str], bot_id: Optional[int] = None):
+    secret = telegram_service.webhook_secret(bot_id) if settings.TELEGRAM_WEBHOOK_SECRET else None
+    if not secret or not secret_header or not hmac.compare_digest(secret_header, secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid webhook secret")
+    
+    if not telegram_service.webhook_mode:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook mode not running")
+    
+    try:
+        data = await request.json()
+        accepted = await telegram_service.enqueue_update(data, bot_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    
+    if not accepted:
+        # Non-2xx makes Telegram redeliver the update later
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Update queue full")
+    
+    return {"ok": True}
+
+@router.post("/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None)
+):
+    """Receive updates pushed by Telegram for the shared bot in webhook mode"""
+    return await _receive_update(request, x_telegram_bot_api_secret_token)
+
+@router.post("/webhook/{bot_id}")
+async def telegram_tenant_webhook(
+    bot_id: int,
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None)
+):
+    """Receive updates pushed by Telegram for a tenant bot's own token"""
+    return await _receive_update(request, x_telegram_bot_api_secret_token, bot_id)
+
 @router.delete("/{bot_id}")
 async def unregister_telegram_bot(
     bot_id: int,
@@ -100,9 +148,14 @@ async def get_telegram_status(current_user: User = Depends(get_current_user)):
         
         return {
             "is_running": is_running,
+            "mode": "webhook" if telegram_service.webhook_mode else "polling",
+            "update_queue_size": telegram_service.update_queue.qsize() if telegram_service.update_queue else 0,
+            "outbox": telegram_service.outbox.get_metrics(),
+            "inline": stats["inline"],
             "active_bots": stats["active_bots"],
             "total_queries": stats["total_queries"],
-            "active_users": stats["active_users"]
+            "active_users": stats["active_users"],
+            "active_users_by_window": stats["active_users_by_window"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
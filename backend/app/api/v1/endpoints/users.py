@@ -2,9 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from app.core.config import settings
+from app.core.plans import get_plan, SUBSCRIPTION_PLANS
+from app.services.quota_service import quota_service
+from app.api.v1.endpoints.auth import get_current_admin_user, User
 
 router = APIRouter()
 
+# Mock subscription of the demo account (replace with real database)
+current_subscription = {
+    "plan": settings.DEFAULT_SUBSCRIPTION_PLAN,
+    "status": "active",
+    "billing_cycle": "monthly",
+    "next_billing_date": "2024-01-01"
+}
+
 class UserProfile(BaseModel):
     id: int
     email: str
@@ -19,6 +31,9 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     organization: Optional[str] = None
 
+class SubscriptionUpdate(BaseModel):
+    plan: str
+
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile():
     """Get user profile information"""
@@ -28,7 +43,7 @@ async def get_user_profile():
         email="admin@example.com",
         full_name="Admin User",
         organization="FAQ Bot SaaS",
-        subscription_plan="professional",
+        subscription_plan=current_subscription["plan"],
         is_active=True,
         created_at=datetime.now(),
         last_login=datetime.now()
@@ -43,7 +58,7 @@ async def update_user_profile(user_update: UserUpdate):
         email="admin@example.com",
         full_name=user_update.full_name or "Admin User",
         organization=user_update.organization or "FAQ Bot SaaS",
-        subscription_plan="professional",
+        subscription_plan=current_subscription["plan"],
         is_active=True,
         created_at=datetime.now(),
         last_login=datetime.now()
@@ -52,16 +67,31 @@ async def update_user_profile(user_update: UserUpdate):
 @router.get("/subscription")
 async def get_subscription_info():
     """Get user subscription information"""
+    plan = get_plan(current_subscription["plan"])
     return {
-        "plan": "professional",
-        "status": "active",
-        "billing_cycle": "monthly",
-        "next_billing_date": "2024-01-01",
+        **current_subscription,
         "features": {
-            "max_websites": 5,
-            "max_queries_per_month": 10000,
+            "max_websites": plan["max_websites"],
+            "max_queries_per_month": plan["max_queries_per_month"],
             "channels": ["telegram", "whatsapp", "web"],
             "analytics": True,
             "api_access": True
         }
     }
+
+@router.put("/subscription")
+async def update_subscription(
+    subscription_update: SubscriptionUpdate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Change the subscription plan; limits of every bot follow right away. Administrators only."""
+    if subscription_update.plan not in SUBSCRIPTION_PLANS:
+        raise HTTPException(status_code=400, detail=f"Unknown plan {subscription_update.plan}")
+    
+    # Imported here, bots reads the current plan from this module
+    from app.api.v1.endpoints.bots import mock_bots
+    
+    current_subscription["plan"] = subscription_update.plan
+    for bot in mock_bots:
+        quota_service.set_plan(bot.id, subscription_update.plan)
+    return await get_subscription_info()
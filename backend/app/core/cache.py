@@ -0,0 +1,85 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """Bounded LRU cache whose entries carry their own expiry time"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] is not None and entry[0] <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Store a value until ``expires_at`` (epoch seconds), capped by the cache TTL"""
+        if self.ttl is not None:
+            ttl_expiry = time.time() + self.ttl
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_MISSING = object()
+
+class ExpiringSet:
+    """Keys kept until their own expiry time and never evicted for space.
+
+    For entries that must not be forgotten early, like revoked tokens: its
+    size is bounded only by how many keys are live at once. Expired keys
+    are dropped as later ones are added.
+    """
+
+    def __init__(self):
+        self._expiry: dict = {}  # key -> expires_at (epoch seconds)
+        self._heap: list = []  # (expires_at, key), earliest first
+
+    def _purge(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expiry.get(key) == expires_at:
+                del self._expiry[key]
+
+    def add(self, key: Hashable, expires_at: float):
+        now = time.time()
+        self._purge(now)
+        if expires_at <= now:
+            return
+        self._expiry[key] = max(expires_at, self._expiry.get(key, expires_at))
+        heapq.heappush(self._heap, (self._expiry[key], key))
+
+    def __contains__(self, key: Hashable) -> bool:
+        expires_at = self._expiry.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self) -> int:
+        self._purge(time.time())
+        return len(self._expiry)
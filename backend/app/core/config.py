@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict
 import os
 
 class Settings(BaseSettings):
@@ -20,17 +20,141 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_SIZE: int = 10000  # verified tokens / API keys kept in memory
+    AUTH_CACHE_TTL_SECONDS: int = 300  # re-verify cached principals at least this often
+    BCRYPT_ROUNDS: int = 12  # changing it rehashes passwords on next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # beyond this /login and /register answer 503
     
     # OpenAI
     OPENAI_API_KEY: str = ""
     
     # Telegram
     TELEGRAM_BOT_TOKEN: str = ""
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org/bot"  # or a local Bot API server
+    TELEGRAM_WEBHOOK_URL: str = ""  # empty -> long polling
+    TELEGRAM_WEBHOOK_SECRET: str = ""
+    TELEGRAM_UPDATE_WORKERS: int = 8
+    TELEGRAM_UPDATE_QUEUE_SIZE: int = 1000
+    TELEGRAM_MAX_TENANT_BOTS: int = 500  # tenant bot tokens served per process
+    TELEGRAM_CONNECTION_POOL_SIZE: int = 64  # shared by all tokens
+    TELEGRAM_POLL_TIMEOUT: int = 30
+    TELEGRAM_TOKEN_RATE_LIMIT: float = 30.0  # API requests per second per token
+    TELEGRAM_OUTBOX_GLOBAL_RATE: float = 25.0  # outbound messages per second per token
+    TELEGRAM_OUTBOX_CHAT_RATE: float = 1.0  # outbound messages per second per chat
+    TELEGRAM_OUTBOX_CHAT_BURST: float = 3.0
+    TELEGRAM_OUTBOX_MAX_QUEUE: int = 10000
+    TELEGRAM_OUTBOX_MAX_CHATS: int = 100000  # per-chat buckets kept in memory
+    TELEGRAM_OUTBOX_MAX_RETRIES: int = 3
+    TELEGRAM_SESSION_BACKEND: str = "memory"  # memory or redis
+    TELEGRAM_SESSION_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    TELEGRAM_SESSION_MAX_USERS: int = 100000
+    TELEGRAM_INLINE_MIN_CHARS: int = 3  # shorter inline queries get no results
+    TELEGRAM_INLINE_DEBOUNCE_MS: int = 300  # per user, queries typed over within this are never answered
+    TELEGRAM_INLINE_BUDGET_MS: int = 1500  # past this a cached prefix answer is sent instead
+    TELEGRAM_INLINE_CACHE_TIME: int = 300  # seconds Telegram may reuse a complete inline answer
+    TELEGRAM_INLINE_CACHE_SIZE: int = 10000  # (bot, query) answers kept in memory
+    TELEGRAM_INLINE_CACHE_TTL_SECONDS: int = 600
     
     # Stripe
     STRIPE_SECRET_KEY: str = ""
     STRIPE_PUBLISHABLE_KEY: str = ""
     
+    # Quotas
+    DEFAULT_SUBSCRIPTION_PLAN: str = "professional"
+    QUOTA_BACKEND: str = "memory"  # memory or redis (shared across workers)
+    QUOTA_STATE_FILE: str = ""  # memory backend: JSON file usage is flushed to
+    QUOTA_FLUSH_INTERVAL_SECONDS: float = 5.0
+    QUOTA_FLUSH_BATCH: int = 500  # flush early once this many queries are pending
+    
+    # Embedding models
+    DEFAULT_LANGUAGE: str = "en"
+    LANGUAGE_MODELS: Dict[str, str] = {"en": "all-MiniLM-L6-v2"}  # languages with a dedicated encoder
+    MULTILINGUAL_EMBEDDING_MODEL: str = "paraphrase-multilingual-MiniLM-L12-v2"  # every other language
+    MODEL_MEMORY_BUDGET_MB: int = 1024  # least recently used models are evicted above this
+    MODEL_RETRY_SECONDS: float = 30.0  # a model that failed to load is retried after this, doubling per failure
+    MODEL_RETRY_MAX_SECONDS: float = 1800.0
+    
+    # Inference
+    INFERENCE_CONCURRENCY: int = 2  # model calls running at once, shared fairly by plan weight
+    INFERENCE_MAX_QUEUED_PER_TENANT: int = 100
+    INFERENCE_BATCH_SIZE: int = 64  # training texts embedded per scheduled job
+    INFERENCE_SOCKET: str = ""  # Unix socket of run_inference_server.py; empty runs inference in-process
+    INFERENCE_POOL_SIZE: int = 8  # connections per client process
+    INFERENCE_TIMEOUT_SECONDS: float = 30.0  # per query; training has no timeout
+    
+    # Site crawl
+    CRAWL_MAX_PAGES: int = 20  # same-site pages fetched per training run
+    CRAWL_CONCURRENCY: int = 4
+    CRAWL_TIMEOUT_SECONDS: float = 30.0
+    BOILERPLATE_MIN_PAGE_RATIO: float = 0.5  # blocks on at least this share of pages are stripped
+    BOILERPLATE_MIN_PAGES: int = 3  # never strip from crawls smaller than this
+    
+    # Passage index
+    CHUNK_TOKENS: int = 128  # words per indexed passage
+    CHUNK_OVERLAP_TOKENS: int = 32
+    CHUNK_MIN_TOKENS: int = 8  # shorter sections are skipped
+    INDEX_DTYPE: str = "float16"  # float16 halves index memory, float32 scores slightly faster
+    SEARCH_TOP_K: int = 5
+    SEARCH_MIN_SCORE: float = 0.35  # passage-level cosine scores run lower than question-question
+    ANSWER_CACHE_SIZE: int = 256  # recent queries remembered per bot; 0 disables the semantic answer cache
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # query-to-query cosine similarity that counts as the same question
+    ANSWER_CACHE_MAX_BOTS: int = 1000
+    INDEX_DIR: str = "data/indexes"  # trained indexes are persisted here; empty keeps them in memory only
+    INDEX_MMAP: bool = True  # memory-map persisted vectors so worker processes share them
+    INDEX_KEEP_VERSIONS: int = 3  # index versions per bot kept for rollback
+    INDEX_PRUNE_GRACE_SECONDS: float = 600.0  # older version files outlive their replacement this long for other processes
+    INVALIDATION_BACKEND: str = "memory"  # "redis" broadcasts retrains/rollbacks to every process via REDIS_URL
+    INVALIDATION_CHANNEL: str = "faqbot:invalidation"
+    
+    # Bulk Q&A import (CSV/JSONL upload)
+    IMPORT_BATCH_ROWS: int = 256  # rows embedded per batch while the upload streams in
+    IMPORT_MAX_ROW_BYTES: int = 65536  # longest accepted row; bounds the parser's buffer
+    
+    # Near-duplicate removal at training time
+    DEDUP_ENABLED: bool = True
+    DEDUP_NUM_PERM: int = 64  # MinHash permutations
+    DEDUP_BANDS: int = 16  # LSH bands; candidates above ~50% shingle overlap
+    DEDUP_JACCARD_THRESHOLD: float = 0.8  # collapsed on text alone, before embedding
+    DEDUP_COSINE_THRESHOLD: float = 0.95  # collapsed after embedding
+    
+    # Re-ranking
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20  # bi-encoder hits passed to the cross-encoder
+    RERANK_BUDGET_MS: float = 150.0  # per request; fewer candidates are scored if needed
+    RERANK_MAX_QUEUE_DEPTH: int = 8  # skip re-ranking while this many inference jobs wait
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_COST_HALF_LIFE_SECONDS: float = 30.0  # an unrefreshed cost estimate halves this often
+    
+    # Server (run.py)
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = 1  # forked after models and indexes are loaded once; more than 1 needs the Redis backends
+    WEB_WORKERS_ALLOW_LOCAL_AUTH: bool = False  # accept per-worker token revocations and API keys with several workers
+    WORKER_MEMORY_LOG_INTERVAL_SECONDS: float = 300.0
+    
+    # Message gateway (questions from every channel)
+    GATEWAY_WORKERS: int = 16  # questions answered at once per process
+    GATEWAY_QUEUE_SIZE: int = 1000  # beyond this channels tell users to retry
+    
+    # Web chat
+    CHAT_MAX_IN_FLIGHT: int = 4  # unanswered questions per WebSocket connection
+    CHAT_IDLE_TIMEOUT_SECONDS: float = 600.0
+    CHAT_MAX_QUESTION_CHARS: int = 1000
+    CHAT_SSE_KEEPALIVE_SECONDS: float = 15.0
+    WS_PER_MESSAGE_DEFLATE: bool = False  # zlib state costs ~100 kB per connection, chat messages are tiny
+    
+    # Admin
+    ADMIN_EMAILS: List[str] = ["admin@example.com"]
+
+    # Profiling
+    PROFILING_HEADER_ENABLED: bool = False  # honour the X-Profile request header
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of operations traced at random
+    PROFILING_MAX_TRACES: int = 200
+    PROFILING_BACKEND: str = "cprofile"  # cprofile or pyinstrument
+    PROFILING_TOP_FUNCTIONS: int = 30
+
     # Environment
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
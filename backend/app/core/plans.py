@@ -0,0 +1,39 @@
+# Subscription plans and the limits enforced for each (see docs/MONETIZATION.md)
+# None means unlimited.
+SUBSCRIPTION_PLANS = {
+    "starter": {
+        "max_websites": 1,
+        "max_queries_per_month": 1000,
+        "queries_per_second": 1.0,
+        "query_burst": 5,
+        "inference_weight": 1,  # share of inference capacity under contention
+        "max_in_flight": 1,
+    },
+    "professional": {
+        "max_websites": 5,
+        "max_queries_per_month": 10000,
+        "queries_per_second": 5.0,
+        "query_burst": 20,
+        "inference_weight": 2,
+        "max_in_flight": 2,
+    },
+    "business": {
+        "max_websites": None,
+        "max_queries_per_month": 50000,
+        "queries_per_second": 20.0,
+        "query_burst": 50,
+        "inference_weight": 4,
+        "max_in_flight": 4,
+    },
+    "enterprise": {
+        "max_websites": None,
+        "max_queries_per_month": None,
+        "queries_per_second": 50.0,
+        "query_burst": 100,
+        "inference_weight": 8,
+        "max_in_flight": 8,
+    },
+}
+
+def get_plan(name: str) -> dict:
+    return SUBSCRIPTION_PLANS.get(name, SUBSCRIPTION_PLANS["starter"])
@@ -0,0 +1,183 @@
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, List
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """RSS/PSS breakdown of a process in kB (Linux only, empty elsewhere)"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                if field in MEMORY_FIELDS:
+                    usage[field] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+# Per-process state that must live in Redis before requests can be spread over workers
+SHARED_BACKENDS = ("QUOTA_BACKEND", "TELEGRAM_SESSION_BACKEND", "INVALIDATION_BACKEND")
+
+# Per-process state with no shared backend yet (the auth endpoint's stores)
+LOCAL_AUTH_STATE = ("users", "API keys", "token revocations")
+
+def unshared_backends() -> List[str]:
+    """Settings still pointing at in-process state"""
+    return [name for name in SHARED_BACKENDS if getattr(settings, name) != "redis"]
+
+class PreforkServer:
+    """Production launcher forking uvicorn workers from a warmed-up master.
+
+    The master imports the app, loads the embedding models and the persisted
+    bot indexes, then forks ``workers`` processes serving one shared socket.
+    Model weights are shared copy-on-write and memory-mapped index vectors
+    through the page cache, instead of every worker importing torch and
+    loading its own copy. Dead workers are replaced; SIGINT/SIGTERM stop all.
+
+    More than one worker is refused while quotas, Telegram sessions or
+    cache invalidation are kept in process: each worker would enforce its
+    own limits and serve stale indexes after a retrain in another worker.
+    It is also refused unless ``WEB_WORKERS_ALLOW_LOCAL_AUTH`` is set,
+    because users, API keys and token revocations are always per worker: a
+    logout or password change revokes the token only in the worker that
+    handled it, and a deleted API key keeps working in the others until
+    their ``AUTH_CACHE_TTL_SECONDS`` cache entry expires.
+    """
+
+    def __init__(self, app, host: str, port: int, workers: int, log_level: str = "info"):
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+        unshared = unshared_backends()
+        if workers > 1 and unshared:
+            raise ValueError(
+                f"{workers} workers need shared state, set {', '.join(unshared)} to redis or run one worker"
+            )
+        if workers > 1 and not settings.WEB_WORKERS_ALLOW_LOCAL_AUTH:
+            raise ValueError(
+                f"{workers} workers would each keep their own {', '.join(LOCAL_AUTH_STATE)}, so logouts, "
+                f"password changes and deleted API keys would not apply in the other workers; "
+                f"run one worker or set WEB_WORKERS_ALLOW_LOCAL_AUTH=true to accept that"
+            )
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.pids: List[int] = []
+        self._stopping = False
+        self._socket = None
+
+    def preload(self):
+        """Load everything workers should share before forking"""
+        from app.services.ai_service import ai_service
+
+        start = time.perf_counter()
+        asyncio.run(ai_service.initialize_model())
+        bots = ai_service.load_indexes()
+        logger.info(f"Preloaded models and {bots} bot indexes in {time.perf_counter() - start:.1f}s")
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # Worker: its own process group so terminal signals reach the master only,
+        # which then shuts workers down gracefully
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            config = uvicorn.Config(
+                self.app,
+                log_level=self.log_level,
+                ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
+            )
+            uvicorn.Server(config).run(sockets=[self._socket])
+        except BaseException:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def log_memory(self):
+        """Log RSS/PSS of the master and every worker"""
+        for role, pid in [("master", os.getpid())] + [("worker", pid) for pid in self.pids]:
+            usage = memory_usage(pid)
+            if not usage:
+                continue
+            shared = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+            logger.info(
+                f"{role} {pid}: rss={usage.get('Rss', 0) / 1024:.0f}MB pss={usage.get('Pss', 0) / 1024:.0f}MB "
+                f"shared={shared / 1024:.0f}MB private={(usage.get('Rss', 0) - shared) / 1024:.0f}MB"
+            )
+
+    def run(self):
+        # Import the app in the master so workers inherit it instead of importing it again
+        self.app = import_from_string(self.app) if isinstance(self.app, str) else self.app
+        self.preload()
+        self._socket = self._bind()
+
+        # Move everything loaded so far out of the collector's reach; gc passes in
+        # the workers would otherwise write to these pages and un-share them
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        self.pids = [self._spawn() for _ in range(self.workers)]
+        logger.info(f"Serving on {self.host}:{self.port} with {self.workers} workers: {self.pids}")
+
+        next_report = time.monotonic() + min(10.0, settings.WORKER_MEMORY_LOG_INTERVAL_SECONDS)
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid:
+                self.pids.remove(pid)
+                if not self._stopping:
+                    logger.warning(f"Worker {pid} exited with status {status}, starting a new one")
+                    time.sleep(1)  # don't spin if workers die on startup
+                    self.pids.append(self._spawn())
+                continue
+
+            if time.monotonic() >= next_report:
+                self.log_memory()
+                next_report = time.monotonic() + settings.WORKER_MEMORY_LOG_INTERVAL_SECONDS
+            time.sleep(0.5)
+
+        self._socket.close()
+        logger.info("All workers stopped")
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# bcrypt for every new hash; plaintext only so legacy records verify once and get rehashed.
+# min and max rounds pinned to the configured cost make any other cost report as needing an
+# update, so lowering BCRYPT_ROUNDS rehashes on next login just like raising it.
+pwd_context = CryptContext(
+    schemes=["bcrypt", "plaintext"],
+    deprecated=["plaintext"],
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so hashing runs in parallel without blocking the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_hashes = 0
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashes are queued; callers should ask the client to retry"""
+
+async def _run_in_executor(func, *args):
+    global _pending_hashes
+    # Shed load instead of letting a login storm build an unbounded backlog
+    if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy()
+
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured bcrypt cost"""
+    return await _run_in_executor(pwd_context.hash, password)
+
+async def verify_password(password: str, stored_hash: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one uses outdated parameters"""
+    return await _run_in_executor(pwd_context.verify_and_update, password, stored_hash)
@@ -1,11 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import uvicorn
 
 # Import routers
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.services.profiling_service import profile_request, PROFILE_HEADER
+from app.services.telegram_service import telegram_service
+from app.services.quota_service import quota_service
+from app.services.invalidation_bus import invalidation_bus
+from app.services.message_gateway import message_gateway
 
 app = FastAPI(
     title="FAQ Bot SaaS API",
@@ -24,9 +28,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request profiling opt-in via the X-Profile header
+async def profiling_header_middleware(request: Request, call_next):
+    header = request.headers.get(PROFILE_HEADER)
+    if not header:
+        return await call_next(request)
+    
+    token = profile_request.set(header)
+    try:
+        return await call_next(request)
+    finally:
+        profile_request.reset(token)
+
+# Only installed when enabled, so normal requests don't pay for the extra middleware layer
+if settings.PROFILING_HEADER_ENABLED:
+    app.middleware("http")(profiling_header_middleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def start_invalidation_bus():
+    # Hear about bots retrained or rolled back by other processes
+    await invalidation_bus.start()
+
+@app.on_event("shutdown")
+async def stop_invalidation_bus():
+    await invalidation_bus.stop()
+
+@app.on_event("startup")
+async def start_telegram_webhook_workers():
+    # In webhook mode every API worker processes the updates it receives
+    if settings.TELEGRAM_WEBHOOK_URL and await telegram_service.initialize():
+        await telegram_service.start_update_workers()
+
+@app.on_event("shutdown")
+async def stop_telegram_webhook_workers():
+    if telegram_service.webhook_mode:
+        await telegram_service.stop_bot()
+
+@app.on_event("shutdown")
+async def stop_message_gateway():
+    await message_gateway.stop()
+
+@app.on_event("shutdown")
+async def flush_query_quotas():
+    await quota_service.stop()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -42,6 +90,7 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -1,117 +1,244 @@
 import asyncio
-import aiohttp
-import json
-from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterable, TYPE_CHECKING
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import re
-from bs4 import BeautifulSoup
+import time
+import zlib
 import logging
 
+from app.core.config import settings
+from app.services.profiling_service import profiling_service
+from app.services.inference_scheduler import inference_scheduler, SchedulerBusy
+from app.services.vector_index import BotIndex
+from app.services.index_store import IndexStore
+from app.services.invalidation_bus import invalidation_bus
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.reranker import reranker
+from app.services.model_registry import model_registry
+from app.services.dedup import NearDuplicateDetector, cosine_of_pairs, collapse_duplicates
+from app.services.crawler import crawl_site
+from app.services.boilerplate import BoilerplateModel
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 logger = logging.getLogger(__name__)
 
+HASHING_EMBEDDER = 'hashing'
+HASHING_DIM = 512
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+BLOCK_TAGS = ['p', 'li', 'dt', 'dd', 'td', 'th', 'pre', 'blockquote', 'figcaption', 'summary']
+
 class AIService:
     def __init__(self):
-        self.model = None
-        self.embeddings_cache = {}
+        self.initialized = False
+        self.index_store = IndexStore(
+            settings.INDEX_DIR, settings.INDEX_KEEP_VERSIONS, settings.INDEX_MMAP, settings.INDEX_PRUNE_GRACE_SECONDS
+        )
+        # Published index version of each bot, swapped atomically on retrain or rollback
+        self.embeddings_cache = self.index_store.current
+        # Bots another process published a new version for: bot_id -> version (None: re-read CURRENT)
+        self._stale_indexes: Dict[int, Optional[int]] = {}
+        invalidation_bus.subscribe(self._on_invalidation)
+        # Per-bot caches of recent query embeddings and their results, least recently used first
+        self.answer_caches: "OrderedDict[int, SemanticAnswerCache]" = OrderedDict()
+        # Model inference runs here so it doesn't block the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.INFERENCE_CONCURRENCY,
+            thread_name_prefix="inference"
+        )
         
     async def initialize_model(self):
-        """Initialize the sentence transformer model"""
-        try:
-            # Use a lightweight model for demo purposes
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        """Load the default language's model; other languages load on first use"""
+        # Bots fall back to keyword embeddings if their model cannot be loaded
+        if await model_registry.get(model_registry.model_for_language(settings.DEFAULT_LANGUAGE)) is not None:
             logger.info("AI model initialized successfully")
+        await reranker.initialize()
+        self.initialized = True
+    
+    def load_indexes(self) -> int:
+        """Load every persisted bot index, memory-mapped so processes share the pages"""
+        return self.index_store.load()
+    
+    def _on_invalidation(self, event: Dict[str, Any]):
+        # Only mark the bot, the index is reloaded on its next query
+        if event['type'] == 'index':
+            current = self.embeddings_cache.get(event['bot_id'])
+            if current is None or current.version != event['version']:
+                self._stale_indexes[event['bot_id']] = event['version']
+        elif event['type'] == 'resync':
+            for bot_id in list(self.embeddings_cache):
+                self._stale_indexes[bot_id] = None
+    
+    async def _refresh_index(self, bot_id: int):
+        """Load the version another process published, if any"""
+        if bot_id not in self._stale_indexes:
+            return
+        version = self._stale_indexes.pop(bot_id)
+        try:
+            index = await self.index_store.refresh(bot_id, version)
+            if index is not None:
+                logger.info(f"Bot {bot_id}: now serving index version {index.version} published by another process")
         except Exception as e:
-            logger.error(f"Failed to initialize AI model: {e}")
-            # Fallback to a simple keyword-based approach
-            self.model = None
+            logger.error(f"Failed to reload index for bot {bot_id}: {e}")
     
-    async def scrape_website_content(self, url: str) -> List[Dict[str, Any]]:
-        """Scrape content from a website and extract Q&A pairs"""
+    async def index_versions(self, bot_id: int) -> List[Dict[str, Any]]:
+        """Retained index versions of a bot"""
+        return self.index_store.versions(bot_id)
+    
+    async def rollback_index(self, bot_id: int, version: Optional[int] = None) -> Dict[str, Any]:
+        """Serve an earlier index version, by default the previous one"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status != 200:
-                        raise Exception(f"Failed to fetch URL: {response.status}")
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Extract text content
-                    content = self._extract_text_content(soup)
-                    
-                    # Generate Q&A pairs from content
-                    qa_pairs = self._generate_qa_pairs(content)
-                    
-                    return qa_pairs
+            index = self.index_store.rollback(bot_id, version)
+        except (KeyError, ValueError) as e:
+            return {'success': False, 'message': str(e)}
+        await invalidation_bus.publish({'type': 'index', 'bot_id': bot_id, 'version': index.version})
+        return {'success': True, 'message': f'Bot now serves index version {index.version}', 'version': index.version}
+    
+    async def scrape_website_content(self, url: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Crawl a website and split its pages into indexable passages.
+        
+        Blocks repeated across many pages of the crawl (navigation, cookie
+        banners, footers) are stripped first. Returns the passages and the
+        boilerplate report.
+        """
+        try:
+            with profiling_service.span("scrape"):
+                pages = await crawl_site(
+                    url,
+                    self._extract_blocks,
+                    max_pages=settings.CRAWL_MAX_PAGES,
+                    concurrency=settings.CRAWL_CONCURRENCY,
+                    timeout=settings.CRAWL_TIMEOUT_SECONDS
+                )
+            if not pages:
+                raise Exception("No HTML pages could be fetched")
+            
+            # CPU-bound over the whole crawl, run off the event loop
+            loop = asyncio.get_running_loop()
+            with profiling_service.span("boilerplate"):
+                pages, report = await loop.run_in_executor(None, self._strip_boilerplate, pages)
+            
+            with profiling_service.span("chunk"):
+                passages = await loop.run_in_executor(None, self._chunk_pages, pages)
+            
+            return passages, report
                     
         except Exception as e:
             logger.error(f"Error scraping website {url}: {e}")
-            return []
+            return [], {}
+    
+    @staticmethod
+    def _strip_boilerplate(pages: List[Tuple[str, List[Tuple[str, str]]]]):
+        """Remove blocks repeated across the crawl; returns the pages and the report"""
+        boilerplate = BoilerplateModel(settings.BOILERPLATE_MIN_PAGE_RATIO, settings.BOILERPLATE_MIN_PAGES)
+        boilerplate.fit([blocks for _, blocks in pages])
+        return [(page_url, boilerplate.strip(blocks)) for page_url, blocks in pages], boilerplate.report()
     
-    def _extract_text_content(self, soup: BeautifulSoup) -> str:
-        """Extract clean text content from HTML"""
+    def _chunk_pages(self, pages: List[Tuple[str, List[Tuple[str, str]]]]) -> List[Dict[str, Any]]:
+        """Split each page's sections into overlapping passages"""
+        passages = []
+        for page_url, blocks in pages:
+            passages.extend(self._chunk_passages(self._build_sections(blocks), page_url))
+        return passages
+    
+    @staticmethod
+    def _extract_blocks(soup: "BeautifulSoup") -> List[Tuple[str, str]]:
+        """Extract (tag, text) heading and text blocks from HTML in document order"""
         # Remove script and style elements
-        for script in soup(["script", "style"]):
+        for script in soup(["script", "style", "noscript"]):
             script.decompose()
         
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        blocks = []
+        for element in soup.find_all(HEADING_TAGS + BLOCK_TAGS):
+            # Nested blocks are covered by the outermost one
+            if element.find_parent(BLOCK_TAGS):
+                continue
+            
+            text = element.get_text(" ", strip=True)
+            if text:
+                blocks.append((element.name, text))
         
-        return text
+        return blocks
     
-    def _generate_qa_pairs(self, content: str) -> List[Dict[str, Any]]:
-        """Generate Q&A pairs from content using simple heuristics"""
-        qa_pairs = []
+    @staticmethod
+    def _build_sections(blocks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Group text blocks into (heading path, text) sections"""
+        sections = []
+        headings = {}  # level -> heading text
+        current_heading = ""
+        current_text = []
+        
+        for tag, text in blocks:
+            if tag in HEADING_TAGS:
+                if current_text:
+                    sections.append((current_heading, " ".join(current_text)))
+                    current_text = []
+                level = int(tag[1])
+                headings = {lvl: h for lvl, h in headings.items() if lvl < level}
+                headings[level] = text
+                current_heading = " > ".join(headings[lvl] for lvl in sorted(headings))
+            else:
+                current_text.append(text)
         
-        # Split content into sentences
-        sentences = re.split(r'[.!?]+', content)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
+        if current_text:
+            sections.append((current_heading, " ".join(current_text)))
+        
+        return sections
+    
+    def _chunk_passages(self, sections: List[Tuple[str, str]], source_url: str) -> List[Dict[str, Any]]:
+        """Split sections into overlapping token windows, keeping the heading as context"""
+        size = settings.CHUNK_TOKENS
+        step = max(1, size - settings.CHUNK_OVERLAP_TOKENS)
+        passages = []
         
-        # Create simple Q&A pairs
-        for i, sentence in enumerate(sentences[:50]):  # Limit to first 50 sentences
-            if len(sentence) > 30:  # Only use substantial sentences
-                # Generate a simple question
-                question = self._generate_question_from_sentence(sentence)
-                if question:
-                    qa_pairs.append({
-                        'question': question,
-                        'answer': sentence,
-                        'confidence': 0.8,  # Default confidence
-                        'source': 'scraped_content'
-                    })
+        for heading, text in sections:
+            tokens = text.split()
+            if len(tokens) < settings.CHUNK_MIN_TOKENS:
+                continue
+            for start in range(0, len(tokens), step):
+                window = tokens[start:start + size]
+                passages.append({
+                    'question': None,
+                    'answer': " ".join(window),
+                    'heading': heading,
+                    'source': source_url
+                })
+                if start + size >= len(tokens):
+                    break  # the tail is covered by this window
         
-        return qa_pairs
+        return passages
     
-    def _generate_question_from_sentence(self, sentence: str) -> Optional[str]:
-        """Generate a simple question from a sentence"""
-        # Simple heuristics to generate questions
-        if 'is' in sentence.lower() or 'are' in sentence.lower():
-            return f"What {sentence.lower().split('is')[0].strip()}?"
-        elif 'can' in sentence.lower():
-            return f"How {sentence.lower().replace('can', 'do you')}?"
-        elif 'will' in sentence.lower():
-            return f"When {sentence.lower().replace('will', 'does')}?"
-        elif 'has' in sentence.lower() or 'have' in sentence.lower():
-            return f"What {sentence.lower().split('has')[0].strip()}?"
-        else:
-            # Generic question
-            return f"Tell me about {sentence.split()[0].lower()}"
+    @staticmethod
+    def _embedding_text(record: Dict[str, Any]) -> str:
+        """Text that represents a record in the index"""
+        if record.get('question'):
+            return record['question']
+        if record.get('heading'):
+            return f"{record['heading']}: {record['answer']}"
+        return record['answer']
     
-    async def create_embeddings(self, texts: List[str]) -> np.ndarray:
+    async def _embedder_for_language(self, language: Optional[str]) -> str:
+        """Model a bot in this language is trained with, or the keyword fallback"""
+        model_name = model_registry.model_for_language(language)
+        if await model_registry.get(model_name) is None:
+            return HASHING_EMBEDDER
+        return model_name
+    
+    async def create_embeddings(self, texts: List[str], model_name: Optional[str] = None) -> np.ndarray:
         """Create embeddings for texts using sentence transformer"""
-        if self.model is None:
+        model_name = model_name or model_registry.model_for_language(settings.DEFAULT_LANGUAGE)
+        model = await model_registry.get(model_name) if model_name != HASHING_EMBEDDER else None
+        if model is None:
             # Fallback to simple keyword matching
             return self._create_simple_embeddings(texts)
         
         try:
-            embeddings = self.model.encode(texts)
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(self._executor, model.encode, texts)
             return embeddings
         except Exception as e:
             logger.error(f"Error creating embeddings: {e}")
@@ -119,100 +246,303 @@ class AIService:
     
     def _create_simple_embeddings(self, texts: List[str]) -> np.ndarray:
         """Create simple keyword-based embeddings as fallback"""
-        # Simple TF-IDF-like approach
-        all_words = set()
-        for text in texts:
-            words = re.findall(r'\b\w+\b', text.lower())
-            all_words.update(words)
+        # Hashed bag of words: fixed dimensions, so vectors from different calls are comparable
+        embeddings = np.zeros((len(texts), HASHING_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\b\w+\b', text.lower()):
+                embeddings[row, zlib.crc32(word.encode()) % HASHING_DIM] += 1
         
-        word_to_idx = {word: i for i, word in enumerate(all_words)}
-        embeddings = []
+        return embeddings
+    
+    async def _embed_query(self, index: BotIndex, question: str) -> np.ndarray:
+        # The query must be embedded the same way as the index it is searched against
+        if index.embedder == HASHING_EMBEDDER:
+            return self._create_simple_embeddings([question])
+        if await model_registry.get(index.embedder) is None:
+            raise ValueError(f"Embedding model {index.embedder} is unavailable")
+        return await self.create_embeddings([question], index.embedder)
+    
+    def _answer_cache(self, bot_id: int, index: BotIndex) -> Optional[SemanticAnswerCache]:
+        """The bot's answer cache, emptied if it was filled from another index version"""
+        if not settings.ANSWER_CACHE_SIZE:
+            return None
         
-        for text in texts:
-            words = re.findall(r'\b\w+\b', text.lower())
-            embedding = [0] * len(all_words)
-            for word in words:
-                if word in word_to_idx:
-                    embedding[word_to_idx[word]] += 1
-            embeddings.append(embedding)
+        cache = self.answer_caches.get(bot_id)
+        if cache is None or cache.dim != index.dim:
+            cache = SemanticAnswerCache(index.dim, settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_THRESHOLD)
+            self.answer_caches[bot_id] = cache
+            if len(self.answer_caches) > settings.ANSWER_CACHE_MAX_BOTS:
+                self.answer_caches.popitem(last=False)
+        self.answer_caches.move_to_end(bot_id)
         
-        return np.array(embeddings)
+        # Retrain, rollback or a reload published by another process all change the version
+        if cache.index_version != index.version:
+            cache.reset(index.version)
+        return cache
     
-    async def find_similar_questions(self, query: str, qa_pairs: List[Dict[str, Any]], 
-                                   threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Find similar questions using semantic search"""
-        if not qa_pairs:
-            return []
+    def get_answer_cache_stats(self) -> Dict[str, Any]:
+        hits = sum(cache.hits for cache in self.answer_caches.values())
+        misses = sum(cache.misses for cache in self.answer_caches.values())
+        return {
+            'bots': len(self.answer_caches),
+            'entries': sum(cache.size for cache in self.answer_caches.values()),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None
+        }
+    
+    async def search(self, bot_id: int, question: str, top_k: int = None) -> List[Dict[str, Any]]:
+        """Find the passages that best answer a question"""
+        index = self.embeddings_cache[bot_id]
+        
+        with profiling_service.span("embed"):
+            query_embedding = await self._embed_query(index, question)
         
-        # Extract questions and answers
-        questions = [qa['question'] for qa in qa_pairs]
-        answers = [qa['answer'] for qa in qa_pairs]
+        top_k = top_k or settings.SEARCH_TOP_K
         
-        # Create embeddings
-        query_embedding = await self.create_embeddings([query])
-        question_embeddings = await self.create_embeddings(questions)
+        # A paraphrase of a recent question reuses its results, skipping search and re-ranking
+        cache = self._answer_cache(bot_id, index) if top_k == settings.SEARCH_TOP_K else None
+        if cache is not None:
+            query_vector = BotIndex.normalize(query_embedding)[0]
+            cached = cache.lookup(query_vector)
+            if cached is not None:
+                return cached
         
-        # Calculate similarities
-        similarities = cosine_similarity(query_embedding, question_embeddings)[0]
+        # Over-fetch candidates for the cross-encoder to re-order
+        candidates = max(top_k, settings.RERANK_CANDIDATES) if reranker.enabled else top_k
         
-        # Find similar questions above threshold
-        similar_indices = np.where(similarities >= threshold)[0]
+        with profiling_service.span("search"):
+            hits = index.search(query_embedding, candidates, settings.SEARCH_MIN_SCORE)
         
-        results = []
-        for idx in similar_indices:
-            results.append({
-                'question': questions[idx],
-                'answer': answers[idx],
-                'confidence': float(similarities[idx]),
-                'source': qa_pairs[idx].get('source', 'unknown')
-            })
+        results = [{**index.records[row], 'confidence': score} for row, score in hits]
         
-        # Sort by confidence
-        results.sort(key=lambda x: x['confidence'], reverse=True)
+        with profiling_service.span("rerank"):
+            results = await reranker.rerank(question, results, self._executor)
         
+        results = results[:top_k]
+        if cache is not None and results:
+            cache.add(query_vector, results)
         return results
     
-    async def train_bot(self, bot_id: int, website_url: str) -> Dict[str, Any]:
+    def _dedup_texts(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Keep mask after collapsing near-identical texts (MinHash/LSH).
+        
+        Also returns the remaining candidate pairs, remapped to the kept rows,
+        for the embedding similarity check.
+        """
+        if not settings.DEDUP_ENABLED or len(texts) < 2:
+            return np.ones(len(texts), dtype=bool), np.empty((0, 2), dtype=np.int64)
+        
+        detector = NearDuplicateDetector(settings.DEDUP_NUM_PERM, settings.DEDUP_BANDS)
+        signatures = detector.signatures(texts)
+        pairs = detector.candidate_pairs(signatures)
+        similarity = detector.estimate_jaccard(signatures, pairs)
+        
+        keep = collapse_duplicates(len(texts), pairs[similarity >= settings.DEDUP_JACCARD_THRESHOLD])
+        
+        remaining = pairs[(similarity < settings.DEDUP_JACCARD_THRESHOLD) & keep[pairs[:, 0]] & keep[pairs[:, 1]]]
+        new_rows = np.cumsum(keep) - 1
+        return keep, new_rows[remaining]
+    
+    def _dedup_embeddings(self, embeddings: np.ndarray, candidate_pairs: np.ndarray) -> np.ndarray:
+        """Keep mask after collapsing candidate pairs with near-identical embeddings"""
+        if len(candidate_pairs) == 0:
+            return np.ones(len(embeddings), dtype=bool)
+        similarity = cosine_of_pairs(embeddings, candidate_pairs)
+        return collapse_duplicates(len(embeddings), candidate_pairs[similarity >= settings.DEDUP_COSINE_THRESHOLD])
+    
+    async def _embed_for_tenant(self, tenant, texts: List[str], model_name: str) -> np.ndarray:
+        """Embed texts in batches, each scheduled fairly against other tenants' work"""
+        batch_size = settings.INFERENCE_BATCH_SIZE
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            async with inference_scheduler.slot(tenant, cost=len(batch) / batch_size):
+                batches.append(await self.create_embeddings(batch, model_name))
+        return np.vstack(batches)
+    
+    async def train_bot(self, bot_id: int, website_url: str, language: Optional[str] = None) -> Dict[str, Any]:
         """Train a bot by scraping content and creating embeddings"""
+        with profiling_service.trace("train", bot_id):
+            return await self._train_bot(bot_id, website_url, language)
+    
+    async def _train_bot(self, bot_id: int, website_url: str, language: Optional[str]) -> Dict[str, Any]:
         try:
             # Scrape content from website
-            qa_pairs = await self.scrape_website_content(website_url)
+            passages, boilerplate = await self.scrape_website_content(website_url)
             
-            if not qa_pairs:
+            if not passages:
                 return {
                     'success': False,
-                    'message': 'No content found on the website',
-                    'qa_pairs': []
+                    'message': 'No content found on the website'
                 }
             
-            # Create embeddings for all Q&A pairs
-            questions = [qa['question'] for qa in qa_pairs]
-            embeddings = await self.create_embeddings(questions)
+            # Drop passages whose text is a near-duplicate of an earlier one before paying to embed them
+            texts = [self._embedding_text(passage) for passage in passages]
+            total_passages = len(passages)
+            loop = asyncio.get_running_loop()
+            with profiling_service.span("dedup"):
+                keep, candidate_pairs = await loop.run_in_executor(None, self._dedup_texts, texts)
+                passages = [p for p, k in zip(passages, keep) if k]
+                texts = [t for t, k in zip(texts, keep) if k]
+            
+            # Create embeddings for all passages with the bot language's model
+            with profiling_service.span("embed"):
+                embedder = await self._embedder_for_language(language)
+                embeddings = await self._embed_for_tenant(bot_id, texts, embedder)
+            
+            # Then collapse pairs that read differently but mean the same
+            with profiling_service.span("dedup"):
+                keep = await loop.run_in_executor(None, self._dedup_embeddings, embeddings, candidate_pairs)
+                embeddings = embeddings[keep]
+                passages = [p for p, k in zip(passages, keep) if k]
             
             # Store embeddings (in a real app, this would be stored in a database)
-            self.embeddings_cache[bot_id] = {
-                'qa_pairs': qa_pairs,
-                'embeddings': embeddings,
-                'questions': questions
-            }
+            with profiling_service.span("index"):
+                index = BotIndex(embeddings.shape[1], embedder, capacity=len(passages))
+                index.add(embeddings, passages)
+                # Queries keep using the previous version until this swap
+                index = await self.index_store.publish(bot_id, index)
+            await invalidation_bus.publish({'type': 'index', 'bot_id': bot_id, 'version': index.version})
+            
+            if boilerplate.get('chars_removed'):
+                logger.info(
+                    f"Bot {bot_id}: stripped {boilerplate['blocks_removed']} boilerplate blocks "
+                    f"across {boilerplate['pages']} pages ({boilerplate['text_reduction']:.0%} of the text)"
+                )
+            
+            removed = total_passages - len(passages)
+            if removed:
+                logger.info(
+                    f"Bot {bot_id}: removed {removed} of {total_passages} near-duplicate passages "
+                    f"({removed / total_passages:.0%} smaller index and search)"
+                )
             
             return {
                 'success': True,
-                'message': f'Bot trained successfully with {len(qa_pairs)} Q&A pairs',
-                'qa_pairs': qa_pairs,
-                'total_pairs': len(qa_pairs)
+                'message': f'Bot trained successfully with {len(passages)} passages',
+                'total_pairs': len(passages),
+                'index_bytes': index.nbytes,
+                'index_version': index.version,
+                'embedding_model': embedder,
+                'boilerplate': boilerplate,
+                'dedup': {
+                    'passages_scraped': total_passages,
+                    'duplicates_removed': removed,
+                    'index_bytes_saved': removed * index.dim * index.dtype.itemsize
+                }
             }
             
         except Exception as e:
             logger.error(f"Error training bot {bot_id}: {e}")
             return {
                 'success': False,
-                'message': f'Training failed: {str(e)}',
-                'qa_pairs': []
+                'message': f'Training failed: {str(e)}'
             }
     
+    async def import_qa(self, bot_id: int, rows: AsyncIterable[Dict[str, Any]],
+                        language: Optional[str] = None, replace: bool = False) -> Dict[str, Any]:
+        """Add uploaded question/answer rows to a bot's index as they arrive"""
+        with profiling_service.trace("import", bot_id):
+            return await self._import_qa(bot_id, rows, language, replace)
+    
+    async def _import_qa(self, bot_id: int, rows: AsyncIterable[Dict[str, Any]],
+                         language: Optional[str], replace: bool) -> Dict[str, Any]:
+        started = time.monotonic()
+        pending = None  # (embedding task, records) of the batch being embedded
+        try:
+            await self._refresh_index(bot_id)
+            base = None if replace else self.embeddings_cache.get(bot_id)
+            # Appended rows must live in the same vector space as the existing ones
+            embedder = base.embedder if base is not None else await self._embedder_for_language(language)
+            index = None
+            seen = set()
+            if base is not None:
+                index = BotIndex(base.dim, embedder, capacity=len(base) + settings.IMPORT_BATCH_ROWS)
+                index.add(base.vectors, base.records)
+                seen.update(question.lower() for question in base.records.column('question') if question)
+            
+            imported = duplicates = 0
+            
+            async def add(batch):
+                nonlocal index, imported
+                task, records = batch
+                embeddings = await task
+                if index is None:
+                    index = BotIndex(embeddings.shape[1], embedder, capacity=settings.IMPORT_BATCH_ROWS)
+                index.add(embeddings, records)
+                previous, imported = imported, imported + len(records)
+                if imported // 10000 > previous // 10000:
+                    logger.info(f"Bot {bot_id}: imported {imported} rows "
+                                f"({imported / (time.monotonic() - started):.0f} rows/s)")
+            
+            batch = []
+            async for row in rows:
+                key = row['question'].lower()
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                batch.append({'question': row['question'], 'answer': row['answer'],
+                              'heading': None, 'source': row.get('source_url')})
+                if len(batch) >= settings.IMPORT_BATCH_ROWS:
+                    # Embed this batch while the next one is parsed, at most one waits in memory
+                    if pending is not None:
+                        await add(pending)
+                    texts = [self._embedding_text(record) for record in batch]
+                    pending = (asyncio.create_task(self._embed_for_tenant(bot_id, texts, embedder)), batch)
+                    batch = []
+            
+            if pending is not None:
+                await add(pending)
+                pending = None
+            if batch:
+                texts = [self._embedding_text(record) for record in batch]
+                await add((self._embed_for_tenant(bot_id, texts, embedder), batch))
+            
+            seconds = time.monotonic() - started
+            report = {
+                'imported': imported,
+                'duplicates': duplicates,
+                'seconds': round(seconds, 2),
+                'rows_per_second': round(imported / seconds, 1) if seconds else None
+            }
+            if not imported:
+                return {'success': False, 'message': 'No new question/answer rows to import', **report}
+            
+            with profiling_service.span("index"):
+                index = await self.index_store.publish(bot_id, index)
+            await invalidation_bus.publish({'type': 'index', 'bot_id': bot_id, 'version': index.version})
+            logger.info(f"Bot {bot_id}: imported {imported} rows in {seconds:.1f}s "
+                        f"({report['rows_per_second']} rows/s), index version {index.version}")
+            
+            return {
+                'success': True,
+                'message': f'Imported {imported} question/answer pairs',
+                'total_pairs': len(index),
+                'index_version': index.version,
+                'embedding_model': embedder,
+                **report
+            }
+        
+        except Exception as e:
+            logger.error(f"Error importing Q&A rows for bot {bot_id}: {e}")
+            return {
+                'success': False,
+                'message': f'Import failed: {str(e)}'
+            }
+        finally:
+            if pending is not None:
+                pending[0].cancel()
+    
     async def query_bot(self, bot_id: int, question: str) -> Dict[str, Any]:
         """Query a trained bot"""
+        with profiling_service.trace("query", bot_id):
+            return await self._query_bot(bot_id, question)
+    
+    async def _query_bot(self, bot_id: int, question: str) -> Dict[str, Any]:
+        await self._refresh_index(bot_id)
+        
         if bot_id not in self.embeddings_cache:
             return {
                 'success': False,
@@ -221,13 +551,11 @@ class AIService:
             }
         
         try:
-            bot_data = self.embeddings_cache[bot_id]
-            qa_pairs = bot_data['qa_pairs']
+            # Find the best matching passages
+            async with inference_scheduler.slot(bot_id):
+                matches = await self.search(bot_id, question)
             
-            # Find similar questions
-            similar_questions = await self.find_similar_questions(question, qa_pairs)
-            
-            if not similar_questions:
+            if not matches:
                 return {
                     'success': True,
                     'answer': 'I apologize, but I couldn\'t find a relevant answer to your question. Please try rephrasing your question or contact support for assistance.',
@@ -236,15 +564,21 @@ class AIService:
                 }
             
             # Return the best match
-            best_match = similar_questions[0]
+            best_match = matches[0]
             
             return {
                 'success': True,
                 'answer': best_match['answer'],
                 'confidence': best_match['confidence'],
-                'source_url': best_match.get('source', 'unknown')
+                'source_url': best_match.get('source')
             }
             
+        except SchedulerBusy:
+            return {
+                'success': False,
+                'message': 'Too many queries in progress for this bot',
+                'answer': 'The bot is busy right now. Please try again in a moment.'
+            }
         except Exception as e:
             logger.error(f"Error querying bot {bot_id}: {e}")
             return {
@@ -253,5 +587,10 @@ class AIService:
                 'answer': 'An error occurred while processing your question.'
             }
 
-# Global AI service instance
-ai_service = AIService()
+# Global AI service instance; with INFERENCE_SOCKET set, models and indexes live in the
+# shared inference server (run_inference_server.py) and calls are forwarded there
+if settings.INFERENCE_SOCKET:
+    from app.services.inference_client import RemoteAIService
+    ai_service = RemoteAIService(settings.INFERENCE_SOCKET)
+else:
+    ai_service = AIService()
@@ -0,0 +1,48 @@
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+class SemanticAnswerCache:
+    """Recent query embeddings of one bot and the search results they resolved to.
+
+    A ring buffer of normalized float16 vectors; a lookup is one dot product
+    against at most ``capacity`` rows, far cheaper than searching the full
+    index and re-ranking. A new query within ``threshold`` cosine similarity
+    of a cached one reuses its results. The cache belongs to one index
+    version and is cleared when the bot serves a different one.
+    """
+
+    def __init__(self, dim: int, capacity: int, threshold: float):
+        self.dim = dim
+        self.threshold = threshold
+        self.index_version = None
+        self._vectors = np.zeros((capacity, dim), dtype=np.float16)
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * capacity
+        self._next = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, index_version: int):
+        self.index_version = index_version
+        self._results = [None] * len(self._results)
+        self._next = 0
+        self.size = 0
+
+    def lookup(self, query_vector: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+        """Cached results of the most similar earlier query within the radius"""
+        if self.size:
+            scores = self._vectors[:self.size].astype(np.float32) @ query_vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.hits += 1
+                return self._results[best]
+        self.misses += 1
+        return None
+
+    def add(self, query_vector: np.ndarray, results: List[Dict[str, Any]]):
+        # Overwrite the oldest entry once full
+        self._vectors[self._next] = query_vector
+        self._results[self._next] = results
+        self._next = (self._next + 1) % len(self._results)
+        self.size = min(self.size + 1, len(self._results))
@@ -0,0 +1,60 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+# (tag name, text) blocks of one page in document order
+PageBlocks = List[Tuple[str, str]]
+
+class BoilerplateModel:
+    """Site-level model of DOM blocks repeated across the pages of a crawl.
+
+    Every block is fingerprinted by its text with case and whitespace folded.
+    A block found on at least ``min_page_ratio`` of the pages, and on at least
+    ``min_pages`` pages, is navigation, a banner or a footer rather than page
+    content.
+    """
+
+    def __init__(self, min_page_ratio: float, min_pages: int):
+        self.min_page_ratio = min_page_ratio
+        self.min_pages = min_pages
+        self.boilerplate = set()
+        self.stats = {'pages': 0, 'blocks': 0, 'blocks_removed': 0, 'chars': 0, 'chars_removed': 0}
+
+    @staticmethod
+    def fingerprint(text: str) -> int:
+        normalized = re.sub(r'\s+', ' ', text.lower()).strip()
+        return zlib.crc32(normalized.encode())
+
+    def fit(self, pages: List[PageBlocks]) -> "BoilerplateModel":
+        """Learn the blocks repeated across pages"""
+        page_counts = Counter()
+        for blocks in pages:
+            # Count pages, not occurrences, a block repeated on one page is still content
+            page_counts.update({self.fingerprint(text) for _, text in blocks})
+
+        threshold = max(self.min_pages, self.min_page_ratio * len(pages))
+        self.boilerplate = {fp for fp, count in page_counts.items() if count >= threshold}
+        self.stats['pages'] = len(pages)
+        return self
+
+    def strip(self, blocks: PageBlocks) -> PageBlocks:
+        """Drop a page's boilerplate blocks"""
+        kept = []
+        for tag, text in blocks:
+            self.stats['blocks'] += 1
+            self.stats['chars'] += len(text)
+            if self.fingerprint(text) in self.boilerplate:
+                self.stats['blocks_removed'] += 1
+                self.stats['chars_removed'] += len(text)
+                continue
+            kept.append((tag, text))
+        return kept
+
+    def report(self) -> Dict[str, Any]:
+        chars = self.stats['chars']
+        return {
+            **self.stats,
+            'boilerplate_blocks': len(self.boilerplate),
+            'text_reduction': round(self.stats['chars_removed'] / chars, 3) if chars else 0.0
+        }
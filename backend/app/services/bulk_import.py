@@ -0,0 +1,159 @@
+import asyncio
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Any, List, Optional
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Header names accepted for each field, compared case-insensitively
+COLUMN_ALIASES = {
+    'question': ('question', 'q'),
+    'answer': ('answer', 'a'),
+    'source_url': ('source_url', 'url', 'source')
+}
+
+# Per-row problems reported back to the uploader
+MAX_REPORTED_ERRORS = 10
+
+class QARowStream:
+    """Q&A rows parsed incrementally from an uploaded CSV or JSONL body.
+
+    Only the current chunk and one unfinished row are held in memory: the
+    byte stream is decoded incrementally, complete lines are split off and
+    parsed, and the partial tail waits for the next chunk. A CSV record may
+    span lines inside quotes; it is complete once its quote count is even.
+    Invalid rows are counted and skipped rather than failing the import.
+    Each chunk is split and parsed in the default executor, off the event loop.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], fmt: str, max_row_bytes: int):
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format {fmt!r}, expected one of {', '.join(IMPORT_FORMATS)}")
+        self.chunks = chunks
+        self.fmt = fmt
+        self.max_row_bytes = max_row_bytes
+        self.rows_read = 0
+        self.invalid = 0
+        self.bytes_read = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._columns: Optional[Dict[str, int]] = None
+
+    def _invalid(self, error: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': self.rows_read, 'error': error})
+
+    def _row(self, question: Any, answer: Any, source_url: Any = None) -> Optional[Dict[str, Any]]:
+        question = question.strip() if isinstance(question, str) else ""
+        answer = answer.strip() if isinstance(answer, str) else ""
+        if not question or not answer:
+            self._invalid("question and answer are required")
+            return None
+        return {
+            'question': question,
+            'answer': answer,
+            'source_url': (source_url.strip() or None) if isinstance(source_url, str) else None
+        }
+
+    def _header(self, names: List[str]):
+        names = [name.strip().lower() for name in names]
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            column = next((names.index(alias) for alias in aliases if alias in names), None)
+            if column is not None:
+                columns[field] = column
+        if 'question' not in columns or 'answer' not in columns:
+            raise ValueError("CSV header must name a question and an answer column")
+        self._columns = columns
+
+    def _parse_csv(self, records: List[str]):
+        for fields in csv.reader(records):
+            if not any(fields):
+                continue
+            if self._columns is None:
+                self._header(fields)
+                continue
+            self.rows_read += 1
+            values = {field: fields[column] if column < len(fields) else None
+                      for field, column in self._columns.items()}
+            row = self._row(values['question'], values['answer'], values.get('source_url'))
+            if row:
+                yield row
+
+    def _parse_jsonl(self, lines: List[str]):
+        for line in lines:
+            if not line.strip():
+                continue
+            self.rows_read += 1
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                self._invalid(f"invalid JSON: {e}")
+                continue
+            if not isinstance(data, dict):
+                self._invalid("expected a JSON object")
+                continue
+            row = self._row(data.get('question'), data.get('answer'), data.get('source_url'))
+            if row:
+                yield row
+
+    def _split(self, pending: str, final: bool):
+        """Complete records at the front of ``pending`` and the unfinished rest"""
+        lines = pending.split("\n")
+        tail = "" if final else lines.pop()
+        if self.fmt == "jsonl":
+            return lines, tail
+
+        records, record, quotes = [], [], 0
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                records.append("\n".join(record))
+                record, quotes = [], 0
+        if record:
+            # Still inside a quoted field, wait for the closing quote
+            tail = "\n".join(record + [tail]) if not final else ""
+            if final:
+                self.rows_read += 1
+                self._invalid("unterminated quoted field")
+        return records, tail
+
+    def _parse_chunk(self, pending: str, final: bool):
+        """Rows completed by the decoded text so far, and the unfinished rest"""
+        parse = self._parse_csv if self.fmt == "csv" else self._parse_jsonl
+        complete, pending = self._split(pending, final)
+        return list(parse(complete)), pending
+
+    async def __aiter__(self):
+        decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        loop = asyncio.get_running_loop()
+        pending = ""
+        async for chunk in self.chunks:
+            self.bytes_read += len(chunk)
+            pending += decoder.decode(chunk)
+            if "\n" not in pending:
+                if len(pending) > self.max_row_bytes:
+                    raise ValueError(f"Row {self.rows_read + 1} is longer than {self.max_row_bytes} bytes")
+                continue
+            rows, pending = await loop.run_in_executor(None, self._parse_chunk, pending, False)
+            if len(pending) > self.max_row_bytes:
+                raise ValueError(f"Row {self.rows_read + 1} is longer than {self.max_row_bytes} bytes")
+            for row in rows:
+                yield row
+
+        pending += decoder.decode(b"", final=True)
+        rows, _ = await loop.run_in_executor(None, self._parse_chunk, pending, True)
+        for row in rows:
+            yield row
+        if self.fmt == "csv" and self._columns is None:
+            raise ValueError("Empty CSV upload")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rows_read': self.rows_read,
+            'invalid': self.invalid,
+            'bytes_read': self.bytes_read,
+            'errors': self.errors
+        }
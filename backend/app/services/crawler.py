@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Callable, List, Tuple, Any, TYPE_CHECKING
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from app.services.profiling_service import profiling_service
+
+if TYPE_CHECKING:
+    import aiohttp
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx',
+    '.xls', '.xlsx', '.ppt', '.pptx', '.mp3', '.mp4', '.css', '.js', '.xml', '.ico'
+)
+
+def _same_site_links(soup: "BeautifulSoup", page_url: str, netloc: str) -> List[str]:
+    links = []
+    for anchor in soup.find_all('a', href=True):
+        url, _ = urldefrag(urljoin(page_url, anchor['href']))
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc != netloc:
+            continue
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            continue
+        links.append(url)
+    return links
+
+def _parse_page(html: str, page_url: str, netloc: str,
+                extract: Callable[["BeautifulSoup"], Any]) -> Tuple[List[str], Any]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    return _same_site_links(soup, page_url, netloc), extract(soup)
+
+async def crawl_site(start_url: str, extract: Callable[["BeautifulSoup"], Any],
+                     max_pages: int, concurrency: int, timeout: float) -> List[Tuple[str, Any]]:
+    """Breadth-first crawl of same-site HTML pages starting at ``start_url``.
+
+    Each page is parsed once, in the default executor so a large page doesn't
+    stall the event loop: links are collected, then ``extract`` turns the
+    soup into whatever the caller keeps, so whole documents are never held.
+    Returns (url, extracted) pairs in discovery order.
+    """
+    # Only training crawls, API and bot processes never load the HTTP client and parser
+    import aiohttp
+
+    netloc = urlparse(start_url).netloc
+    seen = {urldefrag(start_url)[0]}
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait(urldefrag(start_url)[0])
+    pages = []
+    loop = asyncio.get_running_loop()
+
+    async def fetch(session: "aiohttp.ClientSession", url: str):
+        async with session.get(url, timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Failed to fetch URL: {response.status}")
+            if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return None
+            return await response.text()
+
+    async def worker(session: "aiohttp.ClientSession"):
+        while True:
+            url = await queue.get()
+            try:
+                if len(pages) >= max_pages:
+                    continue
+                try:
+                    html = await fetch(session, url)
+                except Exception as e:
+                    logger.warning(f"Skipping {url}: {e}")
+                    continue
+                if html is None:
+                    continue
+
+                with profiling_service.span("parse"):
+                    links, extracted = await loop.run_in_executor(None, _parse_page, html, url, netloc, extract)
+                pages.append((url, extracted))
+
+                for link in links:
+                    if link not in seen and len(seen) < max_pages * 10:
+                        seen.add(link)
+                        queue.put_nowait(link)
+            finally:
+                queue.task_done()
+
+    async with aiohttp.ClientSession() as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    return pages[:max_pages]
@@ -0,0 +1,95 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+
+# Largest prime below 2**32; with 32-bit hashes and coefficients a*x + b fits in uint64
+_MERSENNE_PRIME = np.uint64(4294967291)
+
+class NearDuplicateDetector:
+    """MinHash signatures over word shingles with LSH banding.
+
+    Texts whose signatures agree on every row of at least one band land in
+    the same bucket and become candidate pairs; the fraction of equal
+    signature values estimates their Jaccard similarity.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)[:, None]
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = re.findall(r'\w+', text.lower())
+        k = self.shingle_size
+        if len(words) <= k:
+            grams = {" ".join(words)}
+        else:
+            grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for row, text in enumerate(texts):
+            shingles = self._shingles(text)[None, :]
+            signatures[row] = ((self._a * shingles + self._b) % _MERSENNE_PRIME).min(axis=1)
+        return signatures
+
+    def candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """Pairs (i, j), i < j, sharing at least one LSH bucket"""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            band_rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for row, key in enumerate(band_rows):
+                buckets[key.tobytes()].append(row)
+            for members in buckets.values():
+                # Pair every member with the first one only; clusters stay connected
+                # without the quadratic blow-up of repeated boilerplate
+                first = members[0]
+                pairs.update((first, other) for other in members[1:])
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.array(sorted(pairs), dtype=np.int64)
+
+    @staticmethod
+    def estimate_jaccard(signatures: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+        if len(pairs) == 0:
+            return np.empty(0)
+        return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+def cosine_of_pairs(embeddings: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each candidate pair, computed for the pairs only"""
+    if len(pairs) == 0:
+        return np.empty(0)
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    dots = np.einsum('ij,ij->i', vectors[pairs[:, 0]], vectors[pairs[:, 1]])
+    return dots / (norms[pairs[:, 0]] * norms[pairs[:, 1]])
+
+def collapse_duplicates(count: int, pairs: np.ndarray) -> np.ndarray:
+    """Keep mask with one representative (the earliest row) per duplicate cluster"""
+    parent = list(range(count))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The smaller index stays the representative
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return np.array([find(i) == i for i in range(count)], dtype=bool)
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from app.services.vector_index import BotIndex
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+_VERSION_DIR = re.compile(r"^v(\d+)$")
+
+class IndexStore:
+    """Versioned snapshots of every bot's index.
+
+    A retrain builds a new version off to the side while queries keep using
+    ``current[bot_id]``; publishing warms the new version and then swaps that
+    single reference, so in-flight queries finish on the version they started
+    with. The last ``keep`` versions stay loaded (memory-mapped when persisted)
+    for instant rollback. On disk each version is ``<root>/<bot>/v<n>/`` and
+    ``CURRENT`` names the published one. Files of versions no longer retained
+    are deleted ``prune_grace`` seconds after their successor was written, as
+    other processes may still be loading or serving them until they switch.
+    """
+
+    def __init__(self, root: str, keep: int, mmap: bool, prune_grace: float = 0.0):
+        self.root = root
+        self.keep = max(1, keep)
+        self.mmap = mmap
+        self.prune_grace = prune_grace
+        self.current: Dict[int, BotIndex] = {}
+        self._history: Dict[int, "OrderedDict[int, BotIndex]"] = {}
+        self._last_version: Dict[int, int] = {}
+        self._building = set()  # (bot_id, version) being written, never pruned
+
+    def _bot_path(self, bot_id: int) -> str:
+        return os.path.join(self.root, str(bot_id))
+
+    def _version_path(self, bot_id: int, version: int) -> str:
+        return os.path.join(self._bot_path(bot_id), f"v{version}")
+
+    def _write_current(self, bot_id: int, version: int):
+        tmp_path = os.path.join(self._bot_path(bot_id), f".{CURRENT_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, os.path.join(self._bot_path(bot_id), CURRENT_FILE))
+
+    def _persisted_versions(self, bot_id: int) -> List[int]:
+        path = self._bot_path(bot_id)
+        if not self.root or not os.path.isdir(path):
+            return []
+        return sorted(int(m.group(1)) for m in map(_VERSION_DIR.match, os.listdir(path)) if m)
+
+    def load(self) -> int:
+        """Load the retained versions of every persisted bot; returns the bot count"""
+        if not self.root or not os.path.isdir(self.root):
+            return 0
+
+        for name in os.listdir(self.root):
+            if not name.isdigit():
+                continue
+            bot_id = int(name)
+            try:
+                versions = self._persisted_versions(bot_id)
+                if not versions:
+                    continue
+                current = versions[-1]
+                current_file = os.path.join(self._bot_path(bot_id), CURRENT_FILE)
+                if os.path.exists(current_file):
+                    with open(current_file) as f:
+                        current = int(f.read().strip())
+
+                history = OrderedDict()
+                for version in versions[-self.keep:]:
+                    history[version] = BotIndex.load(self._version_path(bot_id, version), mmap=self.mmap)
+                if current not in history:
+                    history[current] = BotIndex.load(self._version_path(bot_id, current), mmap=self.mmap)
+                    history = OrderedDict(sorted(history.items()))
+
+                self._history[bot_id] = history
+                self._last_version[bot_id] = versions[-1]
+                self.current[bot_id] = history[current]
+            except Exception as e:
+                logger.error(f"Failed to load index for bot {name}: {e}")
+
+        return len(self.current)
+
+    async def publish(self, bot_id: int, index: BotIndex) -> BotIndex:
+        """Persist a freshly built index as the bot's next version and swap it in"""
+        version = max(self._last_version.get(bot_id, 0), *self._persisted_versions(bot_id), 0) + 1
+        self._last_version[bot_id] = version
+        self._building.add((bot_id, version))
+        index.version = version
+        index.created_at = time.time()
+
+        loop = asyncio.get_running_loop()
+        try:
+            if self.root:
+                path = self._version_path(bot_id, version)
+                await loop.run_in_executor(None, index.save, path)
+                # Serve the mapped file: its pages live in the page cache, shared by processes
+                if self.mmap:
+                    index = await loop.run_in_executor(None, BotIndex.load, path, True)
+
+            # Fault the vectors in before the swap so the first queries don't pay for it
+            await loop.run_in_executor(None, index.scores, np.ones(index.dim, dtype=np.float32))
+        finally:
+            self._building.discard((bot_id, version))
+
+        history = self._history.setdefault(bot_id, OrderedDict())
+        history[version] = index
+        self.current[bot_id] = index
+        if self.root:
+            self._write_current(bot_id, version)
+
+        # Drop versions beyond the retained ones, never the published one
+        for old in list(history):
+            if len(history) <= self.keep:
+                break
+            if history[old] is not self.current[bot_id]:
+                del history[old]
+
+        if self.root:
+            retained = set(history)
+            await loop.run_in_executor(None, self._remove_versions, bot_id, retained)
+        return index
+
+    def _written_at(self, bot_id: int, version: int) -> float:
+        try:
+            # meta.json is written last
+            return os.path.getmtime(os.path.join(self._version_path(bot_id, version), 'meta.json'))
+        except OSError:
+            return time.time()
+
+    def _remove_versions(self, bot_id: int, retained: set):
+        """Delete unretained versions superseded more than ``prune_grace`` ago; later publishes get the rest"""
+        versions = self._persisted_versions(bot_id)
+        now = time.time()
+        for version, successor in zip(versions, versions[1:]):
+            if version in retained or (bot_id, version) in self._building:
+                continue
+            if now - self._written_at(bot_id, successor) < self.prune_grace:
+                continue
+            shutil.rmtree(self._version_path(bot_id, version), ignore_errors=True)
+
+    async def refresh(self, bot_id: int, version: Optional[int] = None) -> Optional[BotIndex]:
+        """Serve a version another process published, read from disk (CURRENT by default)"""
+        if not self.root:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if version is None:
+            current_file = os.path.join(self._bot_path(bot_id), CURRENT_FILE)
+            if not os.path.exists(current_file):
+                return None
+            with open(current_file) as f:
+                version = int(f.read().strip())
+
+        current = self.current.get(bot_id)
+        if current is not None and current.version == version:
+            return current
+
+        history = self._history.setdefault(bot_id, OrderedDict())
+        index = history.get(version)
+        if index is None:
+            index = await loop.run_in_executor(None, BotIndex.load, self._version_path(bot_id, version), self.mmap)
+            history[version] = index
+        self.current[bot_id] = index
+        self._last_version[bot_id] = max(self._last_version.get(bot_id, 0), version)
+
+        # The publishing process prunes the files, only trim what is held here
+        for old in list(history):
+            if len(history) <= self.keep:
+                break
+            if history[old] is not index:
+                del history[old]
+        return index
+
+    def rollback(self, bot_id: int, version: Optional[int] = None) -> BotIndex:
+        """Publish an earlier retained version, by default the one before the current"""
+        history = self._history.get(bot_id)
+        if not history or bot_id not in self.current:
+            raise KeyError(f"Bot {bot_id} has no index")
+
+        if version is None:
+            older = [v for v in history if v < self.current[bot_id].version]
+            if not older:
+                raise ValueError(f"Bot {bot_id} has no earlier version to roll back to")
+            version = max(older)
+        if version not in history:
+            raise ValueError(f"Version {version} of bot {bot_id} is not retained")
+
+        self.current[bot_id] = history[version]
+        if self.root:
+            self._write_current(bot_id, version)
+        logger.info(f"Bot {bot_id} rolled back to index version {version}")
+        return history[version]
+
+    def versions(self, bot_id: int) -> List[Dict[str, Any]]:
+        current = self.current.get(bot_id)
+        return [
+            {
+                'version': version,
+                'passages': len(index),
+                'records_bytes': index.records.nbytes,
+                'embedding_model': index.embedder,
+                'created_at': index.created_at,
+                'current': index is current
+            }
+            for version, index in self._history.get(bot_id, {}).items()
+        ]
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterable
+
+from app.core.config import settings
+from app.services.profiling_service import profiling_service
+from app.services.quota_service import quota_service
+from app.services.inference_protocol import (
+    OP_PING, OP_QUERY, OP_TRAIN, OP_STATS, OP_VERSIONS, OP_ROLLBACK, OP_IMPORT, STATUS_OK,
+    read_frame, write_frame, pack_query, unpack_result, pack_json, unpack_json
+)
+
+logger = logging.getLogger(__name__)
+
+class InferenceServerError(Exception):
+    """Raised when the inference server reports a failed request"""
+
+class InferenceClient:
+    """Pooled connections to the local inference server.
+
+    Connections are opened on demand up to ``pool_size`` and reused; a
+    request waits for a free connection beyond that. A connection that
+    fails mid-request is discarded along with the idle ones and the request
+    retried once on a fresh one, which covers the server having restarted
+    since they were pooled.
+    """
+
+    def __init__(self, path: str, pool_size: int, timeout: float):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connection(self):
+        if self._idle:
+            return self._idle.pop()
+        return await asyncio.open_unix_connection(self.path)
+
+    async def call(self, op: int, payload: bytes, timeout: Optional[float] = None) -> bytes:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        async with self._slots:
+            for attempt in range(2):
+                connection = await self._connection()
+                reader, writer = connection
+                try:
+                    write_frame(writer, op, payload)
+                    await writer.drain()
+                    _, status, response = await asyncio.wait_for(read_frame(reader), timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    # The server probably restarted, the other idle connections are dead too
+                    await self.close(keep_slots=True)
+                    if attempt:
+                        raise ConnectionError(f"Inference server unavailable: {e}")
+                    continue
+                except BaseException:
+                    # Timeout or cancellation leaves a reply in flight, the connection can't be reused
+                    writer.close()
+                    raise
+
+                self._idle.append(connection)
+                if status != STATUS_OK:
+                    raise InferenceServerError(response.decode())
+                return response
+
+    async def stream(self, op: int, payload: bytes, frames: AsyncIterable[bytes]) -> bytes:
+        """Send a request followed by a stream of frames and an empty end frame.
+
+        Not retried, the frames can't be replayed; draining each frame keeps
+        the sender at the pace the server consumes them.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        async with self._slots:
+            connection = await self._connection()
+            reader, writer = connection
+            try:
+                write_frame(writer, op, payload)
+                async for frame in frames:
+                    write_frame(writer, op, frame)
+                    await writer.drain()
+                write_frame(writer, op, b"")
+                await writer.drain()
+                _, status, response = await read_frame(reader)
+            except BaseException:
+                writer.close()
+                raise
+
+            self._idle.append(connection)
+            if status != STATUS_OK:
+                raise InferenceServerError(response.decode())
+            return response
+
+    async def close(self, keep_slots: bool = False):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+        if not keep_slots:
+            self._slots = None
+
+class RemoteAIService:
+    """Drop-in for AIService that forwards training and queries to the inference server.
+
+    Plans are assigned in this process, so every query, training and import
+    request carries the bot's plan name for the server's scheduler to use.
+    """
+
+    def __init__(self, path: str):
+        self.client = InferenceClient(path, settings.INFERENCE_POOL_SIZE, settings.INFERENCE_TIMEOUT_SECONDS)
+        self.initialized = False
+
+    async def initialize_model(self):
+        """Check the inference server is reachable; models are loaded there"""
+        try:
+            await self.client.call(OP_PING, b"", self.client.timeout)
+            self.initialized = True
+        except Exception as e:
+            logger.error(f"Inference server at {self.client.path} is not reachable: {e}")
+        finally:
+            # This may run in a pre-fork master, connections must not outlive its event loop
+            await self.client.close()
+
+    def load_indexes(self) -> int:
+        return 0  # indexes live in the inference server
+
+    async def train_bot(self, bot_id: int, website_url: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """Train a bot on the inference server"""
+        try:
+            # Crawling and embedding a site can take minutes, no timeout
+            response = await self.client.call(OP_TRAIN, pack_json({
+                'bot_id': bot_id, 'website_url': website_url, 'language': language,
+                'plan': quota_service.plan_name(bot_id)
+            }))
+            return unpack_json(response)
+        except Exception as e:
+            logger.error(f"Error training bot {bot_id} on the inference server: {e}")
+            return {
+                'success': False,
+                'message': f'Training failed: {str(e)}'
+            }
+
+    async def import_qa(self, bot_id: int, rows: AsyncIterable[Dict[str, Any]],
+                        language: Optional[str] = None, replace: bool = False) -> Dict[str, Any]:
+        """Stream uploaded rows to the inference server in batches"""
+        async def batches():
+            batch = []
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= settings.IMPORT_BATCH_ROWS:
+                    yield pack_json(batch)
+                    batch = []
+            if batch:
+                yield pack_json(batch)
+
+        try:
+            response = await self.client.stream(OP_IMPORT, pack_json({
+                'bot_id': bot_id, 'language': language, 'replace': replace,
+                'plan': quota_service.plan_name(bot_id)
+            }), batches())
+            return unpack_json(response)
+        except Exception as e:
+            logger.error(f"Error importing Q&A rows for bot {bot_id} on the inference server: {e}")
+            return {
+                'success': False,
+                'message': f'Import failed: {str(e)}'
+            }
+    
+    async def query_bot(self, bot_id: int, question: str) -> Dict[str, Any]:
+        """Query a bot on the inference server"""
+        try:
+            # Traced here like an in-process query; the server's stages join the same trace
+            with profiling_service.trace("query", bot_id) as trace:
+                sent_at = time.perf_counter()
+                with profiling_service.span("inference_call"):
+                    response = await self.client.call(
+                        OP_QUERY, pack_query(bot_id, question, quota_service.plan_name(bot_id), trace is not None),
+                        self.client.timeout
+                    )
+                result, spans = unpack_result(response)
+                if trace is not None and spans:
+                    trace.add_remote_spans(spans, sent_at)
+            return result
+        except Exception as e:
+            logger.error(f"Error querying bot {bot_id} on the inference server: {e}")
+            return {
+                'success': False,
+                'message': f'Query failed: {str(e)}',
+                'answer': 'An error occurred while processing your question.'
+            }
+
+    async def index_versions(self, bot_id: int) -> List[Dict[str, Any]]:
+        response = await self.client.call(OP_VERSIONS, pack_json({'bot_id': bot_id}), self.client.timeout)
+        return unpack_json(response)
+
+    async def rollback_index(self, bot_id: int, version: Optional[int] = None) -> Dict[str, Any]:
+        response = await self.client.call(
+            OP_ROLLBACK, pack_json({'bot_id': bot_id, 'version': version}), self.client.timeout
+        )
+        return unpack_json(response)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return unpack_json(await self.client.call(OP_STATS, b"", self.client.timeout))
@@ -0,0 +1,92 @@
+# Binary framing for the local inference server. Every message is a 6-byte
+# header (payload length as uint32, opcode and status as uint8) followed by
+# the payload. Queries, the hot path, are packed with struct; the rarer
+# training and stats calls carry JSON.
+import asyncio
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+HEADER = struct.Struct(">IBB")
+MAX_PAYLOAD = 16 * 2 ** 20
+
+OP_PING = 0
+OP_QUERY = 1
+OP_TRAIN = 2
+OP_STATS = 3
+OP_VERSIONS = 4
+OP_ROLLBACK = 5
+OP_IMPORT = 6  # followed by row batch frames of the same opcode, an empty one ends the stream
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_BOT_ID = struct.Struct(">I")
+_QUERY = struct.Struct(">I?")  # bot id, return stage spans; then the plan name and the question
+_RESULT = struct.Struct(">?f")
+_LENGTH = struct.Struct(">I")
+_NONE = 0xFFFFFFFF
+
+class ProtocolError(Exception):
+    """Raised on malformed frames"""
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    length, op, status = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_PAYLOAD} byte limit")
+    return op, status, await reader.readexactly(length)
+
+def write_frame(writer: asyncio.StreamWriter, op: int, payload: bytes, status: int = STATUS_OK):
+    writer.write(HEADER.pack(len(payload), op, status) + payload)
+
+def _pack_strings(*values: Optional[str]) -> bytes:
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append(_LENGTH.pack(_NONE))
+        else:
+            data = value.encode()
+            parts.append(_LENGTH.pack(len(data)) + data)
+    return b"".join(parts)
+
+def _unpack_strings(payload: bytes, offset: int, count: int):
+    values = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(payload, offset)
+        offset += _LENGTH.size
+        if length == _NONE:
+            values.append(None)
+        else:
+            values.append(payload[offset:offset + length].decode())
+            offset += length
+    return values
+
+def pack_query(bot_id: int, question: str, plan: Optional[str] = None, trace: bool = False) -> bytes:
+    """Query frame; ``plan`` is the bot's subscription plan as the caller knows it"""
+    return _QUERY.pack(bot_id, trace) + _pack_strings(plan, question)
+
+def unpack_query(payload: bytes) -> Tuple[int, str, Optional[str], bool]:
+    bot_id, trace = _QUERY.unpack_from(payload)
+    plan, question = _unpack_strings(payload, _QUERY.size, 2)
+    return bot_id, question, plan, trace
+
+def pack_result(result: Dict[str, Any], spans: Optional[List[Dict[str, Any]]] = None) -> bytes:
+    """Query result, with the server's stage spans when the caller asked for them"""
+    return _RESULT.pack(result['success'], result.get('confidence') or 0.0) + _pack_strings(
+        result.get('answer'), result.get('source_url'), result.get('message'),
+        json.dumps(spans) if spans is not None else None
+    )
+
+def unpack_result(payload: bytes) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    success, confidence = _RESULT.unpack_from(payload)
+    answer, source_url, message, spans = _unpack_strings(payload, _RESULT.size, 4)
+    result = {'success': success, 'answer': answer, 'confidence': confidence, 'source_url': source_url}
+    if message is not None:
+        result['message'] = message
+    return result, json.loads(spans) if spans is not None else None
+
+def pack_json(value: Any) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+def unpack_json(payload: bytes) -> Any:
+    return json.loads(payload) if payload else None
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.quota_service import quota_service
+
+logger = logging.getLogger(__name__)
+
+class SchedulerBusy(Exception):
+    """Raised when a tenant already has too much inference work queued"""
+
+class _TenantQueue:
+    __slots__ = ("waiters", "in_flight", "last_finish", "wait_times", "granted")
+
+    def __init__(self):
+        self.waiters = deque()  # (finish_tag, enqueued_at, future)
+        self.in_flight = 0
+        self.last_finish = 0.0
+        self.wait_times = deque(maxlen=500)  # seconds, most recent grants
+        self.granted = 0
+
+class InferenceScheduler:
+    """Weighted fair queuing of inference work across tenants.
+
+    At most ``capacity`` jobs run at once. Each waiting job gets a virtual
+    finish tag of ``max(virtual_time, tenant's last tag) + cost / weight``,
+    and free slots go to the smallest tag, so a tenant flooding the queue
+    only delays its own jobs while others keep their plan's share. Tenants
+    are also capped at their plan's ``max_in_flight`` concurrent jobs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._running = 0
+        self._virtual_time = 0.0
+        self._tenants: Dict[str, _TenantQueue] = {}
+
+    def _tenant(self, tenant: str) -> _TenantQueue:
+        queue = self._tenants.get(tenant)
+        if queue is None:
+            queue = _TenantQueue()
+            self._tenants[tenant] = queue
+        return queue
+
+    def _can_run(self, tenant: str, queue: _TenantQueue) -> bool:
+        return queue.in_flight < quota_service.get_plan(tenant)["max_in_flight"]
+
+    @asynccontextmanager
+    async def slot(self, tenant, cost: float = 1.0):
+        """Hold one inference slot for the duration of the block"""
+        tenant = str(tenant)
+        await self._acquire(tenant, cost)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    async def _acquire(self, tenant: str, cost: float):
+        queue = self._tenant(tenant)
+        now = time.monotonic()
+
+        if not queue.waiters and self._running < self.capacity and self._can_run(tenant, queue):
+            self._grant(queue, now)
+            return
+
+        if len(queue.waiters) >= settings.INFERENCE_MAX_QUEUED_PER_TENANT:
+            raise SchedulerBusy(f"Too many queued inference jobs for tenant {tenant}")
+
+        weight = quota_service.get_plan(tenant)["inference_weight"]
+        finish_tag = max(self._virtual_time, queue.last_finish) + cost / weight
+        queue.last_finish = finish_tag
+        future = asyncio.get_running_loop().create_future()
+        entry = (finish_tag, now, future)
+        queue.waiters.append(entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just before cancellation, hand it on
+                self._release(tenant)
+            elif entry in queue.waiters:
+                # _dispatch may already have dropped the cancelled entry
+                queue.waiters.remove(entry)
+            raise
+
+    def _grant(self, queue: _TenantQueue, enqueued_at: float):
+        queue.in_flight += 1
+        queue.granted += 1
+        queue.wait_times.append(time.monotonic() - enqueued_at)
+        self._running += 1
+
+    def _release(self, tenant: str):
+        queue = self._tenants[tenant]
+        queue.in_flight -= 1
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._running < self.capacity:
+            best_tenant = None
+            best_queue: Optional[_TenantQueue] = None
+            for tenant, queue in self._tenants.items():
+                if not queue.waiters or not self._can_run(tenant, queue):
+                    continue
+                if best_queue is None or queue.waiters[0][0] < best_queue.waiters[0][0]:
+                    best_tenant, best_queue = tenant, queue
+            if best_queue is None:
+                return
+
+            finish_tag, enqueued_at, future = best_queue.waiters.popleft()
+            if future.done():
+                continue  # waiter cancelled in this loop pass, it never held the slot
+            self._virtual_time = max(self._virtual_time, finish_tag)
+            self._grant(best_queue, enqueued_at)
+            future.set_result(None)
+
+    def queue_depth(self) -> int:
+        """Jobs waiting for a slot across all tenants"""
+        return sum(len(queue.waiters) for queue in self._tenants.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight work and queue wait time per tenant"""
+        tenants = {}
+        for tenant, queue in self._tenants.items():
+            waits = sorted(queue.wait_times)
+            tenants[tenant] = {
+                'queued': len(queue.waiters),
+                'in_flight': queue.in_flight,
+                'granted': queue.granted,
+                'weight': quota_service.get_plan(tenant)["inference_weight"],
+                'wait_ms': {
+                    'avg': round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                    'p50': round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    'p95': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else None
+                }
+            }
+        return {
+            'capacity': self.capacity,
+            'running': self._running,
+            'queued': self.queue_depth(),
+            'tenants': tenants
+        }
+
+# Global inference scheduler instance
+inference_scheduler = InferenceScheduler(settings.INFERENCE_CONCURRENCY)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from app.services.inference_protocol import (
+    OP_PING, OP_QUERY, OP_TRAIN, OP_STATS, OP_VERSIONS, OP_ROLLBACK, OP_IMPORT, STATUS_ERROR,
+    read_frame, write_frame, unpack_query, pack_result, pack_json, unpack_json
+)
+from app.services.inference_scheduler import inference_scheduler
+from app.services.invalidation_bus import invalidation_bus
+from app.services.model_registry import model_registry
+from app.services.profiling_service import profiling_service
+from app.services.quota_service import quota_service
+from app.services.reranker import reranker
+
+logger = logging.getLogger(__name__)
+
+class InferenceServer:
+    """Serves one AIService to every process on the host over a Unix socket.
+
+    The API workers and the Telegram runner connect here instead of each
+    loading the models and indexes, so a bot trained through the API is
+    immediately queryable from Telegram. Each connection handles one request
+    at a time; clients get concurrency from a pool of connections. Plans are
+    assigned in the client processes and arrive with each request, so the
+    scheduler here weighs tenants by their current plan.
+    """
+
+    def __init__(self, service, path: str):
+        self.service = service
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers = set()
+
+    @property
+    def connections(self) -> int:
+        return len(self._writers)
+
+    async def start(self):
+        await invalidation_bus.start()
+        await self.service.initialize_model()
+        bots = self.service.load_indexes()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o660)
+        logger.info(f"Inference server listening on {self.path} with {bots} bot indexes")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Closing the client connections ends their handlers on the next loop pass
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            await asyncio.sleep(0)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        await invalidation_bus.stop()
+
+    @staticmethod
+    def _apply_plan(bot_id: int, plan: Optional[str]):
+        # Only on change, set_plan also resets the bot's rate limit bucket
+        if plan and quota_service.tenant_plans.get(str(bot_id)) != plan:
+            quota_service.set_plan(bot_id, plan)
+
+    async def _import_rows(self, reader: asyncio.StreamReader):
+        """Rows of an import stream, one batch frame at a time"""
+        while True:
+            _, _, payload = await read_frame(reader)
+            if not payload:
+                return
+            for row in unpack_json(payload):
+                yield row
+
+    async def _dispatch(self, op: int, payload: bytes, reader: asyncio.StreamReader) -> bytes:
+        if op == OP_QUERY:
+            bot_id, question, plan, trace = unpack_query(payload)
+            self._apply_plan(bot_id, plan)
+            if not trace:
+                return pack_result(await self.service.query_bot(bot_id, question))
+            # The caller is tracing this query, send its stage spans back with the result
+            with profiling_service.collect("query", bot_id) as collected:
+                result = await self.service.query_bot(bot_id, question)
+            return pack_result(result, collected.spans)
+        if op == OP_TRAIN:
+            request = unpack_json(payload)
+            self._apply_plan(request['bot_id'], request.get('plan'))
+            return pack_json(await self.service.train_bot(
+                request['bot_id'], request['website_url'], request.get('language')
+            ))
+        if op == OP_IMPORT:
+            request = unpack_json(payload)
+            self._apply_plan(request['bot_id'], request.get('plan'))
+            rows = self._import_rows(reader)
+            try:
+                return pack_json(await self.service.import_qa(
+                    request['bot_id'], rows, request.get('language'), request.get('replace', False)
+                ))
+            finally:
+                # A failed import stops reading early, the rest of the stream must not be taken for requests
+                async for _ in rows:
+                    pass
+        if op == OP_VERSIONS:
+            return pack_json(await self.service.index_versions(unpack_json(payload)['bot_id']))
+        if op == OP_ROLLBACK:
+            request = unpack_json(payload)
+            return pack_json(await self.service.rollback_index(request['bot_id'], request.get('version')))
+        if op == OP_STATS:
+            return pack_json({
+                **inference_scheduler.get_stats(),
+                'models': model_registry.get_stats(),
+                'answer_cache': self.service.get_answer_cache_stats(),
+                'rerank': reranker.get_stats()
+            })
+        if op == OP_PING:
+            return b""
+        raise ValueError(f"Unknown opcode {op}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    op, _, payload = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break  # client closed the connection
+
+                try:
+                    write_frame(writer, op, await self._dispatch(op, payload, reader))
+                except Exception as e:
+                    logger.error(f"Inference request {op} failed: {e}")
+                    write_frame(writer, op, str(e).encode(), STATUS_ERROR)
+                await writer.drain()
+        except Exception as e:
+            logger.warning(f"Inference connection dropped: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import importlib.util
+import logging
+from typing import Callable, Dict, Any, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Event telling subscribers they may have missed events and should re-check everything
+RESYNC_EVENT = {'type': 'resync'}
+
+class LocalInvalidationBus:
+    """Invalidation events delivered to subscribers in this process only.
+
+    Subscribers are plain callables that should only mark state stale; the
+    actual reload happens lazily on next use, so delivery stays cheap.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers.append(callback)
+
+    def _deliver(self, event: Dict[str, Any]):
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Invalidation subscriber failed on {event}: {e}")
+
+    async def publish(self, event: Dict[str, Any]):
+        self._deliver(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class RedisInvalidationBus(LocalInvalidationBus):
+    """Invalidation events broadcast to every process over Redis pub/sub.
+
+    Pub/sub is fire-and-forget, so after (re)subscribing a resync event is
+    delivered locally to cover anything published while disconnected.
+    """
+
+    def __init__(self, url: str, channel: str):
+        super().__init__()
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, event: Dict[str, Any]):
+        try:
+            await self.redis.publish(self.channel, json.dumps(event))
+        except Exception as e:
+            logger.warning(f"Failed to broadcast invalidation {event}: {e}")
+            self._deliver(event)  # at least this process stays current
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                self._deliver(RESYNC_EVENT)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._deliver(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Invalidation channel lost, resubscribing in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                await pubsub.close()
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self.redis.close()
+
+def create_invalidation_bus():
+    """Invalidation bus selected by INVALIDATION_BACKEND"""
+    if settings.INVALIDATION_BACKEND == "redis":
+        # redis is optional and only imported when selected
+        if importlib.util.find_spec("redis") is not None:
+            return RedisInvalidationBus(settings.REDIS_URL, settings.INVALIDATION_CHANNEL)
+        logger.warning("redis package not installed, invalidations stay within this process")
+    return LocalInvalidationBus()
+
+# Global invalidation bus instance
+invalidation_bus = create_invalidation_bus()
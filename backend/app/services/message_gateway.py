@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+from app.core.config import settings
+from app.services.ai_service import ai_service
+from app.services.quota_service import quota_service, QuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+class InboundMessage:
+    """A question from any channel, normalized for the gateway.
+
+    ``reply_to`` is whatever the channel's adapter needs to route the answer
+    back (a Telegram chat and message, a WebSocket, a future); the gateway
+    never looks inside it.
+    """
+    __slots__ = ("channel", "bot_id", "user_id", "text", "reply_to", "received_at")
+
+    def __init__(self, channel: str, bot_id: int, user_id: Any, text: str, reply_to: Any = None):
+        self.channel = channel
+        self.bot_id = bot_id
+        self.user_id = user_id
+        self.text = text
+        self.reply_to = reply_to
+        self.received_at = time.monotonic()
+
+class ChannelAdapter:
+    """Delivers gateway replies on one channel.
+
+    ``reply`` is a dict with either ``answer``, ``confidence`` and
+    ``source_url``, or ``error`` and a ``reason``: ``rate_limit`` or
+    ``monthly_quota`` (with ``retry_after``), ``failed`` or ``unavailable``.
+    """
+    channel = ""
+
+    async def deliver(self, message: InboundMessage, reply: Dict[str, Any]):
+        raise NotImplementedError
+
+class MessageGateway:
+    """Channel-agnostic inbound path: per-bot queues, worker pool, per-channel adapters.
+
+    Channels submit and return immediately; ``workers`` tasks run the quota
+    check and the query and hand the reply to the channel's adapter. Each
+    bot has its own queue and workers take from the bots in turn, up to the
+    plan's ``inference_weight`` messages per turn, so a bot with a backlog
+    doesn't hold up the others' messages. The total bound is the
+    backpressure point: ``submit`` returns False when it is reached and the
+    channel decides how to tell the user.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.adapters: Dict[str, ChannelAdapter] = {}
+        self._queues: Dict[int, deque] = {}
+        self._turns: deque = deque()  # bots with queued messages, next to serve first
+        self._credit = 0  # messages the bot at the head of _turns may still take
+        self._queued = 0
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._busy = 0
+        self._latencies = deque(maxlen=1000)
+        self.stats = {
+            'received': 0,
+            'answered': 0,
+            'rejected': 0,
+            'failed': 0,
+            'dropped': 0
+        }
+
+    def register_adapter(self, adapter: ChannelAdapter):
+        self.adapters[adapter.channel] = adapter
+
+    def _ensure_running(self):
+        # Started on first use so the semaphore belongs to the serving event loop
+        if not self._tasks:
+            self._available = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+            logger.info(f"Started {self.workers} message gateway workers")
+
+    def submit(self, message: InboundMessage) -> bool:
+        """Queue a message; False when the gateway is saturated"""
+        if message.channel not in self.adapters:
+            raise LookupError(f"No adapter for channel {message.channel}")
+
+        self._ensure_running()
+        if self._queued >= self.queue_size:
+            self.stats['dropped'] += 1
+            logger.warning(f"Message gateway queue full, dropping {message.channel} message for bot {message.bot_id}")
+            return False
+
+        queue = self._queues.get(message.bot_id)
+        if queue is None:
+            queue = self._queues[message.bot_id] = deque()
+            self._turns.append(message.bot_id)
+        queue.append(message)
+        self._queued += 1
+        self._available.release()
+        self.stats['received'] += 1
+        return True
+
+    def _next(self) -> InboundMessage:
+        """Next message in weighted round robin over the bots with queued messages"""
+        bot_id = self._turns[0]
+        if self._credit <= 0:
+            self._credit = quota_service.get_plan(bot_id)["inference_weight"]
+        queue = self._queues[bot_id]
+        message = queue.popleft()
+        self._queued -= 1
+        self._credit -= 1
+        if not queue:
+            del self._queues[bot_id]
+            self._turns.popleft()
+            self._credit = 0
+        elif self._credit <= 0:
+            self._turns.rotate(-1)
+        return message
+
+    async def stop(self):
+        """Stop the workers; queued messages are discarded"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues.clear()
+        self._turns.clear()
+        self._credit = 0
+        self._queued = 0
+        self._available = None
+
+    async def _work(self, worker_id: int):
+        while True:
+            await self._available.acquire()
+            message = self._next()
+            self._busy += 1
+            try:
+                try:
+                    reply = await self._answer(message)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.error(f"Gateway worker {worker_id} failed on {message.channel} message for bot {message.bot_id}: {e}")
+                    reply = {'error': 'Internal error', 'reason': 'unavailable'}
+
+                try:
+                    await self.adapters[message.channel].deliver(message, reply)
+                    self._latencies.append(time.monotonic() - message.received_at)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Failed to deliver {message.channel} reply for bot {message.bot_id}: {e}")
+            finally:
+                self._busy -= 1
+
+    async def _answer(self, message: InboundMessage) -> Dict[str, Any]:
+        """Quota check and query, shared by every channel"""
+        try:
+            quota_service.check(message.bot_id)
+        except QuotaExceeded as e:
+            self.stats['rejected'] += 1
+            return {'error': str(e), 'reason': e.reason, 'retry_after': max(1, int(e.retry_after))}
+
+        if not ai_service.initialized:
+            await ai_service.initialize_model()
+
+        result = await ai_service.query_bot(message.bot_id, message.text)
+        if not result['success']:
+            self.stats['failed'] += 1
+            return {'error': result.get('message'), 'reason': 'failed', 'answer': result.get('answer')}
+
+        self.stats['answered'] += 1
+        return {
+            'answer': result['answer'],
+            'confidence': result['confidence'],
+            'source_url': result.get('source_url')
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, busy workers, time from receipt to delivery and counters"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            'workers': len(self._tasks),
+            'busy_workers': self._busy,
+            'queue_depth': self._queued,
+            'queued_bots': len(self._queues),
+            'queue_size': self.queue_size,
+            'channels': sorted(self.adapters),
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99)
+            },
+            **self.stats
+        }
+
+# Global message gateway instance
+message_gateway = MessageGateway(settings.GATEWAY_WORKERS, settings.GATEWAY_QUEUE_SIZE)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _model_bytes(model) -> int:
+    """Approximate resident size of a model from its parameters and buffers"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+class ModelRegistry:
+    """Embedding models loaded on demand and shared by every bot using them.
+
+    Bots are routed to a model by language: languages listed in
+    ``LANGUAGE_MODELS`` get their own encoder, everything else uses the
+    multilingual one. Loaded models are kept in LRU order and the least
+    recently used ones are dropped once their total size exceeds
+    ``MODEL_MEMORY_BUDGET_MB``. A model that fails to load (a download
+    error, running out of memory) is reported unavailable and retried after
+    ``MODEL_RETRY_SECONDS``, doubling with each consecutive failure.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._failed: Dict[str, Tuple[float, int]] = {}  # name -> (monotonic retry time, consecutive failures)
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0, 'failures': 0}
+
+    @staticmethod
+    def model_for_language(language: Optional[str]) -> str:
+        """Name of the encoder used for a bot language"""
+        language = (language or settings.DEFAULT_LANGUAGE).lower().split('-')[0]
+        return settings.LANGUAGE_MODELS.get(language, settings.MULTILINGUAL_EMBEDDING_MODEL)
+
+    def _unavailable(self, name: str) -> bool:
+        failed = self._failed.get(name)
+        return failed is not None and time.monotonic() < failed[0]
+
+    def clear_failures(self, name: Optional[str] = None):
+        """Retry loading a failed model (every failed model when None) on next use"""
+        if name is None:
+            self._failed.clear()
+        else:
+            self._failed.pop(name, None)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    async def get(self, name: str):
+        """Loaded model ``name``, or None if it cannot be loaded"""
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+            self.stats['hits'] += 1
+            return model
+        if self._unavailable(name):
+            return None
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            # Another request may have loaded it while we waited
+            if name in self._models:
+                return await self.get(name)
+            if self._unavailable(name):
+                return None
+
+            try:
+                from sentence_transformers import SentenceTransformer
+                loop = asyncio.get_running_loop()
+                model = await loop.run_in_executor(None, SentenceTransformer, name)
+            except Exception as e:
+                failures = self._failed.get(name, (0.0, 0))[1] + 1
+                delay = min(settings.MODEL_RETRY_SECONDS * 2 ** (failures - 1), settings.MODEL_RETRY_MAX_SECONDS)
+                self._failed[name] = (time.monotonic() + delay, failures)
+                self.stats['failures'] += 1
+                logger.error(f"Failed to load embedding model {name}, retrying in {delay:.0f}s: {e}")
+                return None
+
+            self._failed.pop(name, None)
+            self._models[name] = model
+            self._sizes[name] = _model_bytes(model)
+            self.stats['loads'] += 1
+            logger.info(f"Embedding model {name} loaded ({self._sizes[name] / 2 ** 20:.0f} MB)")
+            self._evict(keep=name)
+            return model
+
+    def _evict(self, keep: str):
+        while self.memory_bytes > self.budget_bytes and len(self._models) > 1:
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            # Requests already holding the model finish with it; memory is freed after them
+            del self._models[name]
+            size = self._sizes.pop(name)
+            self.stats['evictions'] += 1
+            logger.info(f"Evicted embedding model {name} ({size / 2 ** 20:.0f} MB) to stay within the memory budget")
+
+        if self.memory_bytes > self.budget_bytes:
+            logger.warning(
+                f"Embedding models use {self.memory_bytes / 2 ** 20:.0f} MB, "
+                f"over the {self.budget_bytes / 2 ** 20:.0f} MB budget"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'budget_mb': round(self.budget_bytes / 2 ** 20, 1),
+            'memory_mb': round(self.memory_bytes / 2 ** 20, 1),
+            'loaded': {name: round(self._sizes[name] / 2 ** 20, 1) for name in self._models},
+            'unavailable': {
+                name: {'failures': failures, 'retry_in_seconds': round(max(0.0, retry_at - time.monotonic()), 1)}
+                for name, (retry_at, failures) in sorted(self._failed.items())
+            },
+            **self.stats
+        }
+
+# Global model registry instance
+model_registry = ModelRegistry(settings.MODEL_MEMORY_BUDGET_MB * 2 ** 20)
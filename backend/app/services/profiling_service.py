@@ -0,0 +1,212 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument is optional
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Trace collecting spans for the current request/task (None when not profiled)
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+# Value of the X-Profile header for the current HTTP request, set by the middleware
+profile_request: ContextVar[Optional[str]] = ContextVar("profile_request", default=None)
+
+PROFILE_HEADER = "X-Profile"
+
+class Trace:
+    """A single profiled operation (training run or query) with its stage spans"""
+
+    def __init__(self, name: str, bot_id: Optional[int] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.bot_id = bot_id
+        self.started_at = datetime.now()
+        self.spans: List[Dict[str, Any]] = []
+        self.duration_ms: Optional[float] = None
+        self.profile: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def add_span(self, name: str, start: float, end: float):
+        self.spans.append({
+            'name': name,
+            'start_ms': round((start - self._start) * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3)
+        })
+
+    def add_remote_spans(self, spans: List[Dict[str, Any]], start: float):
+        """Merge spans recorded by another process, ``start`` being when the call was sent"""
+        offset_ms = (start - self._start) * 1000
+        for span in spans:
+            self.spans.append({**span, 'start_ms': round(span['start_ms'] + offset_ms, 3)})
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span['name']] = round(totals.get(span['name'], 0.0) + span['duration_ms'], 3)
+        return totals
+
+    def to_dict(self, include_profile: bool = False) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'bot_id': self.bot_id,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'stages': self.stage_totals(),
+            'spans': self.spans,
+            'has_profile': self.profile is not None
+        }
+        if include_profile:
+            data['profile'] = self.profile
+        return data
+
+class ProfilingService:
+    """Opt-in tracing and sampling profiler for training and query paths.
+
+    Tracing is enabled per bot (via the admin endpoint), per request (via the
+    X-Profile header) or by random sampling. When none applies, ``trace`` and
+    ``span`` cost a context variable lookup and nothing else.
+    """
+
+    def __init__(self):
+        self.enabled_bots: Dict[int, bool] = {}  # bot_id -> capture profile
+        self.traces = deque(maxlen=settings.PROFILING_MAX_TRACES)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self._capturing = False
+
+    def enable_bot(self, bot_id: int, capture: bool = False):
+        """Enable tracing for every training run and query of a bot"""
+        self.enabled_bots[bot_id] = capture
+        logger.info(f"Profiling enabled for bot {bot_id} (capture={capture})")
+
+    def disable_bot(self, bot_id: int):
+        """Disable tracing for a bot"""
+        self.enabled_bots.pop(bot_id, None)
+        logger.info(f"Profiling disabled for bot {bot_id}")
+
+    def _decide(self, bot_id: Optional[int]) -> Optional[bool]:
+        """Return None when the operation is not traced, else whether to capture a profile"""
+        header = profile_request.get()
+        if header and settings.PROFILING_HEADER_ENABLED:
+            return header.lower() == "capture"
+        if bot_id in self.enabled_bots:
+            return self.enabled_bots[bot_id]
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return None
+
+    @contextmanager
+    def trace(self, name: str, bot_id: Optional[int] = None):
+        """Open a trace for a top-level operation if profiling applies to it"""
+        if _current_trace.get() is not None:
+            # Nested operation, spans are recorded on the outer trace
+            yield _current_trace.get()
+            return
+
+        capture = self._decide(bot_id)
+        if capture is None:
+            yield None
+            return
+
+        trace = Trace(name, bot_id)
+        token = _current_trace.set(trace)
+        profiler = self._start_capture() if capture else None
+        try:
+            yield trace
+        finally:
+            if profiler is not None:
+                trace.profile = self._stop_capture(profiler)
+            _current_trace.reset(token)
+            trace.finish()
+            self.traces.append(trace)
+
+    @contextmanager
+    def collect(self, name: str, bot_id: Optional[int] = None):
+        """Trace an operation for a caller in another process.
+
+        The spans go back to the caller, who decided to trace; the trace is
+        not kept here.
+        """
+        trace = Trace(name, bot_id)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+
+    @contextmanager
+    def span(self, name: str):
+        """Record a stage span on the current trace, if any"""
+        trace = _current_trace.get()
+        if trace is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.add_span(name, start, time.perf_counter())
+
+    def _start_capture(self):
+        # Only one profiler can be attached to the event loop thread at a time
+        if self._capturing:
+            return None
+        self._capturing = True
+        if settings.PROFILING_BACKEND == "pyinstrument" and PyinstrumentProfiler is not None:
+            profiler = PyinstrumentProfiler(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop_capture(self, profiler) -> str:
+        try:
+            if PyinstrumentProfiler is not None and isinstance(profiler, PyinstrumentProfiler):
+                profiler.stop()
+                return profiler.output_text(unicode=True, color=False)
+
+            profiler.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(settings.PROFILING_TOP_FUNCTIONS)
+            return output.getvalue()
+        finally:
+            self._capturing = False
+
+    def get_traces(self, bot_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent traces first, optionally filtered by bot"""
+        traces = [t for t in reversed(self.traces) if bot_id is None or t.bot_id == bot_id]
+        return [t.to_dict() for t in traces[:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in self.traces:
+            if trace.id == trace_id:
+                return trace.to_dict(include_profile=True)
+        return None
+
+    def clear(self):
+        self.traces.clear()
+
+# Global profiling service instance
+profiling_service = ProfilingService()
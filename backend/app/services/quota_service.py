@@ -0,0 +1,244 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.plans import get_plan
+from app.services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceeded(Exception):
+    """Raised when a tenant is over its request rate or monthly query quota"""
+
+    def __init__(self, reason: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason  # "rate_limit" or "monthly_quota"
+        self.retry_after = retry_after
+
+class MemoryQuotaBackend:
+    """Monthly usage kept in process, optionally persisted to a JSON file on flush"""
+
+    def __init__(self, state_file: str = ""):
+        self.state_file = state_file
+        self.usage: Dict[str, Dict[str, int]] = {}  # month -> tenant -> queries
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                self.usage = json.load(f)
+
+    async def load(self, month: str) -> Dict[str, int]:
+        return dict(self.usage.get(month, {}))
+
+    async def increment(self, month: str, deltas: Dict[str, int]) -> Dict[str, int]:
+        totals = self.usage.setdefault(month, {})
+        for tenant, delta in deltas.items():
+            totals[tenant] = totals.get(tenant, 0) + delta
+        if self.state_file:
+            # Serialized here so the file gets a consistent snapshot, written off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._write, json.dumps(self.usage))
+        return {tenant: totals[tenant] for tenant in deltas}
+
+    def _write(self, data: str):
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(data)
+        os.replace(tmp_file, self.state_file)
+
+class RedisQuotaBackend:
+    """Monthly usage shared by every worker in one Redis hash per month"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(url, decode_responses=True)
+
+    def _key(self, month: str) -> str:
+        return f"quota:{month}"
+
+    async def load(self, month: str) -> Dict[str, int]:
+        usage = await self.redis.hgetall(self._key(month))
+        return {tenant: int(count) for tenant, count in usage.items()}
+
+    async def increment(self, month: str, deltas: Dict[str, int]) -> Dict[str, int]:
+        key = self._key(month)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tenant, delta in deltas.items():
+                pipe.hincrby(key, tenant, delta)
+            # Keep a couple of months for reporting
+            pipe.expire(key, 62 * 24 * 60 * 60)
+            results = await pipe.execute()
+        return {tenant: int(total) for tenant, total in zip(deltas, results)}
+
+class QuotaService:
+    """Per-tenant request rate limiting and monthly query quotas.
+
+    A tenant is a FAQ bot. ``check`` is O(1) and never awaits: a token bucket
+    caps the request rate and a local counter tracks monthly usage. Usage
+    deltas are persisted in batches by ``flush``; with the Redis backend the
+    flush also brings in other workers' usage, so the quota holds across the
+    whole deployment up to one flush interval of slack.
+    """
+
+    def __init__(self):
+        self.tenant_plans: Dict[str, str] = {}  # tenant -> plan name
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._usage: Dict[str, int] = {}  # persisted monthly usage as of the last flush
+        self._pending: Dict[str, int] = {}  # usage not persisted yet
+        self._pending_total = 0
+        self._month = self._current_month()
+        self._loaded = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._background = set()  # batch flushes started by check(), referenced until done
+        self.backend = self._create_backend()
+
+    def _create_backend(self):
+        if settings.QUOTA_BACKEND == "redis":
+            # redis is optional and only imported when selected, usage is otherwise kept per process
+            if importlib.util.find_spec("redis") is not None:
+                return RedisQuotaBackend(settings.REDIS_URL)
+            logger.warning("redis package not installed, falling back to in-memory quotas")
+        return MemoryQuotaBackend(settings.QUOTA_STATE_FILE)
+
+    @staticmethod
+    def _current_month() -> str:
+        return datetime.utcnow().strftime("%Y-%m")
+
+    def set_plan(self, tenant, plan: str):
+        """Assign a subscription plan to a tenant"""
+        tenant = str(tenant)
+        self.tenant_plans[tenant] = plan
+        self._buckets.pop(tenant, None)
+
+    def plan_name(self, tenant) -> str:
+        return self.tenant_plans.get(str(tenant), settings.DEFAULT_SUBSCRIPTION_PLAN)
+
+    def get_plan(self, tenant) -> Dict[str, Any]:
+        return get_plan(self.plan_name(tenant))
+
+    def _bucket(self, tenant: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            plan = self.get_plan(tenant)
+            bucket = TokenBucket(plan["queries_per_second"], plan["query_burst"])
+            self._buckets[tenant] = bucket
+        return bucket
+
+    def _roll_month(self):
+        month = self._current_month()
+        if month != self._month:
+            # Unflushed deltas belong to the month that just ended
+            deltas, self._pending, self._pending_total = self._pending, {}, 0
+            if deltas:
+                self._spawn(self._persist(self._month, deltas))
+            self._month = month
+            self._usage = {}
+            self._loaded = False
+
+    def check(self, tenant):
+        """Count one query for a tenant, raising QuotaExceeded if it is not allowed"""
+        tenant = str(tenant)
+        self._roll_month()
+        self._ensure_started()
+
+        bucket = self._bucket(tenant)
+        if not bucket.try_acquire():
+            raise QuotaExceeded(
+                "rate_limit",
+                "Too many requests, please slow down",
+                retry_after=bucket.delay()
+            )
+
+        limit = self.get_plan(tenant)["max_queries_per_month"]
+        used = self._usage.get(tenant, 0) + self._pending.get(tenant, 0)
+        if limit is not None and used >= limit:
+            raise QuotaExceeded(
+                "monthly_quota",
+                "Monthly query quota exceeded, please upgrade your plan",
+                retry_after=self._seconds_until_next_month()
+            )
+
+        self._pending[tenant] = self._pending.get(tenant, 0) + 1
+        self._pending_total += 1
+        if self._pending_total >= settings.QUOTA_FLUSH_BATCH:
+            self._spawn(self.flush())
+
+    def usage(self, tenant) -> Dict[str, Any]:
+        """Current month usage and limit for a tenant"""
+        tenant = str(tenant)
+        self._roll_month()
+        plan = self.get_plan(tenant)
+        return {
+            "month": self._month,
+            "queries": self._usage.get(tenant, 0) + self._pending.get(tenant, 0),
+            "max_queries_per_month": plan["max_queries_per_month"],
+            "queries_per_second": plan["queries_per_second"]
+        }
+
+    def _seconds_until_next_month(self) -> float:
+        now = datetime.utcnow()
+        if now.month == 12:
+            next_month = now.replace(year=now.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        else:
+            next_month = now.replace(month=now.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        return (next_month - now).total_seconds()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _ensure_started(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                if not self._loaded:
+                    self._usage.update(await self.backend.load(self._month))
+                    self._loaded = True
+                await asyncio.sleep(settings.QUOTA_FLUSH_INTERVAL_SECONDS)
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing query quotas: {e}")
+                await asyncio.sleep(settings.QUOTA_FLUSH_INTERVAL_SECONDS)
+
+    async def flush(self):
+        """Persist pending usage deltas in one batch"""
+        if not self._pending:
+            return
+        deltas, self._pending, self._pending_total = self._pending, {}, 0
+        await self._persist(self._month, deltas)
+
+    async def _persist(self, month: str, deltas: Dict[str, int]):
+        async with self._flush_lock:
+            try:
+                totals = await self.backend.increment(month, deltas)
+            except Exception as e:
+                logger.error(f"Failed to persist query usage for {month}: {e}")
+                if month == self._month:
+                    # Keep the deltas for the next flush
+                    for tenant, delta in deltas.items():
+                        self._pending[tenant] = self._pending.get(tenant, 0) + delta
+                        self._pending_total += delta
+                return
+            if month == self._month:
+                self._usage.update(totals)
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        # Batch flushes in flight hold usage deltas, let them land rather than cancel them
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self.flush()
+
+# Global quota service instance
+quota_service = QuotaService()
@@ -0,0 +1,192 @@
+import json
+import os
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+class StringColumn:
+    """Strings stored back to back in one UTF-8 arena.
+
+    Row ``i`` is ``arena[offsets[i]:offsets[i + 1]]``; an empty string reads
+    back as None. Appends go to a bytearray and an int64 ``array``, both
+    amortized O(1); a loaded column maps its files and is copied into
+    memory only if rows are added.
+    """
+
+    def __init__(self, arena: Union[bytearray, np.ndarray, None] = None,
+                 offsets: Union[array, np.ndarray, None] = None):
+        self._arena = bytearray() if arena is None else arena
+        self._offsets = array('q', [0]) if offsets is None else offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return str(self._arena[start:end], 'utf-8') if end > start else None
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return (self[row] for row in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._arena) + len(self._offsets) * 8
+
+    def _mutable(self):
+        if isinstance(self._arena, np.ndarray):
+            self._arena = bytearray(self._arena)
+        if isinstance(self._offsets, np.ndarray):
+            offsets = array('q')
+            offsets.frombytes(self._offsets.astype(np.int64).tobytes())
+            self._offsets = offsets
+
+    def extend(self, values: Iterable[Optional[str]]):
+        self._mutable()
+        for value in values:
+            if value:
+                self._arena += value.encode('utf-8')
+            self._offsets.append(len(self._arena))
+
+    def extend_column(self, other: "StringColumn"):
+        """Append another column's rows by copying its arena and shifting its offsets"""
+        self._mutable()
+        shift = len(self._arena)
+        self._arena += memoryview(other._arena)
+        self._offsets.frombytes((np.asarray(other._offsets[1:], dtype=np.int64) + shift).tobytes())
+
+    def files(self, name: str) -> Dict[str, Callable]:
+        # The buffers are written as they are, nothing is serialized
+        return {
+            f'{name}.arena': lambda f: f.write(self._arena),
+            f'{name}.offsets.npy': lambda f: np.save(f, np.frombuffer(self._offsets, dtype=np.int64)
+                                                     if isinstance(self._offsets, array) else self._offsets)
+        }
+
+    @classmethod
+    def load(cls, path: str, name: str, mmap: bool) -> "StringColumn":
+        arena_path = os.path.join(path, f'{name}.arena')
+        if not mmap or os.path.getsize(arena_path) == 0:
+            arena = np.fromfile(arena_path, dtype=np.uint8)
+        else:
+            arena = np.memmap(arena_path, dtype=np.uint8, mode='r')
+        offsets = np.load(os.path.join(path, f'{name}.offsets.npy'), mmap_mode='r' if mmap else None)
+        return cls(arena, offsets)
+
+class InternedColumn:
+    """Repeated strings (source URLs, headings) stored once; rows hold int32 codes, -1 for None"""
+
+    def __init__(self, values: Optional[List[str]] = None, codes: Union[array, np.ndarray, None] = None):
+        self.values = values or []
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+        self._codes = array('i') if codes is None else codes
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self._codes[row]
+        return self.values[code] if code >= 0 else None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._codes) * 4 + sum(len(value) for value in self.values)
+
+    def _code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def _mutable(self):
+        if isinstance(self._codes, np.ndarray):
+            codes = array('i')
+            codes.frombytes(self._codes.astype(np.int32).tobytes())
+            self._codes = codes
+
+    def extend(self, values: Iterable[Optional[str]]):
+        self._mutable()
+        self._codes.extend(self._code(value) for value in values)
+
+    def extend_column(self, other: "InternedColumn"):
+        """Append another column's rows, re-coding them against this column's values"""
+        self._mutable()
+        remap = np.array([self._code(value) for value in other.values] + [-1], dtype=np.int32)
+        # Code -1 indexes the trailing -1 of the remap table
+        self._codes.frombytes(remap[np.asarray(other._codes, dtype=np.int32)].tobytes())
+
+    def files(self, name: str) -> Dict[str, Callable]:
+        return {
+            f'{name}.values.json': lambda f: f.write(json.dumps(self.values).encode()),
+            f'{name}.codes.npy': lambda f: np.save(f, np.frombuffer(self._codes, dtype=np.int32)
+                                                   if isinstance(self._codes, array) else self._codes)
+        }
+
+    @classmethod
+    def load(cls, path: str, name: str, mmap: bool) -> "InternedColumn":
+        with open(os.path.join(path, f'{name}.values.json')) as f:
+            values = json.load(f)
+        codes = np.load(os.path.join(path, f'{name}.codes.npy'), mmap_mode='r' if mmap else None)
+        return cls(values, codes)
+
+class RecordTable:
+    """Columnar records of a bot index, read by row.
+
+    Questions and answers live in string arenas, headings and source URLs
+    are interned, so a row costs its UTF-8 bytes plus 24 bytes of offsets
+    and codes instead of a dict and four string objects. ``table[row]``
+    builds the dict the query path expects only for the rows it returns.
+    Saving writes the column buffers directly and loading maps them.
+    """
+
+    STRING_FIELDS = ('question', 'answer')
+    INTERNED_FIELDS = ('heading', 'source')
+
+    def __init__(self, columns: Optional[Dict[str, Any]] = None):
+        self.columns = columns or {
+            **{name: StringColumn() for name in self.STRING_FIELDS},
+            **{name: InternedColumn() for name in self.INTERNED_FIELDS}
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns['answer'])
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if not 0 <= row < len(self):
+            raise IndexError(f"Record {row} out of range")
+        return {name: column[row] for name, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[row] for row in range(len(self)))
+
+    def column(self, name: str):
+        return self.columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def extend(self, records: Union["RecordTable", Iterable[Dict[str, Any]]]):
+        if isinstance(records, RecordTable):
+            for name, column in self.columns.items():
+                column.extend_column(records.columns[name])
+            return
+
+        records = list(records)
+        for name, column in self.columns.items():
+            column.extend(record.get(name) for record in records)
+
+    def files(self) -> Dict[str, Callable]:
+        files = {}
+        for name, column in self.columns.items():
+            files.update(column.files(name))
+        return files
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "RecordTable":
+        columns = {name: StringColumn.load(path, name, mmap) for name in cls.STRING_FIELDS}
+        columns.update({name: InternedColumn.load(path, name, mmap) for name in cls.INTERNED_FIELDS})
+        return cls(columns)
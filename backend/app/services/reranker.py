@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.inference_scheduler import inference_scheduler
+
+logger = logging.getLogger(__name__)
+
+class Reranker:
+    """Optional second stage re-scoring the top bi-encoder candidates with a cross-encoder.
+
+    Each request has a latency budget. The reranker keeps a running estimate
+    of the cost per (query, passage) pair and only scores as many candidates
+    as fit in the budget, and it is skipped entirely while the inference
+    queue is backed up, so it never becomes the bottleneck under load. The
+    estimate halves every ``RERANK_COST_HALF_LIFE_SECONDS`` without a
+    measurement, so one slow call (a cold model, a busy host) can't keep
+    re-ranking off for good: it resumes and measures again.
+    """
+
+    def __init__(self):
+        self.model = None
+        self._pair_cost = None  # EWMA seconds per scored pair
+        self._measured_at = 0.0
+        self._latencies = deque(maxlen=1000)
+        self.stats = {
+            'reranked': 0,
+            'truncated': 0,
+            'skipped_load': 0,
+            'skipped_budget': 0
+        }
+
+    async def initialize(self):
+        """Load the cross-encoder if re-ranking is enabled"""
+        if not settings.RERANK_ENABLED or self.model is not None:
+            return
+        try:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(settings.RERANK_MODEL)
+            logger.info(f"Re-ranking model {settings.RERANK_MODEL} initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize re-ranking model: {e}")
+            self.model = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RERANK_ENABLED and self.model is not None
+
+    def _estimated_pair_cost(self) -> Optional[float]:
+        if self._pair_cost is None:
+            return None
+        age = time.monotonic() - self._measured_at
+        return self._pair_cost * 0.5 ** (age / settings.RERANK_COST_HALF_LIFE_SECONDS)
+
+    def _affordable_pairs(self, budget_ms: float) -> int:
+        pair_cost = self._estimated_pair_cost()
+        if pair_cost is None:
+            # No estimate yet, score a single batch to learn the cost
+            return settings.RERANK_BATCH_SIZE
+        return int(budget_ms / 1000 / pair_cost)
+
+    async def rerank(self, query: str, candidates: List[Dict[str, Any]], executor: Executor,
+                     budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Reorder candidates by cross-encoder relevance within the latency budget"""
+        if not self.enabled or len(candidates) < 2:
+            return candidates
+
+        if inference_scheduler.queue_depth() > settings.RERANK_MAX_QUEUE_DEPTH:
+            self.stats['skipped_load'] += 1
+            return candidates
+
+        budget_ms = budget_ms if budget_ms is not None else settings.RERANK_BUDGET_MS
+        count = min(len(candidates), self._affordable_pairs(budget_ms))
+        if count < 2:
+            self.stats['skipped_budget'] += 1
+            return candidates
+        if count < len(candidates):
+            self.stats['truncated'] += 1
+
+        head, tail = candidates[:count], candidates[count:]
+        pairs = [(query, candidate['answer']) for candidate in head]
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        scores = await loop.run_in_executor(
+            executor,
+            lambda: self.model.predict(pairs, batch_size=settings.RERANK_BATCH_SIZE)
+        )
+        elapsed = time.perf_counter() - start
+
+        pair_cost = elapsed / len(pairs)
+        previous = self._estimated_pair_cost()
+        self._pair_cost = pair_cost if previous is None else 0.8 * previous + 0.2 * pair_cost
+        self._measured_at = time.monotonic()
+        self._latencies.append(elapsed)
+        self.stats['reranked'] += 1
+
+        for candidate, score in zip(head, scores):
+            candidate['rerank_score'] = 1 / (1 + math.exp(-float(score)))
+        head.sort(key=lambda candidate: candidate['rerank_score'], reverse=True)
+        return head + tail
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            'enabled': self.enabled,
+            'pair_cost_ms': round(self._estimated_pair_cost() * 1000, 3) if self._pair_cost is not None else None,
+            'latency_ms': {
+                'p50': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                'p95': round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 1) if latencies else None
+            },
+            **self.stats
+        }
+
+# Global reranker instance
+reranker = Reranker()
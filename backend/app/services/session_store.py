@@ -0,0 +1,143 @@
+import importlib.util
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sliding windows reported as active users
+ACTIVE_USER_WINDOWS = {
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "24h": 24 * 60 * 60,
+}
+
+class MemorySessionStore:
+    """In-process user_id -> bot_id sessions with TTL expiry and a size bound.
+
+    Both maps are kept in last-activity order, so expired and least recently
+    active users are always at the front and are pruned without scanning.
+    """
+
+    def __init__(self, ttl: int, max_users: int, activity_window: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.activity_window = activity_window
+        self._sessions: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()  # user_id -> (bot_id, last_seen)
+        self._activity: "OrderedDict[int, float]" = OrderedDict()  # user_id -> last_seen
+
+    def _prune(self, now: float):
+        sessions = self._sessions
+        while sessions:
+            user_id, (_, last_seen) = next(iter(sessions.items()))
+            if now - last_seen <= self.ttl and len(sessions) <= self.max_users:
+                break
+            sessions.popitem(last=False)
+
+        activity = self._activity
+        while activity:
+            user_id, last_seen = next(iter(activity.items()))
+            if now - last_seen <= self.activity_window and len(activity) <= self.max_users:
+                break
+            activity.popitem(last=False)
+
+    async def get(self, user_id: int) -> Optional[int]:
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry[1] > self.ttl:
+            del self._sessions[user_id]
+            return None
+        # Sliding expiry, the session lives as long as the user keeps talking
+        self._sessions[user_id] = (entry[0], now)
+        self._sessions.move_to_end(user_id)
+        return entry[0]
+
+    async def set(self, user_id: int, bot_id: int):
+        now = time.time()
+        self._sessions[user_id] = (bot_id, now)
+        self._sessions.move_to_end(user_id)
+        self._prune(now)
+
+    async def delete(self, user_id: int):
+        self._sessions.pop(user_id, None)
+
+    async def touch(self, user_id: int):
+        """Record user activity for active-user counting"""
+        now = time.time()
+        self._activity[user_id] = now
+        self._activity.move_to_end(user_id)
+        self._prune(now)
+
+    async def active_users(self, window: int) -> int:
+        """Distinct users active within the last ``window`` seconds"""
+        cutoff = time.time() - window
+        count = 0
+        for last_seen in reversed(self._activity.values()):
+            if last_seen < cutoff:
+                break
+            count += 1
+        return count
+
+class RedisSessionStore:
+    """Sessions shared by every process through Redis.
+
+    Sessions are plain keys with a sliding TTL; activity is a sorted set of
+    user ids scored by last-seen time, so window counts are a single ZCOUNT.
+    """
+
+    def __init__(self, url: str, ttl: int, max_users: int, activity_window: int, prefix: str = "tg"):
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+        self.max_users = max_users
+        self.activity_window = activity_window
+        self.prefix = prefix
+        self._activity_key = f"{prefix}:active"
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}:session:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[int]:
+        value = await self.redis.getex(self._key(user_id), ex=self.ttl)
+        return int(value) if value is not None else None
+
+    async def set(self, user_id: int, bot_id: int):
+        await self.redis.set(self._key(user_id), bot_id, ex=self.ttl)
+
+    async def delete(self, user_id: int):
+        await self.redis.delete(self._key(user_id))
+
+    async def touch(self, user_id: int):
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._activity_key, {str(user_id): now})
+            pipe.zremrangebyscore(self._activity_key, "-inf", now - self.activity_window)
+            # Keep only the most recently active users
+            pipe.zremrangebyrank(self._activity_key, 0, -(self.max_users + 1))
+            await pipe.execute()
+
+    async def active_users(self, window: int) -> int:
+        return await self.redis.zcount(self._activity_key, time.time() - window, "+inf")
+
+def create_session_store():
+    """Session store selected by TELEGRAM_SESSION_BACKEND"""
+    ttl = settings.TELEGRAM_SESSION_TTL_SECONDS
+    max_users = settings.TELEGRAM_SESSION_MAX_USERS
+    activity_window = max(ACTIVE_USER_WINDOWS.values())
+
+    if settings.TELEGRAM_SESSION_BACKEND == "redis":
+        # redis is optional and only imported when selected, the in-memory store is used without it
+        if importlib.util.find_spec("redis") is not None:
+            return RedisSessionStore(settings.REDIS_URL, ttl, max_users, activity_window)
+        logger.warning("redis package not installed, falling back to in-memory Telegram sessions")
+
+    return MemorySessionStore(ttl, max_users, activity_window)
+
+async def active_user_counts(store) -> Dict[str, int]:
+    """Active users for each reported sliding window"""
+    return {name: await store.active_users(window) for name, window in ACTIVE_USER_WINDOWS.items()}
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, List
+
+from telegram import InlineQuery, InlineQueryResultArticle, InputTextMessageContent, InlineQueryResultsButton
+from telegram.error import TelegramError
+
+from app.core.config import settings
+from app.services.invalidation_bus import invalidation_bus
+from app.services.message_gateway import message_gateway, ChannelAdapter, InboundMessage
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """Cache key for an inline query: case, spacing and trailing punctuation don't matter"""
+    return _WHITESPACE.sub(" ", text.lower()).strip().rstrip("?!.,;: ")
+
+class InlineAdapter(ChannelAdapter):
+    """Hands gateway replies back to the inline query computation waiting on them.
+
+    ``reply_to`` is a future; it may have been cancelled when the answerer stopped.
+    """
+    channel = "telegram_inline"
+
+    async def deliver(self, message: InboundMessage, reply: Dict[str, Any]):
+        if not message.reply_to.done():
+            message.reply_to.set_result(reply)
+
+class InlineAnswerer:
+    """Answers Telegram inline queries without a model call per keystroke.
+
+    Telegram sends a new inline query for every character typed. Answers are
+    cached per bot and normalized query, so a repeated query is answered at
+    once. On a miss the query is debounced per user: only the query still
+    current after ``TELEGRAM_INLINE_DEBOUNCE_MS`` reaches the model, the
+    ones typed over it are never answered (the client only shows the latest
+    results anyway). A query that misses its time budget gets the answer of
+    its longest cached prefix, marked partial and not cached by Telegram,
+    while the full answer keeps computing for the next keystroke. Model
+    calls go through the message gateway like every other channel, so they
+    count against the bot's quota and get its fair share of the workers.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[Tuple[int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._pending: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._computing: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.stats = {
+            'queries': 0,
+            'cache_hits': 0,
+            'debounced': 0,
+            'model_queries': 0,
+            'partial': 0,
+            'rejected': 0,
+            'answered': 0
+        }
+        invalidation_bus.subscribe(self._on_invalidation)
+        message_gateway.register_adapter(InlineAdapter())
+
+    def _on_invalidation(self, event: Dict[str, Any]):
+        # Cached answers came from the bot's previous index
+        if event['type'] == 'index':
+            self.clear(event['bot_id'])
+        elif event['type'] == 'resync':
+            self.clear()
+
+    def clear(self, bot_id: Optional[int] = None):
+        for key in list(self._cache):
+            if bot_id is None or key[0] == bot_id:
+                del self._cache[key]
+
+    def _cached(self, bot_id: int, query: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get((bot_id, query))
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._cache[(bot_id, query)]
+            return None
+        self._cache.move_to_end((bot_id, query))
+        return result
+
+    def _store(self, bot_id: int, query: str, result: Dict[str, Any]):
+        self._cache[(bot_id, query)] = (time.monotonic() + settings.TELEGRAM_INLINE_CACHE_TTL_SECONDS, result)
+        self._cache.move_to_end((bot_id, query))
+        while len(self._cache) > settings.TELEGRAM_INLINE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _prefix_answer(self, bot_id: int, query: str) -> Optional[Dict[str, Any]]:
+        """Cached answer of the longest prefix of the query, if any"""
+        for end in range(len(query) - 1, settings.TELEGRAM_INLINE_MIN_CHARS - 1, -1):
+            result = self._cached(bot_id, query[:end].rstrip())
+            if result is not None:
+                return result
+        return None
+
+    def handle(self, inline_query: InlineQuery, bot_id: Optional[int], personal: bool):
+        """Answer from the cache right away or schedule a debounced answer; never blocks.
+
+        ``personal`` marks answers that depend on the user (their /select
+        choice on the shared bot), so Telegram doesn't reuse them for others.
+        """
+        self.stats['queries'] += 1
+        user_key = (inline_query.get_bot().token, inline_query.from_user.id)
+        pending = self._pending.pop(user_key, None)
+        if pending is not None and not pending.done():
+            pending.cancel()
+            self.stats['debounced'] += 1
+
+        query = normalize_query(inline_query.query)
+        if bot_id is None or len(query) < settings.TELEGRAM_INLINE_MIN_CHARS:
+            task = asyncio.create_task(self._answer(inline_query, bot_id, None, personal))
+        else:
+            result = self._cached(bot_id, query)
+            if result is not None:
+                self.stats['cache_hits'] += 1
+                task = asyncio.create_task(self._answer(inline_query, bot_id, result, personal))
+            else:
+                task = asyncio.create_task(self._debounced(inline_query, bot_id, query, personal))
+                self._pending[user_key] = task
+                task.add_done_callback(lambda t: self._forget(user_key, t))
+        return task
+
+    def _forget(self, user_key: Tuple[str, int], task: asyncio.Task):
+        if self._pending.get(user_key) is task:
+            del self._pending[user_key]
+
+    async def _debounced(self, inline_query: InlineQuery, bot_id: int, query: str, personal: bool):
+        await asyncio.sleep(settings.TELEGRAM_INLINE_DEBOUNCE_MS / 1000)
+
+        # Identical queries from several users share one model call
+        computing = self._computing.get((bot_id, query))
+        if computing is None:
+            self.stats['model_queries'] += 1
+            computing = asyncio.create_task(self._compute(bot_id, inline_query.from_user.id, query))
+            self._computing[(bot_id, query)] = computing
+            computing.add_done_callback(lambda t: self._computing.pop((bot_id, query), None))
+
+        try:
+            # Shielded: a timeout or a newer keystroke must not waste the model call
+            result = await asyncio.wait_for(
+                asyncio.shield(computing), settings.TELEGRAM_INLINE_BUDGET_MS / 1000
+            )
+        except asyncio.TimeoutError:
+            result = None
+        if result is None:
+            # Over budget, over quota or failed: a prefix answer that Telegram must not cache
+            self.stats['partial'] += 1
+            await self._answer(inline_query, bot_id, self._prefix_answer(bot_id, query), personal, partial=True)
+            return
+        await self._answer(inline_query, bot_id, result, personal)
+
+    async def _compute(self, bot_id: int, user_id: int, query: str) -> Optional[Dict[str, Any]]:
+        """Answer through the gateway; None when it is rejected or fails"""
+        reply = asyncio.get_running_loop().create_future()
+        if not message_gateway.submit(InboundMessage("telegram_inline", bot_id, user_id, query, reply_to=reply)):
+            self.stats['rejected'] += 1
+            return None
+        result = await reply
+        if 'error' in result:
+            if result['reason'] in ("rate_limit", "monthly_quota"):
+                self.stats['rejected'] += 1
+            return None
+        self._store(bot_id, query, result)
+        return result
+
+    def _results(self, inline_query: InlineQuery, result: Optional[Dict[str, Any]]) -> List[InlineQueryResultArticle]:
+        if result is None or result['answer'] is None:
+            return []
+        text = result['answer']
+        if result.get('source_url'):
+            text += f"\n\n🔗 Source: {result['source_url']}"
+        return [InlineQueryResultArticle(
+            id="answer",
+            title=inline_query.query.strip()[:64],
+            description=result['answer'][:128],
+            input_message_content=InputTextMessageContent(text[:4096])
+        )]
+
+    async def _answer(self, inline_query: InlineQuery, bot_id: Optional[int],
+                      result: Optional[Dict[str, Any]], personal: bool, partial: bool = False):
+        kwargs = {}
+        if bot_id is None:
+            kwargs['button'] = InlineQueryResultsButton(text="Select a FAQ bot first", start_parameter="select")
+        try:
+            # Telegram caches complete answers itself, partial ones must be asked again
+            await inline_query.answer(
+                self._results(inline_query, result),
+                cache_time=0 if partial or bot_id is None else settings.TELEGRAM_INLINE_CACHE_TIME,
+                is_personal=personal,
+                **kwargs
+            )
+            self.stats['answered'] += 1
+        except TelegramError as e:
+            # Expired because the user kept typing, nothing to do
+            logger.debug(f"Inline query {inline_query.id} not answered: {e}")
+
+    async def stop(self):
+        tasks = list(self._pending.values()) + list(self._computing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'cached_queries': len(self._cache),
+            'pending': len(self._pending),
+            **self.stats
+        }
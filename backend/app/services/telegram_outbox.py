@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Set, Tuple
+
+from telegram import Bot
+from telegram.error import RetryAfter, TelegramError
+
+from app.core.config import settings
+from app.services.rate_limit import TokenBucket
+from app.services.telegram_runtime import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Lower value is sent first
+PRIORITY_REPLY = 0
+PRIORITY_CHAT_ACTION = 1
+
+# Telegram shows a chat action for about 5 seconds, older ones are not worth sending
+CHAT_ACTION_TTL = 5.0
+
+class OutboundMessage:
+    __slots__ = ("bot", "chat_id", "method", "kwargs", "priority", "enqueued_at", "attempts", "future")
+
+    def __init__(self, bot: Bot, chat_id: int, method: str, kwargs: Dict[str, Any], priority: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.method = method
+        self.kwargs = kwargs
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.future: Optional[asyncio.Future] = None
+
+    @property
+    def chat_key(self) -> Tuple[str, int]:
+        return (self.bot.token, self.chat_id)
+
+class TelegramOutbox:
+    """Outbound scheduler for Telegram messages.
+
+    Handlers enqueue and return immediately; a single dispatcher sends in
+    priority order (replies before chat actions) while keeping each bot token
+    under a global rate and each chat under a per-chat rate. Pending chat
+    actions are coalesced per chat and flood-control errors are retried after
+    the delay Telegram asks for.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending_actions: Dict[Tuple[str, int], OutboundMessage] = {}
+        self._global_buckets: Dict[str, TokenBucket] = {}
+        self._chat_buckets: "OrderedDict[Tuple[str, int], TokenBucket]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1000)
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'dropped': 0,
+            'coalesced': 0
+        }
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatcher, let in-flight sends finish and fail anything still queued"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        while self._heap:
+            _, _, message = heapq.heappop(self._heap)
+            if message.future and not message.future.done():
+                message.future.cancel()
+        self._pending_actions.clear()
+
+    def send_message(self, bot: Bot, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Queue a reply; the returned future resolves with the sent Message"""
+        kwargs.update(chat_id=chat_id, text=text)
+        message = OutboundMessage(bot, chat_id, "send_message", kwargs, PRIORITY_REPLY)
+        message.future = asyncio.get_running_loop().create_future()
+        # Callers may fire and forget, failures are logged by the dispatcher
+        message.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        # The answer supersedes a typing indicator that has not gone out yet
+        action = self._pending_actions.pop(message.chat_key, None)
+        if action is not None:
+            action.method = None
+            self.stats['coalesced'] += 1
+
+        if not self._push(message):
+            message.future.set_exception(TelegramError("Outbound queue full"))
+        return message.future
+
+    def send_chat_action(self, bot: Bot, chat_id: int, action: str = "typing"):
+        """Queue a chat action, coalesced with one already pending for the chat"""
+        message = OutboundMessage(bot, chat_id, "send_chat_action",
+                                  {'chat_id': chat_id, 'action': action}, PRIORITY_CHAT_ACTION)
+        pending = self._pending_actions.get(message.chat_key)
+        if pending is not None:
+            pending.kwargs['action'] = action
+            self.stats['coalesced'] += 1
+            return
+
+        if self._push(message):
+            self._pending_actions[message.chat_key] = message
+
+    def _push(self, message: OutboundMessage) -> bool:
+        if len(self._heap) >= settings.TELEGRAM_OUTBOX_MAX_QUEUE:
+            self.stats['dropped'] += 1
+            logger.warning(f"Telegram outbox full, dropping {message.method} to chat {message.chat_id}")
+            return False
+        heapq.heappush(self._heap, (message.priority, next(self._seq), message))
+        self._ensure_running()
+        self._wakeup.set()
+        return True
+
+    def _global_bucket(self, token: str) -> TokenBucket:
+        bucket = self._global_buckets.get(token)
+        if bucket is None:
+            bucket = TokenBucket(settings.TELEGRAM_OUTBOX_GLOBAL_RATE)
+            self._global_buckets[token] = bucket
+        return bucket
+
+    def _chat_bucket(self, key: Tuple[str, int]) -> TokenBucket:
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(settings.TELEGRAM_OUTBOX_CHAT_RATE, settings.TELEGRAM_OUTBOX_CHAT_BURST)
+            self._chat_buckets[key] = bucket
+            # Idle chats fall off the end, a fresh bucket starts full anyway
+            if len(self._chat_buckets) > settings.TELEGRAM_OUTBOX_MAX_CHATS:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(key)
+        return bucket
+
+    def _next_ready(self) -> Tuple[Optional[OutboundMessage], float]:
+        """Pop the highest-priority message whose chat and token have capacity.
+
+        Returns the message (or None) and how long to wait before trying again.
+        """
+        deferred = []
+        wait = 1.0
+        ready = None
+        now = time.monotonic()
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            message = entry[2]
+            if message.method is None:
+                continue  # coalesced away
+            if message.priority == PRIORITY_CHAT_ACTION and now - message.enqueued_at > CHAT_ACTION_TTL:
+                self._pending_actions.pop(message.chat_key, None)
+                self.stats['dropped'] += 1
+                continue
+
+            delay = max(self._global_bucket(message.bot.token).delay(),
+                        self._chat_bucket(message.chat_key).delay())
+            if delay > 0:
+                deferred.append(entry)
+                wait = min(wait, delay)
+                continue
+
+            ready = message
+            break
+
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        return ready, wait
+
+    async def _run(self):
+        while True:
+            message, wait = self._next_ready()
+            if message is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait if self._heap else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._global_bucket(message.bot.token).try_acquire()
+            self._chat_bucket(message.chat_key).try_acquire()
+            if message.priority == PRIORITY_CHAT_ACTION:
+                self._pending_actions.pop(message.chat_key, None)
+            # Sends run concurrently, ordering and pacing are decided above
+            self._in_flight += 1
+            task = asyncio.create_task(self._send(message))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, message: OutboundMessage):
+        try:
+            message.attempts += 1
+            result = await getattr(message.bot, message.method)(**message.kwargs)
+            self.stats['sent'] += 1
+            self._latencies.append(time.monotonic() - message.enqueued_at)
+            if message.future and not message.future.done():
+                message.future.set_result(result)
+        except RetryAfter as e:
+            delay = retry_after_seconds(e.retry_after)
+            self._global_bucket(message.bot.token).penalize(delay)
+            if message.attempts <= settings.TELEGRAM_OUTBOX_MAX_RETRIES and message.priority == PRIORITY_REPLY:
+                self.stats['retried'] += 1
+                logger.warning(f"Telegram flood limit, retrying message to chat {message.chat_id} in {delay}s")
+                heapq.heappush(self._heap, (message.priority, next(self._seq), message))
+                self._wakeup.set()
+            else:
+                self._fail(message, e)
+        except Exception as e:
+            self._fail(message, e)
+        finally:
+            self._in_flight -= 1
+
+    def _fail(self, message: OutboundMessage, error: Exception):
+        self.stats['failed'] += 1
+        logger.error(f"Failed to {message.method} to chat {message.chat_id}: {error}")
+        if message.future and not message.future.done():
+            message.future.set_exception(error)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, in-flight sends, send latency and counters"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            'queue_depth': len(self._heap),
+            'pending_chat_actions': len(self._pending_actions),
+            'in_flight': self._in_flight,
+            'send_latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99)
+            },
+            **self.stats
+        }
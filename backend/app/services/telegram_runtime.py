@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Callable, Coroutine, Dict, Optional, Union
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.request import HTTPXRequest
+
+from app.services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+def retry_after_seconds(value: Union[int, float, timedelta]) -> float:
+    """Normalize RetryAfter.retry_after across python-telegram-bot versions"""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+class SharedHTTPXRequest(HTTPXRequest):
+    """Connection pool shared by every tenant bot in the process.
+
+    Each ``Bot`` initializes and shuts down its request objects; with a shared
+    pool only ``close`` (called by the runtime on exit) actually closes it.
+    """
+
+    async def shutdown(self) -> None:
+        # Individual bots shutting down must not close the shared pool
+        return
+
+    async def close(self) -> None:
+        await super().shutdown()
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """Per-token limiter keeping a bot under Telegram's per-bot request rate"""
+
+    def __init__(self, rate: float):
+        self.bucket = TokenBucket(rate)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Any],
+    ):
+        await self.bucket.acquire()
+        try:
+            return await callback(*args, **kwargs)
+        except RetryAfter as e:
+            # Stop every caller on this token until Telegram lets us back in
+            delay = retry_after_seconds(e.retry_after)
+            self.bucket.penalize(delay)
+            logger.warning(f"Telegram flood limit on {endpoint}, backing off {delay}s")
+            raise
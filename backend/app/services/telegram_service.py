@@ -1,23 +1,77 @@
 import asyncio
+import hashlib
+import hmac
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from telegram import Update, Bot, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
+from telegram.ext import (
+    Application, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters, ContextTypes
+)
 from telegram.error import TelegramError
-import json
 from datetime import datetime
 
-from app.services.ai_service import ai_service
+from app.services.telegram_runtime import SharedHTTPXRequest, TokenBucketRateLimiter
+from app.services.telegram_outbox import TelegramOutbox
+from app.services.telegram_inline import InlineAnswerer
+from app.services.session_store import create_session_store, active_user_counts
+from app.services.message_gateway import message_gateway, ChannelAdapter, InboundMessage
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+class TenantTokenInUse(Exception):
+    """Raised when a tenant bot token is already served for another FAQ bot"""
+
+class TenantBotLimitReached(Exception):
+    """Raised when TELEGRAM_MAX_TENANT_BOTS tenant tokens are already served"""
+
+class TelegramAdapter(ChannelAdapter):
+    """Formats gateway replies as Telegram messages queued on the outbox"""
+    channel = "telegram"
+
+    def __init__(self, service: "TelegramBotService"):
+        self.service = service
+
+    async def deliver(self, message: InboundMessage, reply: Dict[str, Any]):
+        bot, chat_id, message_id = message.reply_to
+        kwargs = {}
+        if 'error' not in reply:
+            text = f"🤖 **Answer:**\n\n{reply['answer']}\n\n"
+            text += f"📊 Confidence: {reply['confidence']:.1%}\n"
+            if reply.get('source_url'):
+                text += f"🔗 Source: {reply['source_url']}"
+            kwargs['parse_mode'] = 'Markdown'
+            
+            # Update bot statistics
+            if message.bot_id in self.service.active_bots:
+                self.service.active_bots[message.bot_id]['total_queries'] += 1
+        elif reply['reason'] == "rate_limit":
+            text = "⏳ You're sending questions a bit too fast. Please wait a moment and try again."
+        elif reply['reason'] == "monthly_quota":
+            text = "This FAQ bot has reached its monthly question limit. Please try again later."
+        elif reply['reason'] == "failed":
+            text = "I apologize, but I couldn't process your question. Please try again or contact support."
+        else:
+            text = "I'm experiencing technical difficulties. Please try again later."
+        
+        self.service.outbox.send_message(bot, chat_id, text, reply_to_message_id=message_id, **kwargs)
+
 class TelegramBotService:
     def __init__(self):
         self.bot = None
-        self.application = None
+        self.application = None  # shared bot (TELEGRAM_BOT_TOKEN), users pick a FAQ bot via /select
+        self.tenant_applications: Dict[int, Application] = {}  # bot_id -> application for the bot's own token
         self.active_bots = {}  # bot_id -> bot_config
-        self.user_sessions = {}  # user_id -> current_bot_id
+        self.sessions = create_session_store()  # user_id -> current_bot_id
+        self.update_queue: Optional[asyncio.Queue] = None
+        self.update_workers: List[asyncio.Task] = []
+        self.webhook_mode = False
+        self.running = False
+        self.outbox = TelegramOutbox()
+        self.inline = InlineAnswerer()
+        self._request: Optional[SharedHTTPXRequest] = None
+        self._updates_request: Optional[SharedHTTPXRequest] = None
+        message_gateway.register_adapter(TelegramAdapter(self))
         
     async def initialize(self):
         """Initialize the Telegram bot service"""
@@ -26,16 +80,8 @@ class TelegramBotService:
             return False
             
         try:
-            self.bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-            self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
-            
-            # Add handlers
-            self.application.add_handler(CommandHandler("start", self.start_command))
-            self.application.add_handler(CommandHandler("help", self.help_command))
-            self.application.add_handler(CommandHandler("list", self.list_bots_command))
-            self.application.add_handler(CommandHandler("select", self.select_bot_command))
-            self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
-            self.application.add_handler(CallbackQueryHandler(self.handle_callback))
+            self.application = self._build_application(settings.TELEGRAM_BOT_TOKEN)
+            self.bot = self.application.bot
             
             logger.info("Telegram bot service initialized successfully")
             return True
@@ -44,44 +90,278 @@ class TelegramBotService:
             logger.error(f"Failed to initialize Telegram bot: {e}")
             return False
     
-    async def start_bot(self):
-        """Start the Telegram bot"""
+    def _shared_requests(self):
+        """HTTP connection pools shared by every bot token in this process"""
+        if self._request is None:
+            self._request = SharedHTTPXRequest(
+                connection_pool_size=settings.TELEGRAM_CONNECTION_POOL_SIZE
+            )
+            # Long polling holds one connection per token for the whole poll timeout
+            self._updates_request = SharedHTTPXRequest(
+                connection_pool_size=settings.TELEGRAM_MAX_TENANT_BOTS + 1,
+                read_timeout=settings.TELEGRAM_POLL_TIMEOUT + 10
+            )
+        return self._request, self._updates_request
+    
+    def _build_application(self, token: str, bot_id: Optional[int] = None) -> Application:
+        """Build an application for a bot token with the shared pools and a per-token rate limiter"""
+        request, updates_request = self._shared_requests()
+        application = (
+            Application.builder()
+            .token(token)
+            .base_url(settings.TELEGRAM_API_BASE_URL)
+            .request(request)
+            .get_updates_request(updates_request)
+            .rate_limiter(TokenBucketRateLimiter(settings.TELEGRAM_TOKEN_RATE_LIMIT))
+            .build()
+        )
+        # Tenant bots answer for a single FAQ bot, the shared bot uses /select
+        application.bot_data['faq_bot_id'] = bot_id
+        
+        # Add handlers
+        application.add_handler(CommandHandler("start", self.start_command))
+        application.add_handler(CommandHandler("help", self.help_command))
+        application.add_handler(CommandHandler("list", self.list_bots_command))
+        application.add_handler(CommandHandler("select", self.select_bot_command))
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
+        application.add_handler(CallbackQueryHandler(self.handle_callback))
+        application.add_handler(InlineQueryHandler(self.handle_inline_query))
+        
+        return application
+    
+    def _applications(self) -> List[Application]:
+        applications = list(self.tenant_applications.values())
+        if self.application:
+            applications.insert(0, self.application)
+        return applications
+    
+    def _webhook_url(self, base_url: str, bot_id: Optional[int] = None) -> str:
+        base_url = base_url.rstrip('/')
+        return base_url if bot_id is None else f"{base_url}/{bot_id}"
+    
+    def webhook_secret(self, bot_id: Optional[int] = None) -> str:
+        """Secret token Telegram sends back with every update for a bot token"""
+        secret = settings.TELEGRAM_WEBHOOK_SECRET
+        if bot_id is None:
+            return secret
+        # Derive a distinct secret per tenant token so one leaked secret can't spoof other bots
+        return hmac.new(secret.encode(), str(bot_id).encode(), hashlib.sha256).hexdigest()
+    
+    async def start_bot(self, webhook_url: Optional[str] = None):
+        """Start the Telegram bot, using a webhook when a URL is configured and polling otherwise"""
         if not self.application:
             logger.error("Telegram bot not initialized")
             return
+        
+        webhook_url = webhook_url or settings.TELEGRAM_WEBHOOK_URL
+        if webhook_url:
+            await self.start_webhook(webhook_url)
+            return
             
         try:
-            await self.application.initialize()
-            await self.application.start()
-            await self.application.updater.start_polling()
-            logger.info("Telegram bot started successfully")
+            for application in self._applications():
+                await self._start_polling(application)
+            self.running = True
+            logger.info(f"Telegram bot started successfully ({len(self._applications())} tokens)")
         except Exception as e:
             logger.error(f"Failed to start Telegram bot: {e}")
     
+    async def _start_polling(self, application: Application):
+        await application.initialize()
+        await application.start()
+        await application.updater.start_polling(timeout=settings.TELEGRAM_POLL_TIMEOUT)
+    
+    async def start_webhook(self, webhook_url: str):
+        """Register the webhook with Telegram and start processing pushed updates"""
+        if not settings.TELEGRAM_WEBHOOK_SECRET:
+            logger.error("TELEGRAM_WEBHOOK_SECRET not set, refusing to start webhook mode")
+            return
+        
+        try:
+            await self.start_update_workers()
+            await self._set_webhook(self.application, webhook_url)
+            for bot_id, application in self.tenant_applications.items():
+                await self._set_webhook(application, self._tenant_webhook_url(bot_id), bot_id)
+            self.running = True
+            logger.info(f"Telegram webhook set to {webhook_url}")
+        except Exception as e:
+            logger.error(f"Failed to start Telegram webhook: {e}")
+    
+    def _tenant_webhook_url(self, bot_id: int) -> str:
+        return self.active_bots.get(bot_id, {}).get('webhook_url') or \
+            self._webhook_url(settings.TELEGRAM_WEBHOOK_URL, bot_id)
+    
+    async def _set_webhook(self, application: Application, webhook_url: str, bot_id: Optional[int] = None):
+        await application.bot.set_webhook(
+            url=webhook_url,
+            secret_token=self.webhook_secret(bot_id),
+            allowed_updates=Update.ALL_TYPES
+        )
+    
+    async def start_update_workers(self):
+        """Start the worker pool that processes webhook updates.
+        
+        Every API worker process runs its own pool, so webhook traffic spreads
+        across however many processes sit behind the load balancer.
+        """
+        if self.update_workers:
+            return
+        
+        for application in self._applications():
+            await application.initialize()
+            await application.start()
+        
+        self.webhook_mode = True
+        self.update_queue = asyncio.Queue(maxsize=settings.TELEGRAM_UPDATE_QUEUE_SIZE)
+        self.update_workers = [
+            asyncio.create_task(self._process_updates(i))
+            for i in range(settings.TELEGRAM_UPDATE_WORKERS)
+        ]
+        logger.info(f"Started {len(self.update_workers)} Telegram update workers")
+    
+    def get_application(self, bot_id: Optional[int] = None) -> Optional[Application]:
+        """Application receiving updates for a tenant bot (or the shared bot when None)"""
+        if bot_id is None:
+            return self.application
+        return self.tenant_applications.get(bot_id)
+    
+    async def enqueue_update(self, data: Dict[str, Any], bot_id: Optional[int] = None) -> bool:
+        """Validate a webhook payload and queue it for processing.
+        
+        Returns False when the queue is full so the caller can ask Telegram to retry.
+        """
+        application = self.get_application(bot_id)
+        if application is None:
+            raise LookupError(f"No Telegram application for bot {bot_id}")
+        
+        if not isinstance(data, dict) or not isinstance(data.get('update_id'), int):
+            raise ValueError("Invalid Telegram update payload")
+        
+        update = Update.de_json(data, application.bot)
+        if update is None:
+            raise ValueError("Invalid Telegram update payload")
+        
+        try:
+            self.update_queue.put_nowait((application, update))
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Telegram update queue full, rejecting update")
+            return False
+    
+    async def _process_updates(self, worker_id: int):
+        """Worker loop handing queued updates to the application handlers"""
+        while True:
+            application, update = await self.update_queue.get()
+            try:
+                await application.process_update(update)
+            except Exception as e:
+                logger.error(f"Update worker {worker_id} failed to process update {update.update_id}: {e}")
+            finally:
+                self.update_queue.task_done()
+    
+    async def _stop_application(self, application: Application):
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+    
     async def stop_bot(self):
         """Stop the Telegram bot"""
-        if self.application:
-            await self.application.updater.stop()
-            await self.application.stop()
-            await self.application.shutdown()
-            logger.info("Telegram bot stopped")
+        if self.update_workers:
+            for worker in self.update_workers:
+                worker.cancel()
+            await asyncio.gather(*self.update_workers, return_exceptions=True)
+            self.update_workers = []
+            self.update_queue = None
+            self.webhook_mode = False
+        
+        await self.outbox.stop()
+        await self.inline.stop()
+        
+        for application in self._applications():
+            try:
+                await self._stop_application(application)
+            except Exception as e:
+                logger.error(f"Error stopping Telegram application: {e}")
+        
+        # Closed pools are reopened by the next Bot.initialize()
+        if self._request is not None:
+            await self._request.close()
+            await self._updates_request.close()
+        
+        self.running = False
+        logger.info("Telegram bot stopped")
     
-    async def register_faq_bot(self, bot_id: int, bot_name: str, bot_token: str = None):
-        """Register a new FAQ bot for Telegram integration"""
+    async def register_faq_bot(self, bot_id: int, bot_name: str, bot_token: str = None,
+                               webhook_url: str = None):
+        """Register a new FAQ bot for Telegram integration.
+
+        Raises TenantTokenInUse or TenantBotLimitReached, leaving the bot
+        unregistered, when its own token can't be served.
+        """
+        await self._remove_tenant_application(bot_id)
         self.active_bots[bot_id] = {
             'name': bot_name,
             'token': bot_token,
+            'webhook_url': webhook_url,
             'created_at': datetime.now(),
             'total_queries': 0
         }
+        if bot_token and bot_token != settings.TELEGRAM_BOT_TOKEN:
+            try:
+                await self._add_tenant_application(bot_id, bot_token)
+            except (TenantTokenInUse, TenantBotLimitReached):
+                del self.active_bots[bot_id]
+                raise
         logger.info(f"Registered FAQ bot: {bot_name} (ID: {bot_id})")
     
     async def unregister_faq_bot(self, bot_id: int):
         """Unregister a FAQ bot"""
         if bot_id in self.active_bots:
+            await self._remove_tenant_application(bot_id)
             del self.active_bots[bot_id]
             logger.info(f"Unregistered FAQ bot ID: {bot_id}")
     
+    async def _add_tenant_application(self, bot_id: int, bot_token: str):
+        """Serve a tenant's own bot token, starting it right away if the runtime is running"""
+        if any(config.get('token') == bot_token for other_id, config in self.active_bots.items()
+               if other_id != bot_id and other_id in self.tenant_applications):
+            raise TenantTokenInUse(f"Token of bot {bot_id} is already served by another FAQ bot")
+        if len(self.tenant_applications) >= settings.TELEGRAM_MAX_TENANT_BOTS:
+            raise TenantBotLimitReached(
+                f"Tenant bot limit of {settings.TELEGRAM_MAX_TENANT_BOTS} reached, bot {bot_id} not started"
+            )
+        
+        application = self._build_application(bot_token, bot_id)
+        self.tenant_applications[bot_id] = application
+        if not self.running:
+            return
+        
+        try:
+            if self.webhook_mode:
+                await application.initialize()
+                await application.start()
+                await self._set_webhook(application, self._tenant_webhook_url(bot_id), bot_id)
+            else:
+                await self._start_polling(application)
+        except Exception as e:
+            logger.error(f"Failed to start Telegram bot for FAQ bot {bot_id}: {e}")
+            del self.tenant_applications[bot_id]
+    
+    async def _remove_tenant_application(self, bot_id: int):
+        application = self.tenant_applications.pop(bot_id, None)
+        if application is None:
+            return
+        
+        try:
+            if self.webhook_mode:
+                await application.bot.delete_webhook()
+            if application.running or application.updater.running:
+                await self._stop_application(application)
+        except Exception as e:
+            logger.error(f"Error stopping Telegram bot for FAQ bot {bot_id}: {e}")
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         user_id = update.effective_user.id
@@ -101,7 +381,7 @@ Available commands:
 Just send me a question and I'll do my best to help you!
         """
         
-        await update.message.reply_text(welcome_text)
+        self._reply(update, context, welcome_text)
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
@@ -123,12 +403,12 @@ How to use:
 The bot uses advanced AI to understand your questions and provide relevant answers based on the knowledge base.
         """
         
-        await update.message.reply_text(help_text)
+        self._reply(update, context, help_text)
     
     async def list_bots_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /list command"""
         if not self.active_bots:
-            await update.message.reply_text("No FAQ bots are currently available.")
+            self._reply(update, context, "No FAQ bots are currently available.")
             return
         
         text = "🤖 Available FAQ Bots:\n\n"
@@ -145,28 +425,28 @@ The bot uses advanced AI to understand your questions and provide relevant answe
             )])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(text, reply_markup=reply_markup)
+        self._reply(update, context, text, reply_markup=reply_markup)
     
     async def select_bot_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /select command"""
         if not context.args:
-            await update.message.reply_text("Please provide a bot ID. Use /list to see available bots.")
+            self._reply(update, context, "Please provide a bot ID. Use /list to see available bots.")
             return
         
         try:
             bot_id = int(context.args[0])
             if bot_id not in self.active_bots:
-                await update.message.reply_text(f"Bot with ID {bot_id} not found. Use /list to see available bots.")
+                self._reply(update, context, f"Bot with ID {bot_id} not found. Use /list to see available bots.")
                 return
             
             user_id = update.effective_user.id
-            self.user_sessions[user_id] = bot_id
+            await self.sessions.set(user_id, bot_id)
             
             bot_name = self.active_bots[bot_id]['name']
-            await update.message.reply_text(f"✅ Selected FAQ bot: {bot_name}\n\nYou can now ask questions!")
+            self._reply(update, context, f"✅ Selected FAQ bot: {bot_name}\n\nYou can now ask questions!")
             
         except ValueError:
-            await update.message.reply_text("Invalid bot ID. Please provide a number.")
+            self._reply(update, context, "Invalid bot ID. Please provide a number.")
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle callback queries from inline keyboards"""
@@ -177,7 +457,7 @@ The bot uses advanced AI to understand your questions and provide relevant answe
             bot_id = int(query.data.split("_")[1])
             if bot_id in self.active_bots:
                 user_id = query.from_user.id
-                self.user_sessions[user_id] = bot_id
+                await self.sessions.set(user_id, bot_id)
                 bot_name = self.active_bots[bot_id]['name']
                 await query.edit_message_text(f"✅ Selected FAQ bot: {bot_name}\n\nYou can now ask questions!")
             else:
@@ -187,62 +467,60 @@ The bot uses advanced AI to understand your questions and provide relevant answe
         """Handle regular text messages"""
         user_id = update.effective_user.id
         message_text = update.message.text
+        await self.sessions.touch(user_id)
         
-        # Check if user has selected a bot
-        if user_id not in self.user_sessions:
-            await update.message.reply_text(
-                "Please select a FAQ bot first using /list and /select commands."
-            )
-            return
+        # Tenant bots serve a single FAQ bot, the shared bot uses the user's selection
+        bot_id = context.bot_data.get('faq_bot_id')
+        if bot_id is None:
+            bot_id = await self.sessions.get(user_id)
+            
+            # Check if user has selected a bot
+            if bot_id is None:
+                self._reply(update, context, "Please select a FAQ bot first using /list and /select commands.")
+                return
         
-        bot_id = self.user_sessions[user_id]
+        chat_id = update.effective_chat.id
         
-        # Show typing indicator
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        # Answered by the gateway workers, this handler only queues the question
+        message = InboundMessage(
+            "telegram", bot_id, user_id, message_text,
+            reply_to=(context.bot, chat_id, update.message.message_id)
+        )
+        if not message_gateway.submit(message):
+            self._reply(update, context, "⏳ I'm answering a lot of questions right now. Please try again in a moment.")
+            return
         
-        try:
-            # Initialize AI service if needed
-            if ai_service.model is None:
-                await ai_service.initialize_model()
-            
-            # Query the AI service
-            result = await ai_service.query_bot(bot_id, message_text)
-            
-            if result['success']:
-                # Format response
-                response_text = f"🤖 **Answer:**\n\n{result['answer']}\n\n"
-                response_text += f"📊 Confidence: {result['confidence']:.1%}\n"
-                
-                if result.get('source_url'):
-                    response_text += f"🔗 Source: {result['source_url']}"
-                
-                # Update bot statistics
-                if bot_id in self.active_bots:
-                    self.active_bots[bot_id]['total_queries'] += 1
-                
-                await update.message.reply_text(response_text, parse_mode='Markdown')
-                
-            else:
-                await update.message.reply_text(
-                    "I apologize, but I couldn't process your question. Please try again or contact support."
-                )
-                
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            await update.message.reply_text(
-                "I'm experiencing technical difficulties. Please try again later."
-            )
+        # Show typing indicator
+        self.outbox.send_chat_action(context.bot, chat_id, "typing")
+    
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle inline queries (@bot question in any chat), answered in the background"""
+        bot_id = context.bot_data.get('faq_bot_id')
+        personal = bot_id is None
+        if personal:
+            bot_id = await self.sessions.get(update.inline_query.from_user.id)
+        self.inline.handle(update.inline_query, bot_id, personal)
+    
+    def _reply(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, **kwargs):
+        """Queue a reply to the update's message on the outbound scheduler"""
+        return self.outbox.send_message(
+            context.bot, update.effective_chat.id, text,
+            reply_to_message_id=update.message.message_id, **kwargs
+        )
     
     async def get_bot_stats(self) -> Dict[str, Any]:
         """Get statistics for all active bots"""
         total_queries = sum(bot['total_queries'] for bot in self.active_bots.values())
-        active_users = len(self.user_sessions)
+        active_users = await active_user_counts(self.sessions)
         
         return {
             'active_bots': len(self.active_bots),
             'total_queries': total_queries,
-            'active_users': active_users,
-            'bots': list(self.active_bots.keys())
+            'active_users': active_users['24h'],
+            'active_users_by_window': active_users,
+            'bots': list(self.active_bots.keys()),
+            'tenant_tokens': len(self.tenant_applications),
+            'inline': self.inline.get_stats()
         }
 
 # Global Telegram bot service instance
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+from typing import List, Dict, Any, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.record_table import RecordTable
+
+logger = logging.getLogger(__name__)
+
+# Rows converted to float32 at a time while scoring a float16 index
+SEARCH_BLOCK_ROWS = 16384
+
+class BotIndex:
+    """Passage index for one bot: L2-normalized embeddings plus their columnar records.
+
+    Vectors are stored as float16 by default (half the memory of float32) in
+    a buffer that grows by doubling, so appending batches is amortized O(1)
+    per row. Scoring is a dot product over row blocks, which equals cosine
+    similarity because every row is normalized.
+    """
+
+    def __init__(self, dim: int, embedder: str, capacity: int = 1024):
+        self.dim = dim
+        self.embedder = embedder  # model the vectors came from; queries must use the same one
+        self.version = 0  # assigned when published
+        self.created_at = None
+        self.dtype = np.dtype(settings.INDEX_DTYPE)
+        self._vectors = np.empty((capacity, dim), dtype=self.dtype)
+        self.size = 0
+        self.records = RecordTable()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, vectors: np.ndarray, records: Union[RecordTable, List[Dict[str, Any]]]):
+        """Append embedded rows and their records"""
+        vectors = self.normalize(vectors)
+        if len(vectors) != len(records):
+            raise ValueError("Number of vectors and records differ")
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+        needed = self.size + len(vectors)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            grown = np.empty((capacity, self.dim), dtype=self.dtype)
+            grown[:self.size] = self.vectors
+            self._vectors = grown
+
+        self._vectors[self.size:needed] = vectors
+        self.size = needed
+        self.records.extend(records)
+
+    def save(self, path: str):
+        """Write vectors (.npy) and the record columns under ``path``, meta.json last"""
+        os.makedirs(path, exist_ok=True)
+        files = {
+            'vectors.npy': lambda f: np.save(f, self.vectors),
+            **self.records.files(),
+            'meta.json': lambda f: f.write(json.dumps({
+                'dim': self.dim, 'embedder': self.embedder, 'version': self.version, 'created_at': self.created_at
+            }).encode())
+        }
+        for name, write in files.items():
+            tmp_path = os.path.join(path, f".{name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(path, name))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BotIndex":
+        """Read an index written by ``save``.
+
+        With ``mmap`` the vectors and record columns stay in the page cache
+        and are shared by every process that maps them; adding rows copies
+        them into memory. Indexes saved with a ``records.json`` still load.
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        legacy_path = os.path.join(path, 'records.json')
+        if os.path.exists(legacy_path):
+            # Written before records were columnar
+            with open(legacy_path) as f:
+                records = RecordTable()
+                records.extend(json.load(f))
+        else:
+            records = RecordTable.load(path, mmap)
+        vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r' if mmap else None)
+
+        index = cls(meta['dim'], meta['embedder'], capacity=0)
+        index.dtype = vectors.dtype
+        index._vectors = vectors
+        index.size = len(vectors)
+        index.records = records
+        index.version = meta.get('version', 0)
+        index.created_at = meta.get('created_at')
+        return index
+
+    def scores(self, query_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every row"""
+        query = self.normalize(query_vector)[0]
+        vectors = self.vectors
+        if vectors.dtype == np.float32:
+            return vectors @ query
+
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, SEARCH_BLOCK_ROWS):
+            block = vectors[start:start + SEARCH_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def search(self, query_vector: np.ndarray, top_k: int, min_score: float) -> List[Tuple[int, float]]:
+        """Best ``top_k`` rows scoring at least ``min_score``, best first"""
+        if self.size == 0:
+            return []
+
+        scores = self.scores(query_vector)
+        k = min(top_k, self.size)
+        # Partial selection instead of sorting every row
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in candidates if scores[i] >= min_score]
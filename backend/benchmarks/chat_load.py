@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Connections per worker and memory per connection for WebSocket chat.
+Run against a server started with: python run.py --workers 1
+Then: python benchmarks/chat_load.py [--connections 5000] [--questions 1000] [--pid <worker pid>]
+
+Opens idle WebSockets to /api/v1/chat/{bot}/ws and reports how long that
+took and, given the worker's pid, its RSS growth per connection. Then
+sends questions spread over the open connections at once and reports
+answer latency and how many were answered, rejected by quota or refused.
+Raise the open file limit (ulimit -n) for large connection counts.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float("nan")
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+async def main(args):
+    url = f"ws://{args.host}:{args.port}/api/v1/chat/{args.bot}/ws"
+    rss_before = rss_kb(args.pid) if args.pid else None
+
+    semaphore = asyncio.Semaphore(args.open_concurrency)
+
+    async def connect():
+        async with semaphore:
+            return await websockets.connect(url, compression=None, max_queue=None)
+
+    start = time.perf_counter()
+    connections = await asyncio.gather(*(connect() for _ in range(args.connections)))
+    opened = time.perf_counter() - start
+    await asyncio.sleep(1)  # let the worker settle before reading its RSS
+
+    print(f"{len(connections)} idle WebSockets opened in {opened:.1f}s")
+    if args.pid:
+        rss_after = rss_kb(args.pid)
+        print(f"worker RSS {rss_before / 1024:.0f}MB -> {rss_after / 1024:.0f}MB, "
+              f"{(rss_after - rss_before) / len(connections):.1f} kB per connection")
+
+    latencies, outcomes = [], {}
+
+    async def ask(i):
+        websocket = connections[i % len(connections)]
+        start = time.perf_counter()
+        await websocket.send(json.dumps({"id": i, "question": args.question}))
+        # Questions on the same connection may be answered out of order, match by id
+        while True:
+            reply = json.loads(await websocket.recv())
+            if reply.get("id") == i:
+                break
+        latencies.append(time.perf_counter() - start)
+        outcome = "answered" if "answer" in reply else reply.get("error", "error")
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    # One question per connection at a time keeps replies from interleaving across ask() calls
+    questions = min(args.questions, len(connections))
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(i) for i in range(questions)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{questions} concurrent questions in {elapsed:.2f}s, "
+          f"p50 {percentile(latencies, 0.5):.0f}ms p95 {percentile(latencies, 0.95):.0f}ms")
+    for outcome, count in sorted(outcomes.items(), key=lambda item: -item[1]):
+        print(f"  {count:6d}  {outcome}")
+
+    await asyncio.gather(*(websocket.close() for websocket in connections), return_exceptions=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket chat load test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--bot", type=int, default=1, help="a bot with the web channel")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--open-concurrency", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--question", default="What are the opening hours?")
+    parser.add_argument("--pid", type=int, help="worker pid, to report its memory per connection")
+    sys.exit(asyncio.run(main(parser.parse_args())))
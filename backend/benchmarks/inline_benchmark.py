@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Model calls and answer latency of inline queries under a simulated typing workload.
+Run with: python benchmarks/inline_benchmark.py [--users 200] [--model-ms 120] [--debounce 0,150,300]
+
+Every user types one question a character at a time, with a random gap
+between keystrokes, and Telegram sends an inline query per keystroke. Most
+users pick from a few popular questions, so later users find them cached.
+For each debounce setting reports the model calls per keystroke, cache
+hits, debounced and partial answers, and the latency from the last
+keystroke to its answer. The model is simulated with a fixed delay and
+answers go to a fake bot, nothing is sent to Telegram.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("INDEX_DIR", "")
+
+from telegram import InlineQuery
+
+from app.core.config import settings
+from app.services import message_gateway as gateway_module
+from app.services.message_gateway import message_gateway
+from app.services.quota_service import quota_service
+from app.services.telegram_inline import InlineAnswerer
+
+BOT_ID = 1
+
+POPULAR = [
+    "What are your opening hours?",
+    "How do I reset my password?",
+    "Where can I park?",
+    "How much does shipping cost?",
+    "Can I return an item after 30 days?",
+]
+
+RARE = [
+    "Do you ship to Iceland?",
+    "Is the library open on public holidays?",
+    "Can I pay with a gift card and a credit card together?",
+    "How do I change the email on my account?",
+    "Are pets allowed in the reading room?",
+]
+
+class FakeBot:
+    """Records when each inline query was answered"""
+    token = "123456:BENCHMARK"
+
+    def __init__(self):
+        self.answered_at = {}
+
+    async def answer_inline_query(self, inline_query_id, results, **kwargs):
+        self.answered_at[inline_query_id] = time.monotonic()
+        return True
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float("nan")
+
+async def type_question(answerer, bot, user_id, question, gap_ms, typed_at):
+    for end in range(1, len(question) + 1):
+        query_id = f"{user_id}-{end}"
+        inline_query = InlineQuery.de_json({
+            'id': query_id,
+            'from': {'id': user_id, 'is_bot': False, 'first_name': "User"},
+            'query': question[:end],
+            'offset': ""
+        }, bot)
+        typed_at[query_id] = time.monotonic()
+        answerer.handle(inline_query, BOT_ID, personal=False)
+        await asyncio.sleep(random.uniform(*gap_ms) / 1000)
+    return f"{user_id}-{len(question)}"
+
+async def run(users, debounce_ms, model_ms, gap_ms, popular_share, seed):
+    random.seed(seed)
+    settings.TELEGRAM_INLINE_DEBOUNCE_MS = debounce_ms
+
+    async def query_bot(bot_id, question):
+        await asyncio.sleep(model_ms / 1000)
+        return {'success': True, 'answer': f"About {question}", 'confidence': 0.8, 'source_url': None}
+
+    gateway_module.ai_service.query_bot = query_bot
+    answerer = InlineAnswerer()
+    bot = FakeBot()
+    typed_at = {}
+
+    # Users arrive over a few seconds, so popular questions are cached for later ones
+    async def user(user_id):
+        await asyncio.sleep(random.uniform(0, 3))
+        question = random.choice(POPULAR if random.random() < popular_share else RARE)
+        return await type_question(answerer, bot, user_id, question, gap_ms, typed_at)
+
+    start = time.monotonic()
+    last_ids = await asyncio.gather(*(user(user_id) for user_id in range(1, users + 1)))
+    # Let debounced and computing answers finish
+    await asyncio.sleep((debounce_ms + settings.TELEGRAM_INLINE_BUDGET_MS) / 1000)
+    elapsed = time.monotonic() - start
+
+    latencies = [bot.answered_at[i] - typed_at[i] for i in last_ids if i in bot.answered_at]
+    stats = answerer.get_stats()
+    await answerer.stop()
+    await message_gateway.stop()
+
+    keystrokes = stats['queries']
+    print(f"debounce {debounce_ms:>4} ms: {keystrokes} keystrokes in {elapsed:.1f}s, "
+          f"{stats['model_queries']} model calls ({stats['model_queries'] / keystrokes:.3f} per keystroke), "
+          f"{stats['cache_hits']} cache hits, {stats['debounced']} debounced, {stats['partial']} partial, "
+          f"{stats['answered']} answered")
+    print(f"    last keystroke to answer: p50 {percentile(latencies, 0.5):.0f} ms, "
+          f"p95 {percentile(latencies, 0.95):.0f} ms, {users - len(latencies)} unanswered")
+
+async def main(args):
+    gateway_module.ai_service.initialized = True
+    quota_service.check = lambda tenant: None
+    gap_ms = (args.gap_min_ms, args.gap_max_ms)
+    print(f"{args.users} users, model {args.model_ms} ms, keystroke gap {gap_ms[0]}-{gap_ms[1]} ms, "
+          f"{args.popular_share:.0%} popular questions")
+    for debounce_ms in args.debounce:
+        await run(args.users, debounce_ms, args.model_ms, gap_ms, args.popular_share, args.seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--model-ms", type=int, default=120, help="simulated model latency")
+    parser.add_argument("--gap-min-ms", type=int, default=80, help="shortest gap between keystrokes")
+    parser.add_argument("--gap-max-ms", type=int, default=250, help="longest gap between keystrokes")
+    parser.add_argument("--popular-share", type=float, default=0.8, help="share of users asking a popular question")
+    parser.add_argument("--debounce", type=lambda s: [int(v) for v in s.split(",")], default=[0, 150, 300],
+                        help="comma-separated TELEGRAM_INLINE_DEBOUNCE_MS values to compare")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
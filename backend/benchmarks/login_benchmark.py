@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Login throughput and event loop responsiveness under a login storm.
+Run with: python benchmarks/login_benchmark.py [--logins 200] [--concurrency 32]
+
+Registers users, then logs them in concurrently through the auth router
+and reports logins per second, login latency, 503s from the hashing
+backpressure, and how late a 10ms timer on the same event loop fires
+meanwhile (bcrypt must not run on the loop). BCRYPT_ROUNDS,
+PASSWORD_HASH_WORKERS and PASSWORD_HASH_MAX_PENDING are read from the
+environment as usual.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1.endpoints import auth
+from app.core.config import settings
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float("nan")
+
+async def loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(auth.router)
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        users = [f"bench{i}@example.com" for i in range(args.users)]
+        for email in users:
+            response = await client.post("/register", json={
+                "email": email, "password": "correct horse", "full_name": "Bench"
+            })
+            response.raise_for_status()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, statuses = [], {}
+
+        async def login(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/login", data={
+                    "username": users[i % len(users)], "password": "correct horse"
+                })
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        stop, lags = asyncio.Event(), []
+        lag_task = asyncio.create_task(loop_lag(stop, lags))
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await lag_task
+
+    print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_WORKERS} hash workers, "
+          f"max pending {settings.PASSWORD_HASH_MAX_PENDING}, concurrency {args.concurrency}")
+    print(f"{args.logins} logins in {elapsed:.2f}s: {statuses.get(200, 0) / elapsed:.1f} successful logins/s, "
+          f"statuses {dict(sorted(statuses.items()))}")
+    print(f"login latency p50 {percentile(latencies, 0.5):.0f}ms p95 {percentile(latencies, 0.95):.0f}ms "
+          f"p99 {percentile(latencies, 0.99):.0f}ms")
+    print(f"event loop lag p50 {percentile(lags, 0.5):.1f}ms p99 {percentile(lags, 0.99):.1f}ms "
+          f"max {max(lags) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
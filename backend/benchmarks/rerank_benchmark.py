@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Accuracy vs. latency of cross-encoder re-ranking.
+Run with: python benchmarks/rerank_benchmark.py [--faq faq.jsonl] [--rounds 5]
+
+Each FAQ row is {"question", "answer", "queries": [paraphrases]}; every
+paraphrase is searched with re-ranking off and on and counts as a hit when
+the top result is its row's answer. Needs sentence_transformers and the
+RERANK_MODEL weights.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In-memory index, no semantic cache: every query goes through search and re-ranking
+os.environ.setdefault("INDEX_DIR", "")
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+
+from app.core.config import settings
+from app.services.ai_service import ai_service
+from app.services.reranker import reranker
+
+BOT_ID = 1
+
+# Paraphrases share few words with their question on purpose; that is where
+# the bi-encoder ranks near-miss rows first and the cross-encoder helps
+DEFAULT_FAQ = [
+    {"question": "How do I reset my password?",
+     "answer": "Open Settings, choose Security and click 'Reset password'. We email you a link valid for one hour.",
+     "queries": ["I forgot my login credentials", "can't sign in, need a new password"]},
+    {"question": "How do I change my email address?",
+     "answer": "Go to Settings > Account, enter the new address and confirm it from the message we send there.",
+     "queries": ["update the address you send mail to", "use a different email for my account"]},
+    {"question": "Can I get a refund?",
+     "answer": "Annual plans are refundable within 14 days of purchase. Monthly plans can be cancelled at any time.",
+     "queries": ["money back after buying a yearly subscription", "I was charged and want it returned"]},
+    {"question": "How do I cancel my subscription?",
+     "answer": "Open Billing and click 'Cancel plan'. You keep access until the end of the paid period.",
+     "queries": ["stop being billed every month", "end my plan"]},
+    {"question": "Which payment methods do you accept?",
+     "answer": "We accept Visa, Mastercard, American Express and PayPal. Invoices are available for annual plans.",
+     "queries": ["can I pay with PayPal", "do you take credit cards"]},
+    {"question": "How many bots can I create?",
+     "answer": "Starter includes one bot, Professional five and Business unlimited bots.",
+     "queries": ["limit on the number of FAQ bots", "is there a maximum of chatbots per plan"]},
+    {"question": "How do I connect my bot to Telegram?",
+     "answer": "Create a bot with @BotFather, paste its token in the bot's Telegram tab and press Connect.",
+     "queries": ["link the FAQ bot with a Telegram channel", "use BotFather token"]},
+    {"question": "How often is my website re-crawled?",
+     "answer": "Sites are crawled again every 24 hours, or right away when you press 'Retrain'.",
+     "queries": ["when do you pick up changes on my pages", "update answers after I edit the site"]},
+    {"question": "Is my data encrypted?",
+     "answer": "All traffic uses TLS and stored data is encrypted at rest with AES-256.",
+     "queries": ["do you protect customer information", "security of stored content"]},
+    {"question": "Can I export my questions and answers?",
+     "answer": "Yes, the Export button on the bot page downloads all Q&A pairs as CSV or JSONL.",
+     "queries": ["download everything the bot knows", "get a CSV of my FAQ"]},
+    {"question": "Does the bot support other languages?",
+     "answer": "Bots answer in English, Spanish, French and German; pick the language when you create the bot.",
+     "queries": ["can it reply in Spanish", "multilingual support"]},
+    {"question": "What happens when I reach my monthly query limit?",
+     "answer": "The bot replies that the limit is reached until the next month or until you upgrade your plan.",
+     "queries": ["out of questions for this month", "too many queries, what now"]},
+]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+async def rows(faq):
+    for row in faq:
+        yield {"question": row["question"], "answer": row["answer"], "source_url": None}
+
+async def measure(faq, rounds):
+    hits, latencies = 0, []
+    for _ in range(rounds):
+        for row in faq:
+            for query in row["queries"]:
+                start = time.perf_counter()
+                results = await ai_service.search(BOT_ID, query)
+                latencies.append(time.perf_counter() - start)
+                hits += bool(results) and results[0]["answer"] == row["answer"]
+    return hits / len(latencies), percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+async def main(args):
+    faq = DEFAULT_FAQ
+    if args.faq:
+        with open(args.faq) as f:
+            faq = [json.loads(line) for line in f if line.strip()]
+
+    settings.RERANK_ENABLED = True
+    settings.RERANK_BUDGET_MS = args.budget_ms
+    await ai_service.initialize_model()
+    if not reranker.enabled:
+        sys.exit(f"Re-ranking model {settings.RERANK_MODEL} could not be loaded")
+    result = await ai_service.import_qa(BOT_ID, rows(faq))
+    if not result["success"]:
+        sys.exit(result["message"])
+
+    # Warm up both paths before timing
+    await ai_service.search(BOT_ID, faq[0]["queries"][0])
+
+    print(f"{len(faq)} FAQ rows, {sum(len(row['queries']) for row in faq)} queries x {args.rounds} rounds, "
+          f"budget {args.budget_ms:.0f}ms, {settings.RERANK_CANDIDATES} candidates")
+    print(f"{'':>10} {'top-1 acc':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, enabled in (("bi-encoder", False), ("reranked", True)):
+        settings.RERANK_ENABLED = enabled
+        accuracy, p50, p95 = await measure(faq, args.rounds)
+        print(f"{label:>10} {accuracy:>10.1%} {p50:>8.1f} {p95:>8.1f}")
+    print(f"reranker: {reranker.get_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-encoder re-ranking accuracy vs. latency")
+    parser.add_argument("--faq", help="JSONL file of question, answer and queries")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=settings.RERANK_BUDGET_MS)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("sentence_transformers") is None:
+        sys.exit("sentence_transformers is not installed (pip install -r requirements.txt)")
+    asyncio.run(main(args))
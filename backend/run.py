@@ -1,17 +1,46 @@
 #!/usr/bin/env python3
 """
 FAQ Bot SaaS Backend Server
-Run with: python run.py
+Run with: python run.py          (production: pre-forked workers)
+          python run.py --dev    (single process with auto-reload)
+
+Several workers need the Redis backends and WEB_WORKERS_ALLOW_LOCAL_AUTH:
+users, API keys and token revocations are still kept per worker, so a
+logout, password change or deleted API key only applies in the worker
+that handled it.
 """
 
+import argparse
+import logging
+
 import uvicorn
-from app.main import app
+from app.core.config import settings
+from app.core.prefork import PreforkServer
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    parser = argparse.ArgumentParser(description="FAQ Bot SaaS Backend Server")
+    parser.add_argument("--dev", action="store_true", help="run a single auto-reloading process")
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    args = parser.parse_args()
+    
+    if args.dev:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info",
+            ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
+        )
+    else:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        try:
+            server = PreforkServer("app.main:app", args.host, args.port, args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+        server.run()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script to run the shared inference server
+Loads the embedding models and bot indexes once per host; the API workers and
+the Telegram runner reach it over INFERENCE_SOCKET.
+"""
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.services.ai_service import AIService
+from app.services.inference_server import InferenceServer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    """Main function to run the inference server"""
+    if not settings.INFERENCE_SOCKET:
+        logger.error("INFERENCE_SOCKET not set in environment variables")
+        return
+    
+    server = InferenceServer(AIService(), settings.INFERENCE_SOCKET)
+    try:
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.stop()
+        logger.info("Inference server stopped")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
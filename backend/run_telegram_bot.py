@@ -12,6 +12,9 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 from app.services.telegram_service import telegram_service
+from app.services.quota_service import quota_service
+from app.services.invalidation_bus import invalidation_bus
+from app.services.message_gateway import message_gateway
 from app.core.config import settings
 
 # Configure logging
@@ -34,6 +37,7 @@ async def main():
     
     try:
         # Initialize the Telegram service
+        await invalidation_bus.start()
         if await telegram_service.initialize():
             logger.info("Telegram service initialized successfully")
             
@@ -60,6 +64,9 @@ async def main():
         logger.error(f"Error running Telegram bot: {e}")
     finally:
         await telegram_service.stop_bot()
+        await message_gateway.stop()
+        await quota_service.stop()
+        await invalidation_bus.stop()
         logger.info("Telegram bot stopped")
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+import pytest
+
+from tests.fake_telegram import FakeTelegramAPI
+
+@pytest.fixture
+async def fake_telegram():
+    api = FakeTelegramAPI()
+    await api.start()
+    yield api
+    await api.stop()
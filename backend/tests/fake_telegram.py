@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl
+
+class FakeTelegramAPI:
+    """Minimal Bot API over HTTP on localhost.
+
+    Records every call as ``(time, method, params)`` and answers with
+    plausible results; ``flood(method, times, retry_after)`` makes the next
+    calls of a method fail with a 429 flood-control error.
+    """
+
+    def __init__(self):
+        self.calls: List[Tuple[float, str, Dict[str, Any]]] = []
+        self._floods: Dict[str, List[int]] = defaultdict(list)
+        self._server = None
+        self._message_ids = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/bot"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._connection, "127.0.0.1", 0)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def flood(self, method: str, times: int = 1, retry_after: int = 1):
+        self._floods[method].extend([retry_after] * times)
+
+    def called(self, method: str) -> List[Dict[str, Any]]:
+        return [params for _, name, params in self.calls if name == method]
+
+    def call_times(self, method: str) -> List[float]:
+        return [at for at, name, _ in self.calls if name == method]
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode().split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                method = request_line.split()[1].rsplit("/", 1)[-1]
+                status, response = self._handle(method, self._params(headers, body))
+                payload = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _params(headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        if not body:
+            return {}
+        if headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body)
+        params = {}
+        for name, value in parse_qsl(body.decode()):
+            try:
+                params[name] = json.loads(value)
+            except ValueError:
+                params[name] = value
+        return params
+
+    def _handle(self, method: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self.calls.append((time.monotonic(), method, params))
+        floods = self._floods.get(method)
+        if floods:
+            retry_after = floods.pop(0)
+            return 429, {
+                'ok': False,
+                'error_code': 429,
+                'description': f"Too Many Requests: retry after {retry_after}",
+                'parameters': {'retry_after': retry_after}
+            }
+
+        if method == "getMe":
+            result = {'id': 1, 'is_bot': True, 'first_name': "FAQ", 'username': "faq_test_bot"}
+        elif method == "sendMessage":
+            self._message_ids += 1
+            result = {
+                'message_id': self._message_ids,
+                'date': int(time.time()),
+                'chat': {'id': params['chat_id'], 'type': "private"},
+                'text': params['text']
+            }
+        else:
+            result = True
+        return 200, {'ok': True, 'result': result}
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.ai_service import AIService, HASHING_DIM, HASHING_EMBEDDER
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.vector_index import BotIndex
+
+def unit(*values) -> np.ndarray:
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector / np.linalg.norm(vector)
+
+def at_cosine(cosine: float) -> np.ndarray:
+    """Unit vector at the given cosine similarity to unit(1)"""
+    return unit(cosine, np.sqrt(1 - cosine ** 2))
+
+def test_lookup_respects_the_similarity_threshold():
+    cache = SemanticAnswerCache(dim=4, capacity=8, threshold=0.95)
+    cache.add(unit(1), [{'answer': "cached"}])
+
+    assert cache.lookup(unit(1)) == [{'answer': "cached"}]
+    assert cache.lookup(at_cosine(0.97)) == [{'answer': "cached"}]
+    assert cache.lookup(at_cosine(0.90)) is None
+    assert cache.lookup(unit(0, 1)) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_lookup_returns_the_most_similar_entry():
+    cache = SemanticAnswerCache(dim=4, capacity=8, threshold=0.9)
+    cache.add(at_cosine(0.92), [{'answer': "close"}])
+    cache.add(at_cosine(0.99), [{'answer': "closest"}])
+    assert cache.lookup(unit(1)) == [{'answer': "closest"}]
+
+def test_ring_buffer_overwrites_the_oldest_entry():
+    cache = SemanticAnswerCache(dim=4, capacity=3, threshold=0.99)
+    for axis in range(4):
+        vector = np.zeros(4, dtype=np.float32)
+        vector[axis] = 1
+        cache.add(vector, [{'answer': f"axis {axis}"}])
+
+    assert cache.size == 3
+    assert cache.lookup(unit(1)) is None  # axis 0 was evicted by axis 3
+    assert cache.lookup(unit(0, 0, 0, 1)) == [{'answer': "axis 3"}]
+    assert cache.lookup(unit(0, 1)) == [{'answer': "axis 1"}]
+
+    cache.add(unit(1), [{'answer': "axis 0 again"}])
+    assert cache.lookup(unit(0, 1)) is None  # axis 1 is now the oldest
+    assert cache.lookup(unit(1)) == [{'answer': "axis 0 again"}]
+
+def test_reset_empties_the_cache():
+    cache = SemanticAnswerCache(dim=4, capacity=3, threshold=0.95)
+    cache.add(unit(1), [{'answer': "cached"}])
+    cache.reset(index_version=2)
+    assert cache.index_version == 2
+    assert cache.size == 0
+    assert cache.lookup(unit(1)) is None
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_SIZE", 16)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_THRESHOLD", 0.95)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+    service = AIService()
+    yield service
+    service._executor.shutdown()
+
+def publish(service: AIService, bot_id: int, version: int, answers: dict):
+    questions = list(answers)
+    index = BotIndex(HASHING_DIM, HASHING_EMBEDDER)
+    index.add(service._create_simple_embeddings(questions),
+              [{'question': question, 'answer': answers[question]} for question in questions])
+    index.version = version
+    service.embeddings_cache[bot_id] = index
+
+async def test_caches_are_per_bot(service):
+    publish(service, 1, 1, {"opening hours": "University: 9 to 5"})
+    publish(service, 2, 1, {"opening hours": "School: 8 to 3"})
+
+    for _ in range(2):
+        assert (await service.search(1, "opening hours"))[0]['answer'] == "University: 9 to 5"
+        assert (await service.search(2, "opening hours"))[0]['answer'] == "School: 8 to 3"
+
+    assert set(service.answer_caches) == {1, 2}
+    assert [(cache.hits, cache.misses) for cache in service.answer_caches.values()] == [(1, 1), (1, 1)]
+
+async def test_new_index_version_invalidates_the_cache(service):
+    publish(service, 1, 1, {"opening hours": "9 to 5"})
+    await service.search(1, "opening hours")
+    assert service.answer_caches[1].size == 1
+
+    # A retrain, rollback or another process's publish serves a different version
+    publish(service, 1, 2, {"opening hours": "10 to 6"})
+    assert (await service.search(1, "opening hours"))[0]['answer'] == "10 to 6"
+    cache = service.answer_caches[1]
+    assert (cache.index_version, cache.size, cache.hits) == (2, 1, 0)
+
+async def test_least_recently_used_bot_cache_is_dropped(service, monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_CACHE_MAX_BOTS", 2)
+    for bot_id in (1, 2, 3):
+        publish(service, bot_id, 1, {"opening hours": f"bot {bot_id}"})
+    await service.search(1, "opening hours")
+    await service.search(2, "opening hours")
+    await service.search(1, "opening hours")
+    await service.search(3, "opening hours")
+    assert list(service.answer_caches) == [1, 3]
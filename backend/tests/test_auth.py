@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import auth
+from app.core.cache import ExpiringSet
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(auth.router)
+    return TestClient(app)
+
+@pytest.fixture
+def user(client):
+    email = f"user{time.monotonic_ns()}@example.com"
+    response = client.post("/register", json={"email": email, "password": "old-secret", "full_name": "Test"})
+    assert response.status_code == 200
+    yield email
+    auth.fake_users_db.pop(email, None)
+    auth._revoked_before.pop(email, None)
+
+def login(client, email, password):
+    response = client.post("/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_expiring_set_is_not_evicted_for_space():
+    revoked = ExpiringSet()
+    now = time.time()
+    for i in range(50000):
+        revoked.add(i, now + 60)
+    revoked.add("expired", now - 1)
+    assert 0 in revoked and 49999 in revoked
+    assert "expired" not in revoked
+    assert len(revoked) == 50000
+
+def test_logout_revocation_survives_many_later_revocations(client, user, monkeypatch):
+    headers = login(client, user, "old-secret")
+    assert client.post("/logout", headers=headers).status_code == 200
+
+    # More revocations than the principal cache holds
+    expires_at = time.time() + 600
+    for i in range(auth.settings.AUTH_CACHE_SIZE + 10):
+        auth._revoked_tokens.add(f"other-{i}", expires_at)
+    assert client.get("/me", headers=headers).status_code == 401
+
+def test_password_change_revokes_existing_tokens(client, user):
+    headers = login(client, user, "old-secret")
+    assert client.get("/me", headers=headers).status_code == 200
+
+    response = client.post("/change-password", headers=headers,
+                           json={"current_password": "wrong", "new_password": "new-secret"})
+    assert response.status_code == 400
+
+    response = client.post("/change-password", headers=headers,
+                           json={"current_password": "old-secret", "new_password": "new-secret"})
+    assert response.status_code == 200
+    assert client.get("/me", headers=headers).status_code == 401
+
+    # Tokens issued in a later second are accepted again
+    auth._revoked_before[user] -= 1
+    new_headers = login(client, user, "new-secret")
+    assert client.get("/me", headers=new_headers).status_code == 200
+    assert client.post("/login", data={"username": user, "password": "old-secret"}).status_code == 401
+
+def test_revocation_compares_whole_seconds(user):
+    auth.revoke_user_tokens(user)
+    revoked_before = auth._revoked_before[user]
+    assert isinstance(revoked_before, int)
+    # A token issued within the revocation second is rejected, the next second's is not
+    assert auth._is_revoked(user, int(time.time()))
+    assert not auth._is_revoked(user, revoked_before)
@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.bulk_import import QARowStream
+
+async def chunks_of(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def read(data: bytes, fmt: str, size: int = 7, max_row_bytes: int = 1000):
+    stream = QARowStream(chunks_of(data, size), fmt, max_row_bytes)
+    return [row async for row in stream], stream.get_stats()
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_csv_rows_across_chunk_boundaries(size):
+    data = (
+        '﻿Question,Answer,URL\n'
+        'When are you open?,"Mon-Fri, 9 to 5",https://example.com/hours\n'
+        '"Multi\nline?","Yes, ""quoted""\nand long",\n'
+        ',missing question,\n'
+    ).encode()
+    rows, stats = await read(data, "csv", size)
+    assert rows == [
+        {'question': "When are you open?", 'answer': "Mon-Fri, 9 to 5", 'source_url': "https://example.com/hours"},
+        {'question': "Multi\nline?", 'answer': 'Yes, "quoted"\nand long', 'source_url': None},
+    ]
+    assert stats['rows_read'] == 3
+    assert stats['invalid'] == 1
+    assert stats['bytes_read'] == len(data)
+
+async def test_jsonl_reports_bad_lines():
+    data = b'{"question": "q1", "answer": "a1"}\nnot json\n[1]\n{"q": "x"}\n{"question": "q2", "answer": "a2", "source_url": "u"}'
+    rows, stats = await read(data, "jsonl")
+    assert [row['question'] for row in rows] == ["q1", "q2"]
+    assert rows[1]['source_url'] == "u"
+    assert stats['invalid'] == 3
+    assert [error['row'] for error in stats['errors']] == [2, 3, 4]
+
+async def test_overlong_row_and_bad_header_fail_the_import():
+    with pytest.raises(ValueError, match="longer than"):
+        await read(b"question,answer\n" + b"x" * 200, "csv", max_row_bytes=100)
+    with pytest.raises(ValueError, match="header"):
+        await read(b"foo,bar\n1,2\n", "csv")
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1.endpoints import bots, chat
+from app.core.config import settings
+from app.services import message_gateway as gateway_module
+from app.services.message_gateway import MessageGateway
+from app.services.quota_service import quota_service
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = MessageGateway(workers=2, queue_size=100)
+    gateway.register_adapter(chat.WebChatAdapter())
+    monkeypatch.setattr(chat, "message_gateway", gateway)
+    monkeypatch.setattr(chat, "chat_stats", dict.fromkeys(chat.chat_stats, 0))
+    return gateway
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Answers are held back while the gate is cleared"""
+    gate = asyncio.Event()
+    gate.set()
+
+    async def query_bot(bot_id, question):
+        await gate.wait()
+        return {'success': True, 'answer': f"About {question}", 'confidence': 0.9, 'source_url': None}
+
+    monkeypatch.setattr(gateway_module.ai_service, "initialized", True)
+    monkeypatch.setattr(gateway_module.ai_service, "query_bot", query_bot)
+    monkeypatch.setattr(quota_service, "check", lambda tenant: None)
+    return gate
+
+@pytest.fixture
+def client(gateway, gate):
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    total_queries = bots.mock_bots[0].total_queries
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(gateway.stop)
+    bots.mock_bots[0].total_queries = total_queries
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_websocket_answers_questions(client):
+    total_queries = bots.mock_bots[0].total_queries
+    with client.websocket_connect("/chat/1/ws") as websocket:
+        assert client.get("/chat/stats").json()["websockets"] == 1
+        websocket.send_json({"id": 7, "question": " opening hours "})
+        assert websocket.receive_json() == {
+            "id": 7, "answer": "About opening hours", "confidence": 0.9, "source_url": None
+        }
+
+    wait_for(lambda: chat.chat_stats["websockets"] == 0)
+    assert client.get("/chat/stats").json() == {"websockets": 0, "sse_streams": 0, "questions": 1, "rejected": 0}
+    assert bots.mock_bots[0].total_queries == total_queries + 1
+
+def test_websocket_reports_malformed_frames_and_stays_open(client):
+    with client.websocket_connect("/chat/1/ws") as websocket:
+        for frame in ("not json", json.dumps({"id": 1}), json.dumps([1, 2])):
+            websocket.send_text(frame)
+            assert "error" in websocket.receive_json()
+
+        websocket.send_json({"id": 2, "question": ""})
+        assert websocket.receive_json()["error"].startswith("Questions must be")
+        websocket.send_json({"id": 3, "question": "still here?"})
+        assert websocket.receive_json()["answer"] == "About still here?"
+
+def test_websocket_limits_questions_in_progress(client, gate, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_MAX_IN_FLIGHT", 2)
+    client.portal.call(gate.clear)
+    with client.websocket_connect("/chat/1/ws") as websocket:
+        for message_id in (1, 2, 3):
+            websocket.send_json({"id": message_id, "question": f"q{message_id}"})
+        assert websocket.receive_json() == {"id": 3, "error": "Too many questions in progress"}
+
+        client.portal.call(gate.set)
+        assert sorted(websocket.receive_json()["id"] for _ in range(2)) == [1, 2]
+        # Answered questions free their place
+        websocket.send_json({"id": 4, "question": "q4"})
+        assert websocket.receive_json()["id"] == 4
+    assert chat.chat_stats["rejected"] == 1
+
+def test_websocket_closes_when_idle(client, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_IDLE_TIMEOUT_SECONDS", 0.05)
+    with client.websocket_connect("/chat/1/ws") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1000
+    wait_for(lambda: chat.chat_stats["websockets"] == 0)
+
+def test_websocket_refuses_bots_without_web_chat(client):
+    for bot_id in (2, 404):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/chat/{bot_id}/ws") as websocket:
+                websocket.receive_json()
+        assert closed.value.code == 1008
+    assert chat.chat_stats["websockets"] == 0
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+@pytest.fixture
+async def sse(gateway, gate, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_SSE_KEEPALIVE_SECONDS", 0.02)
+    yield
+    await gateway.stop()
+
+async def test_sse_sends_keepalives_then_the_answer(sse, gate):
+    gate.clear()
+    response = await chat.chat_sse(1, "opening hours", FakeRequest())
+    events = response.body_iterator
+
+    assert await events.__anext__() == ": keepalive\n\n"
+    assert chat.chat_stats["sse_streams"] == 1
+    gate.set()
+    event = await events.__anext__()
+    while event == ": keepalive\n\n":
+        event = await events.__anext__()
+    assert event.startswith("event: answer\ndata: ")
+    assert json.loads(event.split("data: ", 1)[1])["answer"] == "About opening hours"
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert chat.chat_stats == {"websockets": 0, "sse_streams": 0, "questions": 1, "rejected": 0}
+
+async def test_sse_stops_waiting_when_the_client_disconnects(sse, gate):
+    gate.clear()
+    request = FakeRequest()
+    response = await chat.chat_sse(1, "opening hours", request)
+    events = response.body_iterator
+    assert await events.__anext__() == ": keepalive\n\n"
+
+    request.disconnected = True
+    with pytest.raises(StopAsyncIteration):
+        while True:
+            await events.__anext__()
+    assert chat.chat_stats["sse_streams"] == 0
+
+    # The late answer is dropped without error
+    gate.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert chat.chat_stats["questions"] == 1
+
+async def test_sse_rejects_bad_questions(sse):
+    with pytest.raises(HTTPException) as rejected:
+        await chat.chat_sse(1, "  ", FakeRequest())
+    assert rejected.value.status_code == 400
+    with pytest.raises(HTTPException) as rejected:
+        await chat.chat_sse(2, "hours", FakeRequest())
+    assert rejected.value.status_code == 400
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+
+from app.services.crawler import crawl_site
+
+PAGES = {
+    "/": '<html><body><h1>Home</h1><p>Welcome</p><a href="/faq">FAQ</a>'
+         '<a href="https://elsewhere.example/">x</a><a href="/doc.pdf">pdf</a></body></html>',
+    "/faq": '<html><body><h2>Hours</h2><p>Open daily</p><a href="/">home</a><a href="/big">big</a></body></html>',
+    "/big": "<html><body>" + "<div><p>filler text</p><a href='/faq#top'>faq</a></div>" * 20000 + "</body></html>",
+}
+
+async def serve(reader, writer):
+    try:
+        request = await reader.readuntil(b"\r\n\r\n")
+        path = request.split()[1].decode()
+        body = PAGES.get(path)
+        status = "200 OK" if body is not None else "404 Not Found"
+        payload = (body or "").encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/html\r\nContent-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+@pytest.fixture
+async def site():
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    yield f"http://{host}:{port}"
+    server.close()
+    await server.wait_closed()
+
+def title(soup):
+    heading = soup.find(["h1", "h2"])
+    return heading.get_text() if heading else None
+
+async def test_crawls_same_site_html_pages(site):
+    pages = await crawl_site(f"{site}/", title, max_pages=10, concurrency=2, timeout=10)
+    assert sorted(pages) == sorted([(f"{site}/", "Home"), (f"{site}/faq", "Hours"), (f"{site}/big", None)])
+
+async def test_parsing_does_not_block_the_event_loop(site):
+    gaps = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            gaps.append(time.perf_counter() - start)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await crawl_site(f"{site}/big", title, max_pages=1, concurrency=1, timeout=10)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+
+    # The large page takes far longer to parse than the loop ever stalls
+    assert elapsed > 0.2
+    assert max(gaps) < elapsed / 2
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.ai_service import AIService
+from app.services.dedup import NearDuplicateDetector, collapse_duplicates, cosine_of_pairs
+
+PASSAGE = (
+    "Students can borrow up to twenty books at a time from the main library. Loans last three weeks "
+    "and can be renewed online twice unless another reader has reserved the book. Overdue items are "
+    "charged fifty cents per day and borrowing is suspended once fines reach ten dollars. Laptops are "
+    "lent for four hours at the service desk on the ground floor."
+)
+
+def edited(text: str, every: int, start: int = 0) -> str:
+    """Replace every ``every``-th word, from ``start``"""
+    words = text.split()
+    for i in range(start, len(words), every):
+        words[i] = f"changed{i}"
+    return " ".join(words)
+
+@pytest.fixture
+def service():
+    service = AIService()
+    yield service
+    service._executor.shutdown()
+
+def kept(service: AIService, texts):
+    keep, _ = service._dedup_texts(texts)
+    return [text for text, keep_row in zip(texts, keep) if keep_row]
+
+def test_exact_duplicates_collapse_to_the_first(service):
+    other = "The cafeteria is open from eight in the morning until six in the evening on weekdays."
+    assert kept(service, [PASSAGE, other, PASSAGE, PASSAGE]) == [PASSAGE, other]
+
+def test_near_duplicate_above_the_threshold_collapses(service):
+    # One word changed in a long passage: nearly every shingle is shared
+    near = edited(PASSAGE, every=1000, start=30)
+    detector = NearDuplicateDetector(settings.DEDUP_NUM_PERM, settings.DEDUP_BANDS)
+    signatures = detector.signatures([PASSAGE, near])
+    assert detector.estimate_jaccard(signatures, np.array([[0, 1]]))[0] >= settings.DEDUP_JACCARD_THRESHOLD
+    assert kept(service, [PASSAGE, near]) == [PASSAGE]
+
+def test_passage_below_the_threshold_is_kept(service):
+    # Every fourth word changed: most shingles differ, though the passages still look alike
+    loose = edited(PASSAGE, every=4)
+    assert kept(service, [PASSAGE, loose]) == [PASSAGE, loose]
+
+    # LSH may still pair them; such pairs go on to the embedding check
+    keep, remaining = service._dedup_texts([PASSAGE, edited(PASSAGE, every=8)])
+    assert keep.all()
+    assert remaining.tolist() in ([], [[0, 1]])
+
+def test_very_short_passages(service):
+    texts = ["Yes.", "No.", "yes", "Opening hours", "Closing hours", "Opening hours!"]
+    # Short texts are compared whole: only exact word matches collapse
+    assert kept(service, texts) == ["Yes.", "No.", "Opening hours", "Closing hours"]
+    assert kept(service, ["Only one passage"]) == ["Only one passage"]
+    assert kept(service, []) == []
+
+def test_disabled_keeps_everything(service, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+    assert kept(service, [PASSAGE, PASSAGE]) == [PASSAGE, PASSAGE]
+
+def test_clusters_collapse_transitively():
+    # 0~1 and 1~2 make one cluster even though 0 and 2 were never paired
+    keep = collapse_duplicates(5, np.array([[0, 1], [1, 2], [3, 4]]))
+    assert keep.tolist() == [True, False, False, True, False]
+
+def test_cosine_of_pairs():
+    embeddings = np.array([[1, 0], [2, 0], [0, 3], [0, 0]], dtype=np.float32)
+    similarity = cosine_of_pairs(embeddings, np.array([[0, 1], [0, 2], [0, 3]]))
+    assert similarity.tolist() == pytest.approx([1.0, 0.0, 0.0])
+    assert len(cosine_of_pairs(embeddings, np.empty((0, 2), dtype=np.int64))) == 0
+
+def test_embedding_check_collapses_reworded_duplicates(service):
+    embeddings = np.array([[1, 0], [0.99, 0.05], [0, 1]], dtype=np.float32)
+    keep = service._dedup_embeddings(embeddings, np.array([[0, 1], [1, 2]]))
+    assert keep.tolist() == [True, False, True]
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Stacks only training, reranking or a Redis backend may load
+HEAVY_MODULES = ("torch", "sentence_transformers", "sklearn", "bs4", "aiohttp", "redis", "uvicorn")
+
+# Seconds for a cold 'import app.main'; about 1.5s without torch installed
+IMPORT_BUDGET_SECONDS = 5.0
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+def test_app_import_stays_light():
+    backend = Path(__file__).resolve().parent.parent
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=backend, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result['heavy'] == []
+    assert result['seconds'] < IMPORT_BUDGET_SECONDS
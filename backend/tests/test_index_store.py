@@ -0,0 +1,99 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.services.index_store import IndexStore
+from app.services.vector_index import BotIndex
+
+BOT_ID = 7
+
+def build(rows: int) -> BotIndex:
+    index = BotIndex(dim=4, embedder="test")
+    index.add(np.eye(4)[:rows], [{'question': f"q{i}", 'answer': f"a{i}"} for i in range(rows)])
+    return index
+
+def on_disk(root) -> list:
+    return sorted(name for name in os.listdir(root / str(BOT_ID)) if name.startswith("v"))
+
+def current_file(root) -> str:
+    return (root / str(BOT_ID) / "CURRENT").read_text()
+
+async def test_publishing_twice_keeps_both_versions(tmp_path):
+    store = IndexStore(str(tmp_path), keep=3, mmap=True)
+    first = await store.publish(BOT_ID, build(1))
+    second = await store.publish(BOT_ID, build(2))
+
+    assert (first.version, second.version) == (1, 2)
+    assert store.current[BOT_ID] is second
+    assert len(store.current[BOT_ID]) == 2
+    assert current_file(tmp_path) == "2"
+    assert on_disk(tmp_path) == ["v1", "v2"]
+    assert [(v['version'], v['current']) for v in store.versions(BOT_ID)] == [(1, False), (2, True)]
+
+    # A restarted process serves the published version
+    restarted = IndexStore(str(tmp_path), keep=3, mmap=True)
+    assert restarted.load() == 1
+    assert restarted.current[BOT_ID].version == 2
+    assert restarted.current[BOT_ID].records[1]['answer'] == "a1"
+
+async def test_rollback_and_publish_after_it(tmp_path):
+    store = IndexStore(str(tmp_path), keep=3, mmap=True)
+    await store.publish(BOT_ID, build(1))
+    await store.publish(BOT_ID, build(2))
+
+    assert store.rollback(BOT_ID).version == 1
+    assert current_file(tmp_path) == "1"
+    with pytest.raises(ValueError, match="no earlier version"):
+        store.rollback(BOT_ID)
+    with pytest.raises(ValueError, match="not retained"):
+        store.rollback(BOT_ID, 9)
+    with pytest.raises(KeyError):
+        store.rollback(BOT_ID + 1)
+
+    assert store.rollback(BOT_ID, 2).version == 2
+    # Numbering continues after the highest version, not the rolled-back one
+    store.rollback(BOT_ID, 1)
+    assert (await store.publish(BOT_ID, build(3))).version == 3
+
+async def test_refresh_serves_another_process_version(tmp_path):
+    publisher = IndexStore(str(tmp_path), keep=3, mmap=True)
+    reader = IndexStore(str(tmp_path), keep=3, mmap=True)
+    await publisher.publish(BOT_ID, build(1))
+    reader.load()
+
+    await publisher.publish(BOT_ID, build(3))
+    assert reader.current[BOT_ID].version == 1
+    refreshed = await reader.refresh(BOT_ID)
+    assert refreshed.version == 2 and len(refreshed) == 3
+    # Already current, nothing reloaded
+    assert await reader.refresh(BOT_ID, 2) is refreshed
+
+    publisher.rollback(BOT_ID)
+    assert (await reader.refresh(BOT_ID)).version == 1
+
+async def test_pruning_without_grace(tmp_path):
+    store = IndexStore(str(tmp_path), keep=1, mmap=True, prune_grace=0)
+    for rows in (1, 2, 3):
+        await store.publish(BOT_ID, build(rows))
+    assert on_disk(tmp_path) == ["v3"]
+    assert [v['version'] for v in store.versions(BOT_ID)] == [3]
+
+async def test_superseded_versions_outlive_the_grace_period(tmp_path):
+    store = IndexStore(str(tmp_path), keep=1, mmap=True, prune_grace=60)
+    reader = IndexStore(str(tmp_path), keep=3, mmap=True)
+    await store.publish(BOT_ID, build(1))
+    reader.load()
+    await store.publish(BOT_ID, build(2))
+    await store.publish(BOT_ID, build(3))
+
+    # Another process still on v1 can keep reading it, and switch to any version later
+    assert on_disk(tmp_path) == ["v1", "v2", "v3"]
+    assert len(await reader.refresh(BOT_ID, 2)) == 2
+
+    # Once v2 replaced v1 longer ago than the grace period, v1 goes on the next publish
+    past = time.time() - 120
+    os.utime(tmp_path / str(BOT_ID) / "v2" / "meta.json", (past, past))
+    await store.publish(BOT_ID, build(4))
+    assert on_disk(tmp_path) == ["v2", "v3", "v4"]
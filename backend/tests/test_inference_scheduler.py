@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.services.inference_scheduler import InferenceScheduler
+from app.services.quota_service import quota_service
+
+@pytest.fixture(autouse=True)
+def plans():
+    quota_service.set_plan("a", "enterprise")
+    quota_service.set_plan("b", "enterprise")
+    yield
+    quota_service.tenant_plans.pop("a", None)
+    quota_service.tenant_plans.pop("b", None)
+
+async def hold(scheduler, tenant, release: asyncio.Event, order=None):
+    async with scheduler.slot(tenant):
+        if order is not None:
+            order.append(tenant)
+        await release.wait()
+
+async def test_cancel_while_queued_frees_the_entry():
+    scheduler = InferenceScheduler(1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(scheduler, "a", release))
+    waiter = asyncio.create_task(hold(scheduler, "a", asyncio.Event()))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert scheduler.queue_depth() == 0
+
+    release.set()
+    await holder
+    assert scheduler.get_stats()['running'] == 0
+
+async def test_cancel_in_same_pass_as_release_does_not_leak_the_slot():
+    scheduler = InferenceScheduler(1)
+    second_release = asyncio.Event()
+    async with scheduler.slot("a"):
+        cancelled = asyncio.create_task(hold(scheduler, "a", asyncio.Event()))
+        second = asyncio.create_task(hold(scheduler, "b", second_release))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 2
+        # Cancelled, but its task has not run yet when the slot is released
+        cancelled.cancel()
+
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert cancelled.cancelled()
+    await asyncio.sleep(0)
+    # The slot went to the live waiter, nothing is left counted for the cancelled one
+    stats = scheduler.get_stats()
+    assert stats['running'] == 1
+    assert stats['tenants']['a']['in_flight'] == 0
+    assert stats['tenants']['b']['in_flight'] == 1
+
+    second_release.set()
+    await second
+    assert scheduler.get_stats()['running'] == 0
+    assert scheduler.queue_depth() == 0
+
+async def test_cancel_after_grant_hands_the_slot_on():
+    scheduler = InferenceScheduler(1)
+    third_release = asyncio.Event()
+    async with scheduler.slot("a"):
+        granted = asyncio.create_task(hold(scheduler, "b", asyncio.Event()))
+        third = asyncio.create_task(hold(scheduler, "a", third_release))
+        await asyncio.sleep(0)
+    # The slot was granted to the first waiter, which is cancelled before it resumes
+    granted.cancel()
+    await asyncio.gather(granted, return_exceptions=True)
+
+    await asyncio.sleep(0)
+    assert scheduler.get_stats()['tenants']['a']['in_flight'] == 1
+    third_release.set()
+    await asyncio.wait_for(third, 1)
+    assert scheduler.get_stats()['running'] == 0
+
+async def test_flooding_tenant_does_not_starve_others():
+    scheduler = InferenceScheduler(1)
+    order = []
+    release = asyncio.Event()
+    release.set()
+    blocker = asyncio.Event()
+    first = asyncio.create_task(hold(scheduler, "a", blocker))
+    await asyncio.sleep(0)
+    flood = [asyncio.create_task(hold(scheduler, "a", release, order)) for _ in range(20)]
+    await asyncio.sleep(0)
+    late = asyncio.create_task(hold(scheduler, "b", release, order))
+    await asyncio.sleep(0)
+
+    blocker.set()
+    await asyncio.gather(first, late, *flood)
+    assert order.index("b") <= 1
+
+async def test_weights_split_capacity_by_plan():
+    quota_service.set_plan("a", "starter")     # weight 1
+    quota_service.set_plan("b", "business")    # weight 4
+    scheduler = InferenceScheduler(1)
+    order = []
+    release = asyncio.Event()
+    release.set()
+    blocker = asyncio.Event()
+    first = asyncio.create_task(hold(scheduler, "a", blocker))
+    await asyncio.sleep(0)
+    jobs = []
+    for _ in range(10):
+        jobs.append(asyncio.create_task(hold(scheduler, "a", release, order)))
+        jobs.append(asyncio.create_task(hold(scheduler, "b", release, order)))
+    await asyncio.sleep(0)
+
+    blocker.set()
+    await asyncio.gather(first, *jobs)
+    # In the first ten grants the heavier plan gets about four times the share
+    assert order[:10].count("b") >= 7
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import inference_client
+from app.services.inference_client import RemoteAIService
+from app.services.inference_scheduler import inference_scheduler
+from app.services.inference_server import InferenceServer
+from app.services.profiling_service import profiling_service, profile_request
+from app.services.quota_service import quota_service, QuotaService
+
+class FakeAIService:
+    """Answers every question, recording the stages a real query records"""
+
+    async def initialize_model(self):
+        pass
+
+    def load_indexes(self) -> int:
+        return 0
+
+    async def query_bot(self, bot_id, question):
+        with profiling_service.trace("query", bot_id):
+            with profiling_service.span("embed"):
+                async with inference_scheduler.slot(bot_id):
+                    await asyncio.sleep(0.01)
+            with profiling_service.span("search"):
+                await asyncio.sleep(0.005)
+        return {'success': True, 'answer': f"About {question}", 'confidence': 0.75, 'source_url': None}
+
+@pytest.fixture
+async def remote(tmp_path):
+    server = InferenceServer(FakeAIService(), str(tmp_path / "inference.sock"))
+    await server.start()
+    client = RemoteAIService(server.path)
+    yield client
+    await client.client.close()
+    await server.stop()
+    profiling_service.clear()
+
+async def test_query_result_round_trips(remote):
+    result = await remote.query_bot(3, "opening hours")
+    assert result == {'success': True, 'answer': "About opening hours", 'confidence': 0.75, 'source_url': None}
+    # Untraced queries leave no trace on either side
+    assert profiling_service.get_traces() == []
+
+async def test_server_stages_join_the_callers_trace(remote, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_HEADER_ENABLED", True)
+    token = profile_request.set("1")
+    try:
+        await remote.query_bot(3, "opening hours")
+    finally:
+        profile_request.reset(token)
+
+    trace, = profiling_service.get_traces()
+    stages = trace['stages']
+    assert set(stages) == {'inference_call', 'embed', 'search'}
+    assert stages['embed'] >= 9
+    # The server's stages fall inside the round trip on the caller's timeline
+    call = next(span for span in trace['spans'] if span['name'] == 'inference_call')
+    for span in trace['spans']:
+        assert span['start_ms'] >= call['start_ms']
+        assert span['start_ms'] + span['duration_ms'] <= call['start_ms'] + call['duration_ms'] + 1
+
+async def test_client_plans_weigh_the_servers_scheduler(remote, monkeypatch):
+    # Plans are assigned in the API process; the server's own quota service knows none of them
+    client_quotas = QuotaService()
+    client_quotas.set_plan(11, "starter")
+    client_quotas.set_plan(12, "enterprise")
+    monkeypatch.setattr(inference_client, "quota_service", client_quotas)
+    monkeypatch.setattr(quota_service, "tenant_plans", {})
+    monkeypatch.setattr(inference_scheduler, "_tenants", {})
+
+    await asyncio.gather(remote.query_bot(11, "hours"), remote.query_bot(12, "hours"))
+
+    tenants = inference_scheduler.get_stats()['tenants']
+    assert tenants['11']['weight'] == 1
+    assert tenants['12']['weight'] == 8
+    assert quota_service.get_plan(12)["max_in_flight"] == 8
+
+    # A plan change in the API process reaches the server with the next request
+    client_quotas.set_plan(11, "business")
+    await remote.query_bot(11, "hours")
+    assert inference_scheduler.get_stats()['tenants']['11']['weight'] == 4
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services import invalidation_bus as bus_module
+from app.services.invalidation_bus import LocalInvalidationBus, RedisInvalidationBus, RESYNC_EVENT
+from app.services.quota_service import QuotaService
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.messages = asyncio.Queue()
+        self.closed = False
+
+    async def subscribe(self, channel):
+        if self.server.refuse_subscribe:
+            self.server.refuse_subscribe -= 1
+            raise ConnectionError("connection refused")
+        self.server.subscribers.setdefault(channel, []).append(self)
+
+    async def listen(self):
+        while True:
+            message = await self.messages.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+    async def close(self):
+        self.closed = True
+        for subscribers in self.server.subscribers.values():
+            if self in subscribers:
+                subscribers.remove(self)
+
+class FakeRedis:
+    """Pub/sub of one Redis server, shared by every bus connected to it"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.refuse_subscribe = 0
+        self.down = False
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        if self.down:
+            raise ConnectionError("connection refused")
+        for pubsub in self.subscribers.get(channel, []):
+            pubsub.messages.put_nowait({'type': 'message', 'data': data})
+
+    def drop_connections(self):
+        for pubsub in [p for subscribers in self.subscribers.values() for p in subscribers]:
+            pubsub.messages.put_nowait(ConnectionError("connection reset"))
+
+    async def close(self):
+        pass
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+@pytest.fixture
+def server():
+    return FakeRedis()
+
+@pytest.fixture
+async def buses(server):
+    created = []
+
+    def connect():
+        bus = RedisInvalidationBus.__new__(RedisInvalidationBus)
+        LocalInvalidationBus.__init__(bus)
+        bus.redis, bus.channel, bus._listener = server, "test:invalidation", None
+        received = []
+        bus.subscribe(received.append)
+        created.append(bus)
+        return bus, received
+
+    yield connect
+    for bus in created:
+        await bus.stop()
+
+async def test_local_bus_delivers_to_every_subscriber():
+    bus = LocalInvalidationBus()
+    received = []
+
+    def failing(event):
+        raise RuntimeError("subscriber bug")
+
+    bus.subscribe(failing)
+    bus.subscribe(received.append)
+    await bus.start()
+    await bus.publish({'type': 'index', 'bot_id': 1, 'version': 2})
+    assert received == [{'type': 'index', 'bot_id': 1, 'version': 2}]
+    await bus.stop()
+
+async def test_redis_bus_broadcasts_to_every_process(buses):
+    api, api_events = buses()
+    telegram, telegram_events = buses()
+    await api.start()
+    await telegram.start()
+    await settle()
+    # Subscribing delivers a resync: events published before it were missed
+    assert api_events == telegram_events == [RESYNC_EVENT]
+
+    await api.publish({'type': 'index', 'bot_id': 3, 'version': 5})
+    await settle()
+    assert telegram_events[-1] == api_events[-1] == {'type': 'index', 'bot_id': 3, 'version': 5}
+
+async def test_redis_bus_resyncs_after_resubscribing(buses, server, monkeypatch):
+    sleep = asyncio.sleep
+    delays = []
+
+    async def no_wait(delay, *args):
+        if delay:
+            delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(bus_module.asyncio, "sleep", no_wait)
+    bus, events = buses()
+    server.refuse_subscribe = 2
+    await bus.start()
+    await settle()
+    # Backs off while Redis is unreachable, then subscribes and resyncs
+    assert delays[:2] == [1.0, 2.0]
+    assert events == [RESYNC_EVENT]
+
+    server.drop_connections()
+    await settle()
+    assert events == [RESYNC_EVENT, RESYNC_EVENT]
+    assert json.dumps(events[-1]) == json.dumps({'type': 'resync'})
+
+async def test_redis_bus_delivers_locally_when_publish_fails(buses, server):
+    bus, events = buses()
+    server.down = True
+    await bus.publish({'type': 'index', 'bot_id': 1, 'version': 1})
+    assert events == [{'type': 'index', 'bot_id': 1, 'version': 1}]
+
+def test_local_bus_without_redis_backend(monkeypatch):
+    monkeypatch.setattr(settings, "INVALIDATION_BACKEND", "memory")
+    assert type(bus_module.create_invalidation_bus()) is LocalInvalidationBus
+
+class SlowBackend:
+    def __init__(self):
+        self.persisted = {}
+
+    async def load(self, month):
+        return {}
+
+    async def increment(self, month, deltas):
+        await asyncio.sleep(0.01)
+        totals = self.persisted.setdefault(month, {})
+        for tenant, delta in deltas.items():
+            totals[tenant] = totals.get(tenant, 0) + delta
+        return dict(totals)
+
+async def test_quota_batch_flushes_are_kept_until_stop(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_FLUSH_BATCH", 3)
+    quotas = QuotaService()
+    quotas.backend = SlowBackend()
+    quotas.set_plan("t", "enterprise")
+    for _ in range(3):
+        quotas.check("t")
+    assert len(quotas._background) == 1
+    await asyncio.sleep(0)  # the flush takes the batch
+
+    # The month rolls over with usage not yet flushed
+    quotas.check("t")
+    monkeypatch.setattr(quotas, "_current_month", lambda: "2099-01")
+    quotas.check("t")
+    assert len(quotas._background) == 2
+
+    await quotas.stop()
+    assert not quotas._background
+    month = QuotaService._current_month()
+    assert quotas.backend.persisted[month]["t"] == 4
+    assert quotas.backend.persisted["2099-01"]["t"] == 1
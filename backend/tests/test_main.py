@@ -0,0 +1,17 @@
+import importlib
+import sys
+
+from app.core.config import settings
+
+def load_main(monkeypatch, enabled: bool):
+    monkeypatch.setattr(settings, "PROFILING_HEADER_ENABLED", enabled)
+    monkeypatch.delitem(sys.modules, "app.main", raising=False)
+    return importlib.import_module("app.main")
+
+def registered(main) -> bool:
+    return any(getattr(m.options.get("dispatch"), "__name__", None) == "profiling_header_middleware"
+               for m in main.app.user_middleware)
+
+def test_profiling_middleware_only_registered_when_enabled(monkeypatch):
+    assert not registered(load_main(monkeypatch, False))
+    assert registered(load_main(monkeypatch, True))
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services import message_gateway as gateway_module
+from app.services.message_gateway import MessageGateway, ChannelAdapter, InboundMessage
+from app.services.quota_service import quota_service
+
+class RecordingAdapter(ChannelAdapter):
+    channel = "test"
+
+    def __init__(self):
+        self.delivered = []
+
+    async def deliver(self, message, reply):
+        self.delivered.append((message.bot_id, reply))
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    calls = []
+    gate = asyncio.Event()
+    gate.set()
+
+    async def query_bot(bot_id, question):
+        calls.append(bot_id)
+        await gate.wait()
+        await asyncio.sleep(0)
+        return {'success': True, 'answer': f"answer to {question}", 'confidence': 1.0}
+
+    monkeypatch.setattr(gateway_module.ai_service, "initialized", True)
+    monkeypatch.setattr(gateway_module.ai_service, "query_bot", query_bot)
+    monkeypatch.setattr(quota_service, "check", lambda tenant: None)
+    for bot_id in (1, 2):
+        quota_service.set_plan(bot_id, "starter")
+    yield calls, gate
+    for bot_id in (1, 2):
+        quota_service.tenant_plans.pop(str(bot_id), None)
+
+async def test_backlogged_bot_does_not_delay_others(fake_model):
+    calls, gate = fake_model
+    gate.clear()
+    gateway = MessageGateway(workers=2, queue_size=1000)
+    adapter = RecordingAdapter()
+    gateway.register_adapter(adapter)
+
+    for i in range(200):
+        assert gateway.submit(InboundMessage("test", 1, None, f"q{i}"))
+    assert gateway.submit(InboundMessage("test", 2, None, "other"))
+    gate.set()
+
+    while len(adapter.delivered) < 201:
+        await asyncio.sleep(0)
+    # Bot 2 is served on the next turn, not after bot 1's backlog
+    assert calls.index(2) <= 3
+    await gateway.stop()
+
+async def test_plan_weight_sets_share_per_turn(fake_model):
+    calls, gate = fake_model
+    quota_service.set_plan(2, "business")  # weight 4 against 1
+    gate.clear()
+    gateway = MessageGateway(workers=1, queue_size=1000)
+    gateway.register_adapter(RecordingAdapter())
+
+    for i in range(20):
+        gateway.submit(InboundMessage("test", 1, None, f"q{i}"))
+        gateway.submit(InboundMessage("test", 2, None, f"q{i}"))
+    gate.set()
+    while len(calls) < 10:
+        await asyncio.sleep(0)
+    assert calls[:10].count(2) == 8
+    await gateway.stop()
+
+async def test_queue_bound_rejects_and_recovers(fake_model):
+    _, gate = fake_model
+    gate.clear()
+    gateway = MessageGateway(workers=1, queue_size=3)
+    adapter = RecordingAdapter()
+    gateway.register_adapter(adapter)
+
+    results = [gateway.submit(InboundMessage("test", 1, None, f"q{i}")) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert gateway.get_stats()['dropped'] == 2
+
+    gate.set()
+    while len(adapter.delivered) < 3:
+        await asyncio.sleep(0)
+    assert gateway.get_stats()['queue_depth'] == 0
+    assert gateway.submit(InboundMessage("test", 1, None, "again"))
+    await gateway.stop()
+
+async def test_stop_cancels_busy_workers(fake_model):
+    _, gate = fake_model
+    gate.clear()
+    gateway = MessageGateway(workers=2, queue_size=10)
+    gateway.register_adapter(RecordingAdapter())
+    gateway.submit(InboundMessage("test", 1, None, "stuck"))
+    await asyncio.sleep(0)
+    assert gateway.get_stats()['busy_workers'] == 1
+
+    await asyncio.wait_for(gateway.stop(), 1)
+    assert gateway.get_stats()['workers'] == 0
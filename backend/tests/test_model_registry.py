@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from app.core.config import settings
+from app.services.model_registry import ModelRegistry
+
+class FakeModel:
+    """Stands in for SentenceTransformer; fails while ``failures_left``"""
+    failures_left = 0
+    loads = 0
+
+    def __init__(self, name):
+        FakeModel.loads += 1
+        if FakeModel.failures_left:
+            FakeModel.failures_left -= 1
+            raise OSError(f"Couldn't reach the model hub for {name}")
+        self.name = name
+
+@pytest.fixture
+def registry(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(settings, "MODEL_RETRY_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "MODEL_RETRY_MAX_SECONDS", 0.15)
+    FakeModel.failures_left, FakeModel.loads = 0, 0
+    return ModelRegistry(budget_bytes=2 ** 30)
+
+async def test_failed_load_is_retried_after_backoff(registry):
+    FakeModel.failures_left = 1
+    assert await registry.get("en-model") is None
+    # Within the backoff the failure is answered without another load attempt
+    assert await registry.get("en-model") is None
+    assert FakeModel.loads == 1
+    assert registry.get_stats()['unavailable']['en-model']['failures'] == 1
+
+    await asyncio.sleep(0.06)
+    model = await registry.get("en-model")
+    assert model.name == "en-model"
+    assert FakeModel.loads == 2
+    assert registry.get_stats()['unavailable'] == {}
+    assert registry.stats['failures'] == 1
+
+async def test_backoff_doubles_up_to_the_maximum(registry, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_RETRY_SECONDS", 10)
+    monkeypatch.setattr(settings, "MODEL_RETRY_MAX_SECONDS", 30)
+    FakeModel.failures_left = 10
+    delays = []
+    for _ in range(4):
+        assert await registry.get("en-model") is None
+        delays.append(registry.get_stats()['unavailable']['en-model']['retry_in_seconds'])
+        # Skip the wait
+        registry._failed["en-model"] = (0.0, registry._failed["en-model"][1])
+    assert delays == pytest.approx([10, 20, 30, 30], abs=0.2)
+
+async def test_clear_failures_retries_on_next_use(registry):
+    FakeModel.failures_left = 2
+    assert await registry.get("en-model") is None
+    assert await registry.get("ru-model") is None
+
+    registry.clear_failures("en-model")
+    assert (await registry.get("en-model")).name == "en-model"
+    assert await registry.get("ru-model") is None  # still backing off
+
+    registry.clear_failures()
+    assert (await registry.get("ru-model")).name == "ru-model"
+
+async def test_concurrent_requests_share_one_load(registry):
+    models = await asyncio.gather(*(registry.get("en-model") for _ in range(5)))
+    assert FakeModel.loads == 1
+    assert all(model is models[0] for model in models)
+    assert registry.stats['loads'] == 1 and registry.stats['hits'] == 4
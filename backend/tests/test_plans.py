@@ -0,0 +1,89 @@
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1.endpoints import auth, bots, users
+from app.core.config import settings
+from app.core.plans import get_plan
+from app.services.quota_service import quota_service, QuotaExceeded, MemoryQuotaBackend
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.include_router(bots.router, prefix="/bots")
+    plan, saved_bots = users.current_subscription["plan"], list(bots.mock_bots)
+    admin_token = auth.create_access_token({"sub": "admin@example.com"})
+    async with httpx.AsyncClient(app=app, base_url="http://test",
+                                 headers={"Authorization": f"Bearer {admin_token}"}) as client:
+        yield client
+    users.current_subscription["plan"] = plan
+    for bot in bots.mock_bots:
+        quota_service.tenant_plans.pop(str(bot.id), None)
+    bots.mock_bots = saved_bots
+    for bot in saved_bots:
+        quota_service.set_plan(bot.id, plan)
+    await quota_service.stop()
+
+async def create_bot(client) -> int:
+    response = await client.post("/bots/", json={"name": "Plan bot", "website_url": "https://example.com"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def burst_allowed(bot_id: int) -> int:
+    allowed = 0
+    try:
+        for _ in range(1000):
+            quota_service.check(bot_id)
+            allowed += 1
+    except QuotaExceeded as e:
+        assert e.reason == "rate_limit"
+    return allowed
+
+async def test_new_bot_gets_the_account_plan(client):
+    await client.put("/users/subscription", json={"plan": "starter"})
+    bot_id = await create_bot(client)
+    assert quota_service.get_plan(bot_id) == get_plan("starter")
+    assert burst_allowed(bot_id) == get_plan("starter")["query_burst"]
+
+async def test_subscription_change_updates_every_bot(client):
+    await client.put("/users/subscription", json={"plan": "starter"})
+    bot_id = await create_bot(client)
+
+    response = await client.put("/users/subscription", json={"plan": "business"})
+    assert response.status_code == 200
+    assert response.json()["plan"] == "business"
+    for bot in bots.mock_bots:
+        assert quota_service.get_plan(bot.id)["inference_weight"] == get_plan("business")["inference_weight"]
+    # The rate limit follows the new plan at once
+    assert burst_allowed(bot_id) == get_plan("business")["query_burst"]
+
+async def test_unknown_plan_is_rejected(client):
+    plan = users.current_subscription["plan"]
+    response = await client.put("/users/subscription", json={"plan": "platinum"})
+    assert response.status_code == 400
+    assert users.current_subscription["plan"] == plan
+
+async def test_only_administrators_change_the_plan(client, monkeypatch):
+    plan = users.current_subscription["plan"]
+    response = await client.put("/users/subscription", json={"plan": "enterprise"}, headers={"Authorization": ""})
+    assert response.status_code == 401
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", [])
+    response = await client.put("/users/subscription", json={"plan": "enterprise"})
+    assert response.status_code == 403
+    assert users.current_subscription["plan"] == plan
+
+async def test_memory_backend_persists_usage_off_the_event_loop(tmp_path, monkeypatch):
+    state_file = str(tmp_path / "quota.json")
+    backend = MemoryQuotaBackend(state_file)
+    writers = []
+    write = backend._write
+    monkeypatch.setattr(backend, "_write", lambda data: (writers.append(threading.current_thread()), write(data)))
+
+    assert await backend.increment("2026-10", {"1": 2, "2": 1}) == {"1": 2, "2": 1}
+    assert await backend.increment("2026-10", {"1": 3}) == {"1": 5}
+    assert writers and all(thread is not threading.main_thread() for thread in writers)
+    assert await MemoryQuotaBackend(state_file).load("2026-10") == {"1": 5, "2": 1}
@@ -0,0 +1,26 @@
+import pytest
+
+from app.core.config import settings
+from app.core.prefork import PreforkServer, SHARED_BACKENDS
+
+def test_single_worker_is_the_default():
+    assert settings.WEB_WORKERS == 1
+    PreforkServer("app.main:app", "127.0.0.1", 0, settings.WEB_WORKERS)
+
+def test_several_workers_need_redis_backends(monkeypatch):
+    for name in SHARED_BACKENDS:
+        monkeypatch.setattr(settings, name, "memory")
+    with pytest.raises(ValueError, match="QUOTA_BACKEND"):
+        PreforkServer("app.main:app", "127.0.0.1", 0, 2)
+
+    for name in SHARED_BACKENDS:
+        monkeypatch.setattr(settings, name, "redis")
+    monkeypatch.setattr(settings, "WEB_WORKERS_ALLOW_LOCAL_AUTH", True)
+    assert PreforkServer("app.main:app", "127.0.0.1", 0, 2).workers == 2
+
+def test_several_workers_refused_while_auth_state_is_per_worker(monkeypatch):
+    for name in SHARED_BACKENDS:
+        monkeypatch.setattr(settings, name, "redis")
+    monkeypatch.setattr(settings, "WEB_WORKERS_ALLOW_LOCAL_AUTH", False)
+    with pytest.raises(ValueError, match="token revocations"):
+        PreforkServer("app.main:app", "127.0.0.1", 0, 2)
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.record_table import RecordTable
+
+RECORDS = [
+    {'question': "Opening hours?", 'answer': "9 to 5", 'heading': "Hours", 'source': "https://example.com/hours"},
+    {'question': "Часы работы?", 'answer': "С 9 до 17 — каждый день ☀️", 'heading': "Часы", 'source': "https://example.com/ru"},
+    {'question': "", 'answer': "Passage without a question", 'heading': None, 'source': "https://example.com/hours"},
+    {'question': "Parking?", 'answer': "Lot B", 'heading': "Hours", 'source': None},
+]
+
+def save(table: RecordTable, path) -> str:
+    # As BotIndex.save writes them
+    os.makedirs(path, exist_ok=True)
+    for name, write in table.files().items():
+        with open(os.path.join(path, name), 'wb') as f:
+            write(f)
+    return str(path)
+
+def file_contents(path):
+    contents = {}
+    for name in os.listdir(path):
+        with open(os.path.join(path, name), 'rb') as f:
+            contents[name] = f.read()
+    return contents
+
+def expected(record):
+    # Empty strings are stored as zero-length rows and read back as None
+    return {name: value or None for name, value in record.items()}
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_round_trip(tmp_path, mmap):
+    table = RecordTable()
+    table.extend(RECORDS)
+    assert list(table) == [expected(record) for record in RECORDS]
+
+    loaded = RecordTable.load(save(table, tmp_path), mmap=mmap)
+    assert len(loaded) == len(RECORDS)
+    assert list(loaded) == [expected(record) for record in RECORDS]
+    assert loaded[1]['answer'] == "С 9 до 17 — каждый день ☀️"
+    assert loaded.nbytes == table.nbytes
+
+def test_repeated_values_are_interned_once(tmp_path):
+    table = RecordTable()
+    table.extend(RECORDS * 50)
+    assert table.column('source').values == ["https://example.com/hours", "https://example.com/ru"]
+    assert table.column('heading').values == ["Hours", "Часы"]
+
+    loaded = RecordTable.load(save(table, tmp_path))
+    assert loaded.column('heading').values == ["Hours", "Часы"]
+    assert [loaded[row]['source'] for row in (0, 3, 4)] == ["https://example.com/hours", None, "https://example.com/hours"]
+
+def test_empty_table(tmp_path):
+    loaded = RecordTable.load(save(RecordTable(), tmp_path))
+    assert len(loaded) == 0
+    assert list(loaded) == []
+    with pytest.raises(IndexError):
+        loaded[0]
+
+    loaded.extend(RECORDS[:1])
+    assert list(loaded) == [expected(RECORDS[0])]
+
+def test_mapped_columns_are_read_only_and_copied_on_write(tmp_path):
+    table = RecordTable()
+    table.extend(RECORDS)
+    path = save(table, tmp_path)
+    loaded = RecordTable.load(path)
+
+    question = loaded.column('question')
+    assert isinstance(question._arena, np.memmap)
+    for buffer in (question._arena, question._offsets, loaded.column('heading')._codes):
+        assert not buffer.flags.writeable
+        with pytest.raises(ValueError):
+            buffer[0] = 1
+
+    # Appending copies the columns into memory and leaves the files alone
+    on_disk = file_contents(path)
+    loaded.extend([{'question': "New?", 'answer': "Yes", 'heading': "Hours", 'source': None}])
+    assert loaded[4] == {'question': "New?", 'answer': "Yes", 'heading': "Hours", 'source': None}
+    assert list(loaded)[:4] == [expected(record) for record in RECORDS]
+    assert file_contents(path) == on_disk
+
+def test_extend_with_a_loaded_table(tmp_path):
+    first, second = RecordTable(), RecordTable()
+    first.extend(RECORDS[:2])
+    second.extend(RECORDS[2:])
+
+    merged = RecordTable.load(save(first, tmp_path / "first"))
+    merged.extend(RecordTable.load(save(second, tmp_path / "second")))
+    assert list(merged) == [expected(record) for record in RECORDS]
+    # The second table's source URL is re-coded against the first's values
+    assert merged.column('source').values == ["https://example.com/hours", "https://example.com/ru"]
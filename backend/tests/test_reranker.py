@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.config import settings
+from app.services.reranker import Reranker
+
+class FakeCrossEncoder:
+    def __init__(self, seconds_per_pair: float):
+        self.seconds_per_pair = seconds_per_pair
+        self.calls = 0
+
+    def predict(self, pairs, batch_size):
+        self.calls += 1
+        time.sleep(self.seconds_per_pair * len(pairs))
+        return [float(len(answer)) for _, answer in pairs]
+
+@pytest.fixture
+def reranker(monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_ENABLED", True)
+    reranker = Reranker()
+    reranker.model = FakeCrossEncoder(0.0001)
+    return reranker
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(1) as executor:
+        yield executor
+
+CANDIDATES = [{'answer': "a" * length} for length in (1, 3, 2, 5, 4)]
+
+async def test_reorders_by_cross_encoder_score(reranker, executor):
+    results = await reranker.rerank("q", [dict(c) for c in CANDIDATES], executor, budget_ms=1000)
+    assert [len(r['answer']) for r in results] == [5, 4, 3, 2, 1]
+
+async def test_one_slow_call_does_not_disable_reranking(reranker, executor, monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_COST_HALF_LIFE_SECONDS", 30.0)
+    # A cold call measured 100ms per pair: nothing fits a 150ms budget
+    reranker._pair_cost, reranker._measured_at = 0.1, time.monotonic()
+    await reranker.rerank("q", [dict(c) for c in CANDIDATES], executor, budget_ms=150)
+    assert reranker.stats['skipped_budget'] == 1
+    assert reranker.model.calls == 0
+
+    # Without a new measurement the estimate decays and re-ranking resumes
+    reranker._measured_at -= 300
+    results = await reranker.rerank("q", [dict(c) for c in CANDIDATES], executor, budget_ms=150)
+    assert reranker.model.calls == 1
+    assert len(results[0]['answer']) == 5
+    assert reranker.get_stats()['pair_cost_ms'] < 1
+
+async def test_truncates_to_the_budget(reranker, executor):
+    reranker._pair_cost, reranker._measured_at = 0.01, time.monotonic()
+    await reranker.rerank("q", [dict(c) for c in CANDIDATES], executor, budget_ms=30)
+    assert reranker.stats['truncated'] == 1
@@ -0,0 +1,23 @@
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+from app.core.security import hash_password, verify_password, pwd_context
+
+async def test_new_hashes_use_configured_rounds():
+    stored = await hash_password("secret")
+    assert bcrypt.from_string(stored).rounds == settings.BCRYPT_ROUNDS
+    assert await verify_password("secret", stored) == (True, None)
+    assert (await verify_password("wrong", stored))[0] is False
+
+async def test_any_other_cost_is_rehashed_on_login():
+    for rounds in (settings.BCRYPT_ROUNDS - 1, settings.BCRYPT_ROUNDS + 1):
+        stored = bcrypt.using(rounds=rounds).hash("secret")
+        assert pwd_context.needs_update(stored)
+        valid, new_hash = await verify_password("secret", stored)
+        assert valid
+        assert bcrypt.from_string(new_hash).rounds == settings.BCRYPT_ROUNDS
+
+async def test_legacy_plaintext_is_rehashed():
+    valid, new_hash = await verify_password("admin123", "admin123")
+    assert valid
+    assert new_hash.startswith("$2")
@@ -0,0 +1,170 @@
+import pytest
+
+from app.core.config import settings
+from app.services import session_store as session_module
+from app.services.session_store import (
+    MemorySessionStore, RedisSessionStore, create_session_store, active_user_counts
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+class FakeRedis:
+    """The Redis commands the session store uses, with expiry on the same clock"""
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self.values = {}  # key -> (value, expires_at)
+        self.sorted_sets = {}  # key -> {member: score}
+
+    def _live(self, key):
+        entry = self.values.get(key)
+        if entry is not None and entry[1] <= self.clock.now:
+            del self.values[key]
+            return None
+        return entry
+
+    async def set(self, key, value, ex):
+        self.values[key] = (str(value), self.clock.now + ex)
+
+    async def getex(self, key, ex):
+        entry = self._live(key)
+        if entry is None:
+            return None
+        self.values[key] = (entry[0], self.clock.now + ex)
+        return entry[0]
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.sorted_sets.get(key, {})
+        low = float(low)
+        for member, score in list(members.items()):
+            if low <= score <= high:
+                del members[member]
+
+    def zremrangebyrank(self, key, start, stop):
+        members = self.sorted_sets.get(key, {})
+        ranked = sorted(members, key=members.get)
+        stop = len(ranked) + stop if stop < 0 else stop
+        for member in ranked[start:max(stop + 1, 0)]:
+            del members[member]
+
+    async def zcount(self, key, low, high):
+        high = float(high)
+        return sum(1 for score in self.sorted_sets.get(key, {}).values() if low <= score <= high)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_module, "time", clock)
+    return clock
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, clock, monkeypatch):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=60, max_users=3, activity_window=3600)
+    monkeypatch.setattr("redis.asyncio.from_url", lambda url, **kwargs: FakeRedis(clock))
+    return RedisSessionStore("redis://test", ttl=60, max_users=3, activity_window=3600)
+
+async def test_sessions_expire_after_the_ttl(store, clock):
+    await store.set(1, 10)
+    clock.now += 59
+    assert await store.get(1) == 10
+
+    # Reading slides the expiry
+    clock.now += 59
+    assert await store.get(1) == 10
+    clock.now += 61
+    assert await store.get(1) is None
+
+async def test_set_replaces_and_delete_removes(store):
+    await store.set(1, 10)
+    await store.set(1, 11)
+    assert await store.get(1) == 11
+    await store.delete(1)
+    assert await store.get(1) is None
+    await store.delete(1)
+
+async def test_active_users_per_window(store, clock):
+    for user_id in (1, 2):
+        await store.touch(user_id)
+    clock.now += 600
+    await store.touch(3)
+    await store.touch(3)  # counted once
+
+    assert await store.active_users(300) == 1
+    assert await store.active_users(3600) == 3
+    clock.now += 3001
+    assert await store.active_users(3600) == 1
+
+async def test_activity_keeps_the_most_recent_users(store, clock):
+    for user_id in range(1, 6):
+        await store.touch(user_id)
+        clock.now += 1
+    await store.touch(1)
+    assert await store.active_users(3600) == 3
+    # Users 4, 5 and 1 were active last; user 2 and 3 were dropped
+    clock.now += 1
+    await store.touch(2)
+    assert await store.active_users(1) == 2  # 1 and 2
+    assert await store.active_users(3600) == 3  # 5, 1 and 2
+
+async def test_memory_store_evicts_the_least_recently_active_session(clock):
+    store = MemorySessionStore(ttl=60, max_users=3, activity_window=3600)
+    for user_id in (1, 2, 3):
+        await store.set(user_id, 10 + user_id)
+        clock.now += 1
+    assert await store.get(1) == 11  # now the most recent
+
+    await store.set(4, 14)
+    assert await store.get(2) is None
+    assert [await store.get(user_id) for user_id in (1, 3, 4)] == [11, 13, 14]
+    assert len(store._sessions) == 3
+
+async def test_memory_store_prunes_expired_sessions_on_write(clock):
+    store = MemorySessionStore(ttl=60, max_users=100, activity_window=3600)
+    for user_id in range(10):
+        await store.set(user_id, 1)
+    clock.now += 61
+    await store.set(99, 1)
+    assert list(store._sessions) == [99]
+
+async def test_counts_for_every_reported_window(clock):
+    store = MemorySessionStore(ttl=60, max_users=100, activity_window=24 * 3600)
+    await store.touch(1)
+    clock.now += 2 * 3600
+    await store.touch(2)
+    assert await active_user_counts(store) == {"5m": 1, "1h": 1, "24h": 2}
+
+def test_memory_store_is_the_default(monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_SESSION_BACKEND", "memory")
+    assert isinstance(create_session_store(), MemorySessionStore)
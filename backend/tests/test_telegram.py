@@ -0,0 +1,242 @@
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from telegram import Bot, Update
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+
+from app.api.v1.endpoints import telegram as telegram_endpoints
+from app.api.v1.endpoints.auth import get_current_user, User
+from app.core.config import settings
+from app.services import message_gateway as gateway_module
+from app.services.message_gateway import message_gateway
+from app.services.quota_service import quota_service
+from app.services.telegram_outbox import TelegramOutbox
+from app.services.telegram_runtime import TokenBucketRateLimiter
+from app.services.telegram_service import telegram_service
+
+TOKEN = "123456:TEST-token"
+
+@pytest.fixture
+async def bot(fake_telegram):
+    bot = Bot(TOKEN, base_url=fake_telegram.base_url)
+    await bot.initialize()
+    yield bot
+    await bot.shutdown()
+
+async def test_outbox_retries_after_flood_limit(fake_telegram, bot):
+    fake_telegram.flood("sendMessage", times=1, retry_after=1)
+    outbox = TelegramOutbox()
+    try:
+        message = await asyncio.wait_for(outbox.send_message(bot, 42, "hello"), 5)
+    finally:
+        await outbox.stop()
+
+    assert message.text == "hello"
+    first, second = fake_telegram.call_times("sendMessage")
+    # Sent again only once the delay Telegram asked for has passed
+    assert second - first >= 0.9
+    assert outbox.get_metrics()['retried'] == 1
+    assert outbox.get_metrics()['sent'] == 1
+
+async def test_outbox_gives_up_after_max_retries(fake_telegram, bot, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_OUTBOX_MAX_RETRIES", 0)
+    fake_telegram.flood("sendMessage", times=1, retry_after=1)
+    outbox = TelegramOutbox()
+    try:
+        with pytest.raises(RetryAfter):
+            await asyncio.wait_for(outbox.send_message(bot, 42, "hello"), 5)
+    finally:
+        await outbox.stop()
+    assert outbox.get_metrics()['failed'] == 1
+
+class SlowBot:
+    token = TOKEN
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self.release.wait()
+        self.sent.append(text)
+        return text
+
+async def test_outbox_stop_waits_for_sends_in_flight():
+    bot = SlowBot()
+    outbox = TelegramOutbox()
+    future = outbox.send_message(bot, 42, "hello")
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert len(outbox._sends) == 1
+
+    stopping = asyncio.create_task(outbox.stop())
+    await asyncio.sleep(0.01)
+    assert not stopping.done()
+    bot.release.set()
+    await asyncio.wait_for(stopping, 1)
+
+    assert await future == "hello"
+    assert bot.sent == ["hello"]
+    assert not outbox._sends
+    assert outbox.get_metrics()['in_flight'] == 0
+
+async def test_rate_limiter_paces_requests_per_token(fake_telegram):
+    bot = ExtBot(TOKEN, base_url=fake_telegram.base_url, rate_limiter=TokenBucketRateLimiter(20))
+    await bot.initialize()
+    try:
+        start = time.monotonic()
+        await asyncio.gather(*(bot.send_message(42, f"m{i}") for i in range(30)))
+        elapsed = time.monotonic() - start
+    finally:
+        await bot.shutdown()
+    # 20 go out at once from the full bucket, the other 10 at 20 per second
+    assert elapsed >= 0.45
+    assert len(fake_telegram.called("sendMessage")) == 30
+
+async def test_rate_limiter_backs_off_after_flood_limit(fake_telegram):
+    bot = ExtBot(TOKEN, base_url=fake_telegram.base_url, rate_limiter=TokenBucketRateLimiter(20))
+    await bot.initialize()
+    try:
+        fake_telegram.flood("sendMessage", times=1, retry_after=1)
+        with pytest.raises(RetryAfter):
+            await bot.send_message(42, "flooded")
+        start = time.monotonic()
+        await bot.send_message(42, "after")
+        waited = time.monotonic() - start
+    finally:
+        await bot.shutdown()
+    assert waited >= 0.9
+
+@pytest.fixture
+async def webhook_service(fake_telegram, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_API_BASE_URL", fake_telegram.base_url)
+    monkeypatch.setattr(settings, "TELEGRAM_WEBHOOK_SECRET", "webhook-secret")
+
+    async def query_bot(bot_id, question):
+        return {'success': True, 'answer': f"Answer to: {question}", 'confidence': 0.9, 'source_url': None}
+
+    monkeypatch.setattr(gateway_module.ai_service, "initialized", True)
+    monkeypatch.setattr(gateway_module.ai_service, "query_bot", query_bot)
+    monkeypatch.setattr(quota_service, "check", lambda tenant: None)
+
+    await telegram_service.register_faq_bot(7, "Test bot", bot_token=TOKEN)
+    await telegram_service.start_update_workers()
+    yield telegram_service
+    await telegram_service.stop_bot()
+    await telegram_service.unregister_faq_bot(7)
+    await message_gateway.stop()
+
+@pytest.fixture
+async def api_client():
+    app = FastAPI()
+    app.include_router(telegram_endpoints.router)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+def text_update(update_id: int, text: str):
+    user = {'id': 42, 'is_bot': False, 'first_name': "Ann"}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': 42, 'type': "private"},
+            'from': user,
+            'text': text
+        }
+    }
+
+async def test_webhook_update_is_answered_through_the_api(fake_telegram, webhook_service, api_client):
+    response = await api_client.post(
+        "/webhook/7", json=text_update(1, "When are you open?"),
+        headers={'X-Telegram-Bot-Api-Secret-Token': webhook_service.webhook_secret(7)}
+    )
+    assert response.status_code == 200
+
+    for _ in range(200):
+        if fake_telegram.called("sendMessage"):
+            break
+        await asyncio.sleep(0.01)
+    sent = fake_telegram.called("sendMessage")
+    assert len(sent) == 1
+    assert sent[0]['chat_id'] == 42
+    assert sent[0]['reply_to_message_id'] == 1
+    assert "Answer to: When are you open?" in sent[0]['text']
+
+async def test_webhook_rejects_bad_secret_and_unknown_bot(webhook_service, api_client):
+    response = await api_client.post(
+        "/webhook/7", json=text_update(2, "hi"),
+        headers={'X-Telegram-Bot-Api-Secret-Token': "wrong"}
+    )
+    assert response.status_code == 403
+
+    response = await api_client.post(
+        "/webhook/8", json=text_update(3, "hi"),
+        headers={'X-Telegram-Bot-Api-Secret-Token': webhook_service.webhook_secret(8)}
+    )
+    assert response.status_code == 404
+
+    response = await api_client.post(
+        "/webhook/7", json={'message': "not an update"},
+        headers={'X-Telegram-Bot-Api-Secret-Token': webhook_service.webhook_secret(7)}
+    )
+    assert response.status_code == 400
+
+async def test_command_replies_go_through_the_outbox(fake_telegram, bot):
+    context = SimpleNamespace(bot=bot, bot_data={}, args=[])
+    assert not telegram_service.active_bots
+    try:
+        await telegram_service.handle_message(Update.de_json(text_update(11, "hi"), bot), context)
+        await telegram_service.list_bots_command(Update.de_json(text_update(12, "/list"), bot), context)
+        for _ in range(200):
+            if len(fake_telegram.called("sendMessage")) == 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await telegram_service.outbox.stop()
+
+    sent = fake_telegram.called("sendMessage")
+    assert [message['reply_to_message_id'] for message in sent] == [11, 12]
+    assert "select a FAQ bot first" in sent[0]['text']
+    assert sent[1]['text'] == "No FAQ bots are currently available."
+
+@pytest.fixture
+async def registration_client():
+    app = FastAPI()
+    app.include_router(telegram_endpoints.router)
+    app.dependency_overrides[get_current_user] = lambda: User(
+        id=1, email="admin@example.com", full_name="Admin", created_at=datetime.now()
+    )
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    for bot_id in (7, 8, 9):
+        await telegram_service.unregister_faq_bot(bot_id)
+
+async def test_registration_reports_tokens_that_cannot_be_served(registration_client, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_TENANT_BOTS", 1)
+    register = {"bot_name": "Tenant bot", "bot_token": TOKEN}
+    response = await registration_client.post("/register", json={"bot_id": 7, **register})
+    assert response.status_code == 200
+    assert 7 in telegram_service.tenant_applications
+
+    # The same token for another FAQ bot
+    response = await registration_client.post("/register", json={"bot_id": 8, **register})
+    assert response.status_code == 409
+    assert 8 not in telegram_service.active_bots
+
+    # A new token over the tenant bot limit
+    response = await registration_client.post(
+        "/register", json={"bot_id": 9, "bot_name": "Tenant bot", "bot_token": "654321:OTHER-token"}
+    )
+    assert response.status_code == 503
+    assert 9 not in telegram_service.active_bots and 9 not in telegram_service.tenant_applications
+
+    # Re-registering the bot serving the token still works
+    response = await registration_client.post("/register", json={"bot_id": 7, **register})
+    assert response.status_code == 200
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from telegram import Bot, InlineQuery
+
+from app.core.config import settings
+from app.services import message_gateway as gateway_module
+from app.services.message_gateway import message_gateway
+from app.services.quota_service import quota_service, QuotaExceeded
+from app.services.telegram_inline import InlineAnswerer
+
+TOKEN = "123456:TEST-token"
+BOT_ID = 9
+
+@pytest.fixture
+async def bot(fake_telegram):
+    bot = Bot(TOKEN, base_url=fake_telegram.base_url)
+    await bot.initialize()
+    yield bot
+    await bot.shutdown()
+
+@pytest.fixture
+async def answerer(monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_INLINE_DEBOUNCE_MS", 0)
+    monkeypatch.setattr(gateway_module.ai_service, "initialized", True)
+    monkeypatch.setattr(quota_service, "check", lambda tenant: None)
+    answerer = InlineAnswerer()
+    yield answerer
+    await answerer.stop()
+    await message_gateway.stop()
+
+def model(monkeypatch, success=True):
+    calls = []
+
+    async def query_bot(bot_id, question):
+        calls.append((bot_id, question))
+        if not success:
+            return {'success': False, 'message': "Bot not trained yet", 'answer': None}
+        return {'success': True, 'answer': f"About {question}", 'confidence': 0.8, 'source_url': None}
+
+    monkeypatch.setattr(gateway_module.ai_service, "query_bot", query_bot)
+    return calls
+
+def inline_query(bot, query_id: str, text: str) -> InlineQuery:
+    return InlineQuery.de_json({
+        'id': query_id,
+        'from': {'id': 42, 'is_bot': False, 'first_name': "Ann"},
+        'query': text,
+        'offset': ""
+    }, bot)
+
+async def test_answer_comes_through_the_gateway_and_is_cached(fake_telegram, bot, answerer, monkeypatch):
+    calls = model(monkeypatch)
+    received = message_gateway.stats['received']
+    await answerer.handle(inline_query(bot, "1", "opening hours"), BOT_ID, personal=False)
+    await answerer.handle(inline_query(bot, "2", "Opening hours?"), BOT_ID, personal=False)
+
+    assert calls == [(BOT_ID, "opening hours")]
+    assert message_gateway.stats['received'] == received + 1
+    first, second = fake_telegram.called("answerInlineQuery")
+    assert first['cache_time'] == settings.TELEGRAM_INLINE_CACHE_TIME
+    assert first['results'][0]['input_message_content']['message_text'] == "About opening hours"
+    assert second['results'][0]['input_message_content'] == first['results'][0]['input_message_content']
+    assert answerer.get_stats()['cache_hits'] == 1
+
+async def test_failed_answer_is_not_cached_by_telegram(fake_telegram, bot, answerer, monkeypatch):
+    model(monkeypatch, success=False)
+    await answerer.handle(inline_query(bot, "1", "opening hours"), BOT_ID, personal=False)
+
+    answered, = fake_telegram.called("answerInlineQuery")
+    assert answered['cache_time'] == 0
+    assert answered['results'] == []
+    assert answerer.get_stats()['cached_queries'] == 0
+
+async def test_quota_is_checked_by_the_gateway(fake_telegram, bot, answerer, monkeypatch):
+    calls = model(monkeypatch)
+
+    def over_quota(tenant):
+        raise QuotaExceeded("rate_limit", "Too many requests", retry_after=1)
+
+    monkeypatch.setattr(quota_service, "check", over_quota)
+    await answerer.handle(inline_query(bot, "1", "opening hours"), BOT_ID, personal=False)
+
+    assert calls == []
+    answered, = fake_telegram.called("answerInlineQuery")
+    assert answered['cache_time'] == 0
+    assert answerer.get_stats()['rejected'] == 1
+
+async def test_typing_over_a_query_debounces_it(fake_telegram, bot, answerer, monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_INLINE_DEBOUNCE_MS", 50)
+    calls = model(monkeypatch)
+    first = answerer.handle(inline_query(bot, "1", "opening"), BOT_ID, personal=False)
+    await asyncio.sleep(0)
+    second = answerer.handle(inline_query(bot, "2", "opening hours"), BOT_ID, personal=False)
+    await asyncio.gather(first, second, return_exceptions=True)
+
+    assert calls == [(BOT_ID, "opening hours")]
+    assert len(fake_telegram.called("answerInlineQuery")) == 1